@@ -1,11 +1,18 @@
 from fastapi import FastAPI, HTTPException, Security, Request, status
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
+from fastapi.security import APIKeyHeader
+from starlette.concurrency import run_in_threadpool
 from pydantic import BaseModel
+from typing import List, Optional
+import secrets
 import sys
 import os
 from datetime import datetime, timedelta
 from collections import defaultdict
+from contextlib import asynccontextmanager
 import threading
+import time
 from dotenv import load_dotenv
 
 # Load environment variables
@@ -14,7 +21,16 @@ load_dotenv()
 # Add services directory to path
 sys.path.append(os.path.join(os.path.dirname(__file__), 'services'))
 
-from services.agent import generate_chat_response
+from services.agent import (
+    ChatTurn, generate_chat_turn, stream_chat_turn, normalize_query, degraded_turn, generation_upstream, warm_caches,
+)
+from services.upstream import UpstreamUnavailable
+from services.sessions import session_store
+from services import knowledge, metrics
+from services.logs import get_logger, log_event, new_request_id, request_id_var
+from services.singleflight import SingleFlight
+from services.batch import BATCH_CONCURRENCY, BATCH_MAX_QUERIES, run_batch_jsonl
+from services.query_log import query_log, start_warmup_schedule, warm_up
 
 # Security Configuration
 ALLOWED_ORIGINS = os.getenv("ALLOWED_ORIGINS").split(",")
@@ -22,14 +38,37 @@ RATE_LIMIT_REQUESTS = int(os.getenv("RATE_LIMIT_REQUESTS", "20"))  # More genero
 RATE_LIMIT_PERIOD = int(os.getenv("RATE_LIMIT_PERIOD", "60"))  # seconds
 ENVIRONMENT = os.getenv("ENVIRONMENT", "development")
 PUBLIC_MODE = os.getenv("PUBLIC_MODE", "true").lower() == "true"  # No API key required
+COALESCE_REQUESTS = os.getenv("COALESCE_REQUESTS", "true").lower() == "true"  # Share identical in-flight queries
+API_KEY = os.getenv("API_KEY", "")  # Required for internal endpoints such as /chat_batch
 
 # Rate limiting storage (per IP address)
 rate_limit_storage = defaultdict(list)
 rate_limit_lock = threading.Lock()
 
+log = get_logger("api")
+
+# Identical concurrent prompts share one pipeline run (single-flight)
+chat_flights = SingleFlight("chat")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Loads the knowledge snapshot and warms the caches with past top queries before serving."""
+    knowledge.start_refresher()
+    try:
+        await run_in_threadpool(warm_up, warm_caches)
+    except Exception as e:
+        log.warning("warmup.failed", extra={"error": str(e)})
+    warmup_schedule = start_warmup_schedule(warm_caches)
+    yield
+    if warmup_schedule:
+        warmup_schedule.set()
+    knowledge.stop_refresher()
+    query_log.flush()
+
 app = FastAPI(
     title="Neckarmedia Chatbot API", 
     version="1.0.0",
+    lifespan=lifespan,
     docs_url="/docs" if ENVIRONMENT == "development" else None,
     redoc_url="/redoc" if ENVIRONMENT == "development" else None,
 )
@@ -41,13 +80,20 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["GET", "POST"],
     allow_headers=["Content-Type", "X-API-Key"],
+    expose_headers=["X-Session-ID", "X-Request-ID"],
 )
 
 class ChatRequest(BaseModel):
     user_prompt: str
+    session_id: Optional[str] = None  # omit to start a new conversation
     
 class ChatResponse(BaseModel):
     response: str
+    session_id: str
+
+class BatchRequest(BaseModel):
+    user_prompts: List[str]
+    concurrency: Optional[int] = None
 
 # Security Functions
 
@@ -74,6 +120,36 @@ def check_rate_limit(request: Request) -> None:
         # Add current request
         rate_limit_storage[client_id].append(current_time)
 
+api_key_header = APIKeyHeader(name="X-API-Key", auto_error=False)
+
+def verify_api_key(api_key: Optional[str] = Security(api_key_header)) -> None:
+    """Require the X-API-Key header to match API_KEY (internal endpoints only)."""
+    if not API_KEY:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="This endpoint is disabled (no API_KEY configured)."
+        )
+    if not api_key or not secrets.compare_digest(api_key, API_KEY):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid or missing API key."
+        )
+
+@app.middleware("http")
+async def request_context(request: Request, call_next):
+    """Tags every log line of a request with its id (from X-Request-ID or new) and logs its latency."""
+    request_id = request.headers.get("X-Request-ID") or new_request_id()
+    token = request_id_var.set(request_id[:64])
+    started = time.perf_counter()
+    try:
+        response = await call_next(request)
+        response.headers["X-Request-ID"] = request_id_var.get()
+        log_event(log, "http.request", method=request.method, path=request.url.path,
+                  status=response.status_code, ms=round((time.perf_counter() - started) * 1000, 1))
+        return response
+    finally:
+        request_id_var.reset(token)
+
 # Middleware for security headers
 @app.middleware("http")
 async def add_security_headers(request: Request, call_next):
@@ -93,7 +169,10 @@ async def root():
         "version": "1.0.0",
         "endpoints": {
             "/chat_response": "POST - Send a user prompt and get AI response",
-            "/health": "GET - Check API health status"
+            "/chat_stream": "POST - Send a user prompt and stream the AI response as plain text",
+            "/chat_batch": "POST - (API key) Answer many prompts, streamed back as JSON Lines",
+            "/health": "GET - Check API health status",
+            "/metrics": "GET - Request coalescing and pipeline metrics"
         }
     }
 
@@ -102,6 +181,39 @@ async def health_check():
     """Health check endpoint."""
     return {"status": "healthy", "service": "Neckarmedia Chatbot API"}
 
+@app.get("/metrics")
+async def get_metrics():
+    """Counters and latency summaries collected by the pipeline."""
+    return metrics.snapshot()
+
+def service_unavailable(retry_after: int) -> HTTPException:
+    """503 telling the client when to retry, instead of holding the request while the LLM is down."""
+    metrics.incr("api.shed")
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail="The assistant is busy right now, please try again shortly.",
+        headers={"Retry-After": str(retry_after)}
+    )
+
+def log_query(prompt: str, turn: ChatTurn, started: float) -> None:
+    """Adds an answered query to the query log (buffered; the warm-up replays the most frequent ones)."""
+    query_log.record(prompt, normalize_query(prompt), turn.tools, turn.sources,
+                     round((time.perf_counter() - started) * 1000, 1), turn.answer)
+
+def validate_prompt(chat_request: ChatRequest) -> None:
+    """Rejects empty or oversized prompts."""
+    if not chat_request.user_prompt or not chat_request.user_prompt.strip():
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, 
+            detail="user_prompt cannot be empty"
+        )
+    
+    if len(chat_request.user_prompt) > 5000:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="user_prompt too long (max 5000 characters)"
+        )
+
 @app.post("/chat_response", response_model=ChatResponse)
 async def chat_response(
     chat_request: ChatRequest,
@@ -123,33 +235,107 @@ async def chat_response(
         check_rate_limit(http_request)
         
         # Validate input
-        if not chat_request.user_prompt or not chat_request.user_prompt.strip():
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST, 
-                detail="user_prompt cannot be empty"
-            )
+        validate_prompt(chat_request)
         
-        # Additional input validation
-        if len(chat_request.user_prompt) > 5000:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="user_prompt too long (max 5000 characters)"
+        started = time.perf_counter()
+        # Trigger the agentic workflow off the event loop. First turns with an
+        # identical prompt share one run; follow-ups depend on their session.
+        prompt = chat_request.user_prompt
+        session = session_store.get_or_create(chat_request.session_id)
+        if COALESCE_REQUESTS and session.is_new:
+            turn = await chat_flights.do(
+                normalize_query(prompt),
+                lambda: run_in_threadpool(generate_chat_turn, prompt)
             )
+        else:
+            turn = await run_in_threadpool(generate_chat_turn, prompt, session)
+        await run_in_threadpool(session_store.record_turn, session, prompt, turn)
+        log_query(prompt, turn, started)
         
-        # Trigger the agentic workflow
-        response_text = generate_chat_response(chat_request.user_prompt)
-        
-        return ChatResponse(response=response_text)
+        return ChatResponse(response=turn.answer, session_id=session.id)
     
+    except UpstreamUnavailable as e:
+        raise service_unavailable(e.retry_after)
     except HTTPException:
         raise
     except Exception as e:
-        print(f"❌ Error in chat_response endpoint: {e}")
+        log.exception("api.chat_response_error")
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, 
             detail="Internal server error" if ENVIRONMENT == "production" else f"Internal server error: {str(e)}"
         )
 
+@app.post("/chat_stream")
+async def chat_stream(
+    chat_request: ChatRequest,
+    http_request: Request
+):
+    """
+    Streaming variant of /chat_response.
+    Returns the answer as plain-text chunks while GPT is still generating it;
+    the session id is sent in the X-Session-ID header.
+    """
+    check_rate_limit(http_request)
+    validate_prompt(chat_request)
+
+    prompt = chat_request.user_prompt
+    session = session_store.get_or_create(chat_request.session_id)
+    started = time.perf_counter()
+
+    # Circuit open: answer without the LLM if possible, else 503 before the stream starts
+    if not generation_upstream.accepting():
+        turn = await run_in_threadpool(degraded_turn, prompt)
+        if turn is None:
+            raise service_unavailable(generation_upstream.retry_after())
+        await run_in_threadpool(session_store.record_turn, session, prompt, turn)
+        return StreamingResponse(
+            iter([turn.answer]),
+            media_type="text/plain; charset=utf-8",
+            headers={"X-Session-ID": session.id}
+        )
+
+    if COALESCE_REQUESTS and session.is_new:
+        items = chat_flights.stream(normalize_query(prompt), lambda: stream_chat_turn(prompt))
+    else:
+        items = chat_flights.stream(object(), lambda: stream_chat_turn(prompt, session))  # unique key = never shared
+
+    async def text_chunks():
+        async for item in items:
+            if isinstance(item, ChatTurn):
+                if not item.failed:  # a cut-off answer stays out of the history and the query log
+                    await run_in_threadpool(session_store.record_turn, session, prompt, item)
+                    log_query(prompt, item, started)
+            else:
+                yield item
+
+    return StreamingResponse(
+        text_chunks(),
+        media_type="text/plain; charset=utf-8",
+        headers={"X-Session-ID": session.id}
+    )
+
+@app.post("/chat_batch")
+async def chat_batch(batch_request: BatchRequest, _: None = Security(verify_api_key)):
+    """
+    Bulk endpoint for QA runs and answer pre-generation (not rate limited, API key required).
+    Queries are embedded and searched as one batch; answers are generated with
+    bounded concurrency and streamed back as JSON Lines in completion order.
+    """
+    prompts = [prompt for prompt in batch_request.user_prompts if prompt and prompt.strip()]
+    if not prompts:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="user_prompts cannot be empty")
+    if len(prompts) > BATCH_MAX_QUERIES:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Too many prompts (max {BATCH_MAX_QUERIES} per batch)"
+        )
+    if any(len(prompt) > 5000 for prompt in prompts):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="user_prompt too long (max 5000 characters)")
+
+    concurrency = min(batch_request.concurrency or BATCH_CONCURRENCY, BATCH_CONCURRENCY)
+    # Sync generator: Starlette iterates it in the threadpool, writing each line as it completes
+    return StreamingResponse(run_batch_jsonl(prompts, concurrency), media_type="application/x-ndjson")
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
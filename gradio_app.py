@@ -1,49 +1,91 @@
+import os
 import gradio as gr
-import requests
-import json
+import httpx
 
 # API endpoint configuration
-API_URL = "http://localhost:8000/chat_response"
+API_BASE_URL = os.getenv("API_BASE_URL", "http://localhost:8000")
+API_URL = f"{API_BASE_URL}/chat_response"
+STREAM_URL = f"{API_BASE_URL}/chat_stream"
 
-def chat_with_api(user_input, chat_history):
+# Concurrent chats handled by the UI (Gradio queue) and queued requests beyond that
+GRADIO_CONCURRENCY = int(os.getenv("GRADIO_CONCURRENCY", "16"))
+GRADIO_MAX_QUEUE = int(os.getenv("GRADIO_MAX_QUEUE", "64"))
+
+# One pooled client for all chats: keep-alive connections to the API are reused
+_client = None
+
+def get_client():
+    """Returns the shared AsyncClient, creating it on first use (inside Gradio's event loop)."""
+    global _client
+    if _client is None:
+        _client = httpx.AsyncClient(
+            timeout=httpx.Timeout(60.0, connect=5.0),
+            limits=httpx.Limits(
+                max_connections=GRADIO_CONCURRENCY,
+                max_keepalive_connections=GRADIO_CONCURRENCY,
+                keepalive_expiry=60.0,
+            ),
+        )
+    return _client
+
+async def post_chat(user_input, session_id):
+    """Non-streaming fallback for API versions without /chat_stream."""
+    response = await get_client().post(API_URL, json={"user_prompt": user_input, "session_id": session_id})
+    if response.status_code != 200:
+        return f"❌ Error: API returned status code {response.status_code}", session_id
+    data = response.json()
+    return data.get("response", "No response received from API"), data.get("session_id", session_id)
+
+async def chat_with_api(user_input, chat_history, session_id):
     """
-    Sends user input to the FastAPI backend and returns the response.
+    Sends user input to the FastAPI backend and streams the response into the chat.
     
     Args:
         user_input: The user's message
         chat_history: List of [user_msg, bot_msg] pairs
+        session_id: Server-side session of this chat (None starts a new one)
         
-    Returns:
-        Tuple of (empty_string, updated_chat_history)
+    Yields:
+        Tuples of (empty_string, updated_chat_history, session_id) as the answer grows
     """
     if not user_input.strip():
-        return "", chat_history
-    
+        yield "", chat_history, session_id
+        return
+
+    chat_history = list(chat_history or [])
+    chat_history.append((user_input, ""))
+    bot_response = ""
+
     try:
-        # Call the FastAPI endpoint
-        response = requests.post(
-            API_URL,
-            json={"user_prompt": user_input},
-            headers={"Content-Type": "application/json"},
-            timeout=30
-        )
-        
-        if response.status_code == 200:
-            data = response.json()
-            bot_response = data.get("response", "No response received from API")
-        else:
-            bot_response = f"❌ Error: API returned status code {response.status_code}"
-            
-    except requests.exceptions.ConnectionError:
-        bot_response = "❌ Error: Could not connect to API. Make sure the API server is running on http://localhost:8000"
-    except requests.exceptions.Timeout:
+        # Stream the answer; the server keeps the conversation history
+        async with get_client().stream(
+            "POST", STREAM_URL, json={"user_prompt": user_input, "session_id": session_id}
+        ) as response:
+            if response.status_code == 404:
+                bot_response, session_id = await post_chat(user_input, session_id)
+            elif response.status_code == 503:
+                retry_after = response.headers.get("Retry-After", "a few")
+                bot_response = f"⏳ The assistant is busy right now. Please try again in {retry_after} seconds."
+            elif response.status_code != 200:
+                bot_response = f"❌ Error: API returned status code {response.status_code}"
+            else:
+                session_id = response.headers.get("X-Session-ID", session_id)
+                async for chunk in response.aiter_text():
+                    bot_response += chunk
+                    chat_history[-1] = (user_input, bot_response)
+                    yield "", chat_history, session_id
+                if not bot_response:
+                    bot_response = "No response received from API"
+
+    except httpx.ConnectError:
+        bot_response = f"❌ Error: Could not connect to API. Make sure the API server is running on {API_BASE_URL}"
+    except httpx.TimeoutException:
         bot_response = "❌ Error: Request timed out. Please try again."
     except Exception as e:
         bot_response = f"❌ Error: {str(e)}"
-    
-    # Append to chat history
-    chat_history.append((user_input, bot_response))
-    return "", chat_history
+
+    chat_history[-1] = (user_input, bot_response)
+    yield "", chat_history, session_id
 
 # Create Gradio interface
 with gr.Blocks(title="Neckarmedia Chatbot", theme=gr.themes.Soft()) as demo:
@@ -53,7 +95,7 @@ with gr.Blocks(title="Neckarmedia Chatbot", theme=gr.themes.Soft()) as demo:
         
         Ask me anything about Neckarmedia - services, employees, blog articles, job openings, and more!
         
-        **Note:** Make sure the API server is running on `http://localhost:8000` before using this interface.
+        **Note:** Make sure the API server is running (default `http://localhost:8000`, set `API_BASE_URL` otherwise) before using this interface.
         """
     )
     
@@ -74,6 +116,7 @@ with gr.Blocks(title="Neckarmedia Chatbot", theme=gr.themes.Soft()) as demo:
                 submit_btn = gr.Button("Send", scale=1, variant="primary")
             
             clear = gr.Button("Clear Chat", variant="secondary")
+            session_id = gr.State(None)
     
     gr.Markdown(
         """
@@ -87,9 +130,12 @@ with gr.Blocks(title="Neckarmedia Chatbot", theme=gr.themes.Soft()) as demo:
     )
     
     # Event handlers
-    msg.submit(chat_with_api, [msg, chatbot], [msg, chatbot])
-    submit_btn.click(chat_with_api, [msg, chatbot], [msg, chatbot])
-    clear.click(lambda: None, None, chatbot, queue=False)
+    msg.submit(chat_with_api, [msg, chatbot, session_id], [msg, chatbot, session_id])
+    submit_btn.click(chat_with_api, [msg, chatbot, session_id], [msg, chatbot, session_id])
+    clear.click(lambda: (None, None), None, [chatbot, session_id], queue=False)
+
+# Async handlers: concurrent chats wait on the API, not on a worker thread each
+demo.queue(default_concurrency_limit=GRADIO_CONCURRENCY, max_size=GRADIO_MAX_QUEUE)
 
 if __name__ == "__main__":
     demo.launch(
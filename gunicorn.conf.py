@@ -0,0 +1,49 @@
+# Production server: gunicorn master + uvicorn workers
+#   gunicorn -c gunicorn.conf.py api:app
+#
+# The app (torch, sentence-transformers, langchain, MiniLM) and the knowledge
+# snapshot are loaded once in the master and shared copy-on-write with the
+# forked workers, instead of every worker importing and loading them itself.
+import gc
+import os
+
+CPU_COUNT = os.cpu_count() or 1
+MAX_WORKERS = int(os.getenv("GUNICORN_MAX_WORKERS", "4"))
+
+bind = f"0.0.0.0:{os.getenv('PORT', '8000')}"
+worker_class = "uvicorn_worker.UvicornWorker"
+
+# Workers are async, so a few are enough; at least two so recycling one never
+# leaves the server without a listener
+workers = int(os.getenv("WEB_CONCURRENCY") or max(2, min(CPU_COUNT, MAX_WORKERS)))
+# Read by services/embedder.py at import time: torch threads = cores / workers
+os.environ["WEB_CONCURRENCY"] = str(workers)
+
+preload_app = True
+
+# Graceful recycling: a worker exits after finishing in-flight requests once it
+# has served max_requests (+ jitter, so they don't all restart at once)
+max_requests = int(os.getenv("GUNICORN_MAX_REQUESTS", "1000"))
+max_requests_jitter = int(os.getenv("GUNICORN_MAX_REQUESTS_JITTER", "100"))
+graceful_timeout = int(os.getenv("GUNICORN_GRACEFUL_TIMEOUT", "30"))
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "120"))
+keepalive = 5
+
+accesslog = "-"
+errorlog = "-"
+
+
+def when_ready(server):
+    """Runs in the master after the app is imported and before any worker is forked."""
+    from services import knowledge
+    snapshot = knowledge.preload_snapshot()
+    server.log.info(f"Knowledge snapshot preloaded: {len(snapshot.articles)} articles; {workers} workers")
+    # Move everything loaded so far out of the garbage collector's reach, so
+    # collections in the workers don't write to (and un-share) these pages
+    gc.freeze()
+
+
+def post_fork(server, worker):
+    # torch's OpenMP threads don't survive the fork; re-apply the per-worker cap
+    from services.embedder import set_torch_threads
+    set_torch_threads()
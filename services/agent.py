@@ -1,16 +1,30 @@
-import json
 import os
+import re
 import requests
 from bs4 import BeautifulSoup
 import gradio as gr
 from langchain_openai import OpenAI
-from openai import OpenAI as OAI
+from openai import OpenAI as OAI, APIStatusError
 from langchain.tools import Tool
 from langchain.prompts import PromptTemplate
 from sentence_transformers import SentenceTransformer
 from dotenv import load_dotenv
 import sqlite3
-import numpy as np
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from services.knowledge import DB_PATH, get_snapshot
+from services.context_budget import CONTEXT_TOKEN_BUDGET, count_tokens, fit_to_budget, prepare_items
+from services.cache import TTLCache
+from services.embedder import EmbeddingWorker, set_torch_threads
+from services.fast_path import fast_path
+from services.job_index import job_index
+from services.upstream import UPSTREAM_MAX_CONCURRENCY, UpstreamManager, UpstreamUnavailable
+from services import model_tiers
+from services.ranking import rank_articles, vector_scores
+from services.sessions import session_store
+from services import metrics
+from services.logs import get_logger, log_event, log_payload, setup_logging
 
 #TODO - Implement the tool selection logic for agent search blog articles with the new standardized keywords. 
 # Use standardized keywords to cluster articles such as testimonials, case studies, employee stories, workshops
@@ -19,39 +33,77 @@ import numpy as np
 env_path = os.path.join(os.path.dirname(__file__), '.env')
 print(f"Loading .env file from: {env_path}")
 load_dotenv(dotenv_path=env_path)
+setup_logging()
+log = get_logger("agent")
 openai_api_key = os.getenv("OPENAI_API_KEY")
 if openai_api_key:
     openai_api_key = openai_api_key.strip()  # Remove any whitespace/newlines
     print(f"✅ OpenAI API Key loaded: {openai_api_key[:20]}...{openai_api_key[-4:]}")
-client = OAI(api_key=openai_api_key)
+# Explicit deadlines for upstream LLM calls, below the proxy's 60 s read timeout
+ROUTING_MODEL = os.getenv("ROUTING_MODEL", "gpt-3.5-turbo-instruct")
+ROUTING_TIMEOUT_SECONDS = float(os.getenv("ROUTING_TIMEOUT_SECONDS", "10"))
+GENERATION_TIMEOUT_SECONDS = float(os.getenv("GENERATION_TIMEOUT_SECONDS", "45"))
+client = OAI(api_key=openai_api_key, timeout=GENERATION_TIMEOUT_SECONDS, max_retries=0)
 
-# Database path relative to project root (one level up from services/)
-PROJECT_ROOT = os.path.dirname(os.path.dirname(__file__))
-DB_PATH = os.path.join(PROJECT_ROOT, "neckarmedia.db")
+# Concurrency limits and circuit breakers, one per kind of LLM call
+routing_upstream = UpstreamManager("routing", float(os.getenv("ROUTING_MAX_P95_SECONDS", "5")))
+generation_upstream = UpstreamManager("generation", float(os.getenv("GENERATION_MAX_P95_SECONDS", "30")))
+
+# Last good answers to first-turn questions, served when the LLM is unavailable
+ANSWER_CACHE_TTL = int(os.getenv("ANSWER_CACHE_TTL", "86400"))
+answer_cache = TTLCache("answers", maxsize=int(os.getenv("ANSWER_CACHE_SIZE", "1024")), ttl=ANSWER_CACHE_TTL)
+
+set_torch_threads()
 model = SentenceTransformer("all-MiniLM-L6-v2")
+# Concurrent requests' query embeddings are micro-batched on one thread
+embedder = EmbeddingWorker(model)
 STANDARDIZED_KEYWORDS = []
 
+# Job listings change rarely; don't scrape the careers page on every question
+JOBS_CACHE_TTL = int(os.getenv("JOBS_CACHE_TTL", "600"))
+jobs_cache = TTLCache("jobs", maxsize=4, ttl=JOBS_CACHE_TTL)
+
+# Blog/document search results per (snapshot version, normalized query); a reload starts fresh
+RETRIEVAL_CACHE_TTL = int(os.getenv("RETRIEVAL_CACHE_TTL", "3600"))
+retrieval_cache = TTLCache("retrieval", maxsize=int(os.getenv("RETRIEVAL_CACHE_SIZE", "1024")), ttl=RETRIEVAL_CACHE_TTL)
+# Warm-up also regenerates answers for the top queries (costs one LLM call per query)
+WARMUP_ANSWERS = os.getenv("WARMUP_ANSWERS", "false").lower() == "true"
+
+# Tools selected for one query run concurrently; each gets its own deadline, counted from when a
+# worker starts it. The pool has room for every selected tool of TOOL_CONCURRENT_REQUESTS requests
+# at once, so tools rarely queue; one that can't start within TOOL_QUEUE_TIMEOUT_SECONDS is
+# cancelled instead of silently eating its own deadline.
+MAX_SELECTED_TOOLS = 3
+TOOL_CONCURRENT_REQUESTS = int(os.getenv("TOOL_CONCURRENT_REQUESTS", str(UPSTREAM_MAX_CONCURRENCY)))
+TOOL_WORKERS = int(os.getenv("TOOL_WORKERS", str(MAX_SELECTED_TOOLS * TOOL_CONCURRENT_REQUESTS)))
+TOOL_TIMEOUT_SECONDS = float(os.getenv("TOOL_TIMEOUT_SECONDS", "3"))
+JOBS_TOOL_TIMEOUT_SECONDS = float(os.getenv("JOBS_TOOL_TIMEOUT_SECONDS", "10"))
+TOOL_QUEUE_TIMEOUT_SECONDS = float(os.getenv("TOOL_QUEUE_TIMEOUT_SECONDS", "2"))
+tool_executor = ThreadPoolExecutor(max_workers=TOOL_WORKERS, thread_name_prefix="tool")
+
+# Local tools started while the router is still deciding; results the router doesn't pick are discarded.
+# They get their own small pool and never queue: with every slot busy, a query just skips speculation.
+SPECULATIVE_RETRIEVAL = os.getenv("SPECULATIVE_RETRIEVAL", "true").lower() == "true"
+SPECULATIVE_TOOLS = [t.strip() for t in os.getenv("SPECULATIVE_TOOLS", "Company References (SQLite)").split(",") if t.strip()]
+SPECULATIVE_WORKERS = int(os.getenv("SPECULATIVE_WORKERS", "4"))
+speculative_executor = ThreadPoolExecutor(max_workers=SPECULATIVE_WORKERS, thread_name_prefix="speculative")
+speculative_slots = threading.BoundedSemaphore(SPECULATIVE_WORKERS)
+
+NO_ARTICLES = {"message": "No relevant blog articles found."}
+
 def connect_db():
     """Connect to SQLite database."""
     return sqlite3.connect(DB_PATH)
 
-def load_services():
-    """Loads service descriptions from the JSON file."""
-    services_path = os.path.join(PROJECT_ROOT, "data/services.json")
-    with open(services_path, "r", encoding="utf-8") as f:
-        return json.load(f)
-
-SERVICES_DATA = load_services()
-
 def scrape_job_offerings(url="https://www.neckarmedia.com/karriere"):
     """Scrapes job listings from Neckarmedia's careers page and returns structured data."""
     
     try:
         # 🌍 Fetch the webpage with a User-Agent to avoid bot blocks
-        response = requests.get(url, headers={"User-Agent": "Mozilla/5.0"})
+        response = requests.get(url, headers={"User-Agent": "Mozilla/5.0"}, timeout=10)
         
         if response.status_code != 200:
-            print(f"❌ Failed to retrieve page. Status code: {response.status_code}")
+            log.warning("jobs.scrape_failed", extra={"status": response.status_code})
             return []
 
         soup = BeautifulSoup(response.text, "html.parser")
@@ -86,204 +138,640 @@ def scrape_job_offerings(url="https://www.neckarmedia.com/karriere"):
                     })
 
             except Exception as e:
-                print(f"⚠️ Error processing job section: {e}")
+                log.warning("jobs.section_failed", extra={"error": str(e)})
 
         return jobs if jobs else [{"error": "No valid job listings found."}]
 
     except Exception as e:
-        print(f"🔥 Critical error scraping jobs: {e}")
+        log.exception("jobs.scrape_error")
         return [{"error": "Failed to scrape job listings due to an unexpected issue."}]
 
-def query_vector_search(user_query, top_k=3):
-    """Finds most relevant articles using vector similarity."""
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
+def get_job_offerings():
+    """Returns job listings from the cache, scraping (and embedding) the careers page when it's stale."""
+    return jobs_cache.get_or_set(
+        "jobs",
+        lambda: job_index.build(scrape_job_offerings(), encode_queries),
+        should_cache=lambda jobs: bool(jobs) and not any("error" in job for job in jobs)
+    )
 
-    # Compute embedding for the user query
-    query_embedding = model.encode(user_query).tolist()
+def select_job_offerings(user_query):
+    """Only the postings a question is about, or a compact title list for general job questions."""
+    return job_index.select(user_query, get_job_offerings(), encode_queries)
 
-    cursor.execute("SELECT title, summary, source_url, embedding FROM blog_articles")
-    articles = cursor.fetchall()
+def encode_queries(queries):
+    """Embeds queries via the micro-batching embedder; rows are L2-normalized float32."""
+    return embedder.encode(list(queries))
 
-    # Compute cosine similarity
-    scores = []
-    for title, summary, source_url, embedding in articles:
-        article_embedding = json.loads(embedding)
-        similarity = np.dot(query_embedding, article_embedding) / (np.linalg.norm(query_embedding) * np.linalg.norm(article_embedding))
-        scores.append((similarity, title, summary, source_url))
+def query_vector_search(user_query, top_k=3, snapshot=None):
+    """Finds the most relevant blog articles and document chunks using vector similarity."""
+    snapshot = snapshot or get_snapshot()
+    if not snapshot.articles:
+        return []
+    return rank_articles(user_query, snapshot, top_k,
+                         lambda: vector_scores(encode_queries([user_query])[0], snapshot, top_k))
 
-    conn.close()
+def search_articles_batch(queries, query_embeddings, top_k=3, snapshot=None):
+    """Vector search for many queries at once: one matrix product for the whole batch.
 
-    # Sort and return top-k matches
-    scores.sort(reverse=True, key=lambda x: x[0])
-    return [{"title": x[1], "summary": x[2], "source_url": x[3]} for x in scores[:top_k]]
+    Ranks exactly like agent_search_blog_articles (same intents, recency
+    weights and compressed index), so batch runs see the production context.
+    """
+    snapshot = snapshot or get_snapshot()
+    if not snapshot.articles:
+        return [[NO_ARTICLES] for _ in queries]
 
-def agent_search_blog_articles(user_query):
+    scores = vector_scores(query_embeddings, snapshot, top_k)  # (n_queries, n_chunks)
+    return [rank_articles(query, snapshot, top_k, lambda row=row: row) or [NO_ARTICLES]
+            for query, row in zip(queries, scores)]
+
+def agent_search_blog_articles(user_query, snapshot=None):
     """Performs hybrid retrieval using vector search and FTS5."""
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
+    snapshot = snapshot or get_snapshot()
+    return retrieval_cache.get_or_set(
+        (snapshot.version, normalize_query(user_query)),
+        lambda: query_vector_search(user_query, snapshot=snapshot) or [NO_ARTICLES]
+    )
 
-    # 1️⃣ - **Vector Search**
-    vector_results = query_vector_search(user_query)
-    if vector_results:
-        return vector_results
-    
-    conn.close()
-    return [{"message": "No relevant blog articles found."}]
+def source_ids(articles):
+    """Identifiers of retrieved articles/documents for the query log: URL, or title for files."""
+    return [article.get("source_url") or article.get("title") for article in articles if "message" not in article]
 
 
-def get_latest_info():
+def get_latest_info(snapshot=None):
     """Retrieves structured employee/founder data from latest_info.json."""
-    
-    json_path = "data/latest_info.json"  # Ensure the correct relative path
-
-    # ✅ Check if the file exists
-    if not os.path.exists(json_path):
-        print(f"❌ Error: JSON file not found at {json_path}")
-        return {"error": "Employee data file is missing."}
-
-    try:
-        with open(json_path, "r", encoding="utf-8") as f:
-            latest_data = json.load(f)
-        
-        print(f"📂 Loaded JSON successfully: {json_path}")
-        print(f"🔎 JSON Contents: {latest_data}")
+    snapshot = snapshot or get_snapshot()
 
-        # ✅ Send the entire JSON content to GPT
-        return latest_data
+    # ✅ Send the entire JSON content to GPT
+    return snapshot.latest_info
 
-    except json.JSONDecodeError as e:
-        print(f"❌ JSON decoding error: {e}")
-        return {"error": "Failed to parse employee data."}
-
-    except Exception as e:
-        print(f"❌ Unexpected error: {e}")
-        return {"error": "An unexpected issue occurred while loading employee data."}
-
-def get_service_description():
+def get_service_description(snapshot=None):
     """Retrieves a service description using fuzzy matching."""
-    return json.dumps(SERVICES_DATA, indent=2)
+    snapshot = snapshot or get_snapshot()
+    return snapshot.services_context
 
 tools = [
     Tool(name="Founder/Employee Info", func=get_latest_info, description="Use this for questions about employees and founders."),
     Tool(name="Company References and Blog(SQLite)", func=agent_search_blog_articles, description="Use this for company knowledge, blog posts, and references."),
-    Tool(name="Jobs Scraper", func=scrape_job_offerings, description="Use this to fetch live job listings."),
+    Tool(name="Jobs Scraper", func=get_job_offerings, description="Use this to fetch live job listings."),
     Tool(name="Service Offerings", func=get_service_description, description="Use this to fetch company services, workflow or FAQs."),
 ]
 
-def decide_tool_to_use(user_prompt):
-    """Uses an LLM to decide the best tool based on the user's query."""
+VALID_TOOLS = (
+    "Founder/Employee Info",
+    "Company References (SQLite)",
+    "Jobs Scraper",
+    "Service Offerings",
+)
+
+def decide_tools_to_use(user_prompt):
+    """Uses an LLM to decide which tools (one or more) are needed for the user's query."""
     decision_prompt = PromptTemplate(
         input_variables=["user_prompt"],
         template="""
-        You are a helpful AI assistant that decides which tool to use for answering a query. 
+        You are a helpful AI assistant that decides which tools to use for answering a query. 
         You have the following tools available:
 
         1. "Founder/Employee Info" - for questions about specific employees or founders.
-        2. "Company References (SQLite)" - for general company knowledge, services, articles, and references.
+        2. "Company References (SQLite)" - for general company knowledge, blog articles, internal documents, and references.
         3. "Jobs Scraper" - for job postings and job requirements.
         4. "Service Offerings" - Use this if the user asks about what services Neckarmedia provides, workflow or FAQs.
 
-        Based on the following user query, choose the most relevant tool:
+        Based on the following user query, choose the most relevant tool. If the query clearly
+        asks about several of these topics, choose every tool that is needed (at most 3).
         
         User Query: {user_prompt}
 
-        Respond with ONLY the tool name in exact wording.
+        Respond with ONLY the tool names in exact wording, separated by commas, most relevant first.
         """
     )
 
-    llm = OpenAI(temperature=0.2, api_key=openai_api_key)
-    response = llm.invoke(decision_prompt.format(user_prompt=user_prompt))
+    llm = OpenAI(model=ROUTING_MODEL, temperature=0.2, api_key=openai_api_key,
+                 timeout=ROUTING_TIMEOUT_SECONDS, max_retries=1)
+    response = routing_upstream.call(llm.invoke, decision_prompt.format(user_prompt=user_prompt))
+    log.debug("routing.output", extra={"output": response.strip()})
 
-    selected_tool = response.strip().replace('"', '').replace("'", "")  # Remove quotes if present
-    print(f"🔎 Tool decision output: {selected_tool}")
+    # ✅ Keep only exact tool names, in the order given, without duplicates
+    selected_tools = []
+    for name in response.replace("\n", ",").split(","):
+        name = name.strip().replace('"', '').replace("'", "")  # Remove quotes if present
+        if name in VALID_TOOLS and name not in selected_tools:
+            selected_tools.append(name)
+        elif name:
+            log.warning("routing.invalid_tool", extra={"tool": name})
 
-    # ✅ Ensure the tool name matches exactly
-    valid_tools = {
-        "Founder/Employee Info",
-        "Company References (SQLite)",
-        "Jobs Scraper",
-        "Service Offerings"
-    }
+    return selected_tools[:MAX_SELECTED_TOOLS]
 
-    if selected_tool in valid_tools:
-        return selected_tool
-    else:
-        print(f"❌ Invalid tool selection: {selected_tool} (Check LLM output)")
-        return None 
-    
-def generate_chat_response(user_query):
-    """Handles tool selection and retrieves the appropriate response."""
-    print(f"\n🤖 Received user query: {user_query}")
+def tool_context_items(tool, user_query, snapshot, retrieved_articles=None):
+    """Runs one tool and returns (context items, whether they are already ranked, retrieved source ids).
 
-    selected_tool = decide_tool_to_use(user_query)
-    print(f"🔧 Selected tool: {selected_tool}")
-    
+    ``retrieved_articles`` are blog results computed ahead of time (e.g. for a
+    whole batch), used instead of running the vector search again.
+    """
+    # Static sources come with pre-tokenized items from the snapshot; live
+    # results are split per element, already ranked by the tool
+    if tool == "Service Offerings":
+        return snapshot.services_items, False, []
+    if tool == "Founder/Employee Info":
+        return snapshot.latest_info_items, False, []
+    if tool == "Company References (SQLite)":
+        articles = retrieved_articles or agent_search_blog_articles(user_query, snapshot)
+        return prepare_items(articles, "article"), True, source_ids(articles)
+    if tool == "Jobs Scraper":
+        return prepare_items(select_job_offerings(user_query), "job"), True, []
+    raise ValueError(f"Unknown tool: {tool}")
+
+def _timed_tool(tool, user_query, snapshot, retrieved_articles):
+    started = time.perf_counter()
+    try:
+        return tool_context_items(tool, user_query, snapshot, retrieved_articles)
+    finally:
+        metrics.observe(f"tool.{tool}.ms", (time.perf_counter() - started) * 1000)
 
+class ToolRun:
+    """One tool call on the tool pool, with a deadline that starts when a worker picks it up.
 
-    if selected_tool == "Service Offerings":
-        tool_output = get_service_description()
-    elif selected_tool == "Founder/Employee Info":
-        tool_output = get_latest_info()
-    elif selected_tool == "Company References (SQLite)":
-        tool_output = agent_search_blog_articles(user_query)
-    elif selected_tool == "Jobs Scraper":
-        tool_output = scrape_job_offerings()
-    else:
-        print(f"❌ No matching tool found for: {user_query}")
-        return "I couldn't determine the best source for your query."
+    Time spent queued behind other requests' tools is recorded separately
+    (``tool.queue_wait_ms``) and bounded by TOOL_QUEUE_TIMEOUT_SECONDS; a
+    tool still queued by then is cancelled, which frees its place.
+    """
 
-    print(f"📜 Retrieved tool output (first 500 chars):\n{str(tool_output)[:500]}...")
+    def __init__(self, tool, user_query, snapshot, retrieved_articles=None, executor=None):
+        self.tool = tool
+        self.timeout = JOBS_TOOL_TIMEOUT_SECONDS if tool == "Jobs Scraper" else TOOL_TIMEOUT_SECONDS
+        self.submitted_at = time.monotonic()
+        self.started_at = None
+        self._started = threading.Event()
+        self.future = (executor or tool_executor).submit(self._run, user_query, snapshot, retrieved_articles)
+
+    def _queue_timeout(self):
+        metrics.incr("tool.queue_timeouts")
+        return FutureTimeoutError(f"{self.tool} waited over {TOOL_QUEUE_TIMEOUT_SECONDS}s for a worker")
+
+    def _run(self, user_query, snapshot, retrieved_articles):
+        self.started_at = time.monotonic()
+        self._started.set()
+        waited = self.started_at - self.submitted_at
+        metrics.observe("tool.queue_wait_ms", waited * 1000)
+        if waited > TOOL_QUEUE_TIMEOUT_SECONDS:
+            raise self._queue_timeout()  # too late to be used: give the worker back right away
+        return _timed_tool(self.tool, user_query, snapshot, retrieved_articles)
+
+    def result(self):
+        """The tool's output; raises FutureTimeoutError if it didn't start in time or ran past its timeout."""
+        queue_left = self.submitted_at + TOOL_QUEUE_TIMEOUT_SECONDS - time.monotonic()
+        if not self._started.wait(max(0.0, queue_left)):
+            if self.future.cancel():
+                raise self._queue_timeout()
+            self._started.wait()  # a worker picked it up just now
+        return self.future.result(timeout=max(0.0, self.started_at + self.timeout - time.monotonic()))
+
+def start_speculative_tools(user_query, snapshot, retrieved_articles=None):
+    """Starts the cheap local tools before routing has decided, if a speculative slot is free; returns {tool: ToolRun}."""
+    if not SPECULATIVE_RETRIEVAL:
+        return {}
+    runs = {}
+    for tool in SPECULATIVE_TOOLS:
+        if tool == "Company References (SQLite)" and retrieved_articles:
+            continue
+        if not speculative_slots.acquire(blocking=False):
+            metrics.incr("speculative.skipped")  # all busy: the tool runs normally if routing picks it
+            continue
+        runs[tool] = ToolRun(tool, user_query, snapshot, retrieved_articles, executor=speculative_executor)
+        runs[tool].future.add_done_callback(lambda f: speculative_slots.release())
+    return runs
+
+def discard_speculative_tools(runs, selected_tools=()):
+    """Cancels (or, if already running, lets finish and drops) the tools routing didn't pick."""
+    for tool, run in runs.items():
+        if tool in selected_tools:
+            continue
+        if run.future.cancel():
+            metrics.incr("speculative.cancelled")
+        else:
+            metrics.incr("speculative.wasted")
+            run.future.add_done_callback(
+                lambda f, run=run: metrics.observe("speculative.wasted_ms", (time.monotonic() - run.submitted_at) * 1000)
+            )
 
-    context_text = tool_output if isinstance(tool_output, str) else json.dumps(tool_output, indent=2)
+def run_tools(selected_tools, user_query, snapshot, retrieved_articles=None, started_tools=None):
+    """Runs the selected tools concurrently and returns {tool: (items, ranked, source ids)}.
 
-    system_prompt = f"""
-    You are an employee of Neckarmedia, a creative and marketing agency. Answer questions informally,
-    as if you were a real team member. Use the following context to provide responses. 
-    If you don't know the answer, don't just say 'I don't know' – instead, direct the user to visit Neckarmedia's website or contact the team for more details. Feel free to add humor or ask follow-up questions
-    Use the following structured data as context to generate informative answers.
+    Every tool has its own deadline counted from when it starts running, so
+    the wait is bounded by the slowest tool (or its timeout), not the sum.
+    Tools that fail or time out are left out of the answer. ``started_tools``
+    are ToolRuns already under way (speculative retrieval); they are reused.
+    """
+    started_tools = started_tools or {}
+    runs = {}
+    for tool in selected_tools:
+        if tool in started_tools:
+            runs[tool] = started_tools[tool]
+            metrics.incr("speculative.hits" if runs[tool].future.done() else "speculative.in_progress")
+        else:
+            runs[tool] = ToolRun(tool, user_query, snapshot, retrieved_articles)
+
+    outputs = {}
+    for tool, run in runs.items():
+        try:
+            outputs[tool] = run.result()
+        except FutureTimeoutError:
+            metrics.incr("tool.timeouts")
+            queue_ms = ((run.started_at or time.monotonic()) - run.submitted_at) * 1000
+            log.warning("tool.timeout", extra={"tool": tool, "timeout_s": run.timeout, "queue_ms": round(queue_ms, 1)})
+        except Exception as e:
+            metrics.incr("tool.errors")
+            log.warning("tool.error", extra={"tool": tool, "error": str(e)})
+    return outputs
+
+def merge_tool_context(outputs, user_query, budget=CONTEXT_TOKEN_BUDGET):
+    """Fits all tool outputs into one shared token budget.
+
+    Each tool gets an equal share of what is left; whatever a tool doesn't
+    use rolls over to the tools after it.
+    """
+    if len(outputs) == 1:
+        (items, ranked, _), = outputs.values()
+        return fit_to_budget(items, user_query, budget, ranked=ranked)
+
+    sections, remaining = [], budget
+    for index, (tool, (items, ranked, _)) in enumerate(outputs.items()):
+        header = f"### {tool}"
+        overhead = count_tokens(header) + 2  # header line break and the blank line between sections
+        share = remaining // (len(outputs) - index) - overhead
+        section = fit_to_budget(items, user_query, max(share, 0), ranked=ranked)
+        remaining -= count_tokens(section) + overhead
+        sections.append(f"{header}\n{section}")
+    return "\n\n".join(sections)
+    
+NO_TOOL_ANSWER = "I couldn't determine the best source for your query."
+UNSURE_ANSWER = (
+    "I'm not entirely sure, but you can check out Neckarmedia’s website for more details. "
+    "\n\n👉 [Neckarmedia Website](https://neckarmedia.com)"
+)
+ERROR_ANSWER = "I'm currently unable to process your request. Please try again later."
+# Appended when a streamed answer breaks off after part of it was sent
+INTERRUPTED_NOTE = "\n\n⚠️ The answer was interrupted. Please try again."
+BUSY_ANSWER = "I'm getting a lot of questions right now. Please try again in a moment."
+
+SYSTEM_INSTRUCTIONS = """You are an employee of Neckarmedia, a creative and marketing agency. Answer questions informally,
+as if you were a real team member. Use the context provided in the next message to provide responses.
+If you don't know the answer, don't just say 'I don't know' – instead, direct the user to visit Neckarmedia's website or contact the team for more details. Feel free to add humor or ask follow-up questions.
+Use the structured data in the context to generate informative answers.
+If the requested information is unavailable, direct users to Neckarmedia's official website https://www.neckarmedia.com.
+Keep responses professional, well-structured, and concise."""
+
+# Short follow-ups that refer back to the previous answer reuse its tools and context
+FOLLOW_UP_MAX_WORDS = 8
+# Explicit cues only: a query that opens like a continuation ("and ...?", "what about ...?"), or one
+# that is nothing but a referring pronoun and question words ("what does that cost?", "wie lange
+# dauert das?"). Formal "Sie", "ihr", "there" and articles are routine in standalone questions.
+FOLLOW_UP_OPENERS = (
+    ("and",), ("und",), ("what", "about"), ("how", "about"), ("was", "ist", "mit"), ("wie", "ist", "es", "mit"),
+    ("wie", "sieht", "es", "mit"), ("und", "was"),
+)
+FOLLOW_UP_PRONOUNS = {
+    "it", "its", "that", "this", "these", "those", "they", "them", "he", "him", "she", "her",
+    "das", "dies", "diese", "dieser", "dieses", "es", "er", "ihn", "ihm", "davon", "dafür", "dazu", "damit", "darüber",
+}
+# Words that carry no topic of their own, so a pronoun among only these must refer back
+FOLLOW_UP_FILLER = {
+    "what", "s", "how", "much", "many", "long", "when", "where", "who", "which", "why", "does", "do", "did",
+    "is", "are", "was", "were", "can", "could", "would", "will", "should", "a", "an", "the", "of", "for", "to",
+    "in", "on", "with", "about", "me", "you", "us", "we", "i", "more", "else", "exactly", "again", "please",
+    "cost", "costs", "take", "takes", "mean", "means", "include", "includes", "work", "works", "tell", "explain",
+    "price", "details",
+    "wie", "viel", "viele", "lange", "wann", "wo", "wer", "welche", "welcher", "warum", "wieso", "ist", "sind",
+    "war", "kann", "können", "kostet", "kosten", "dauert", "dauern", "bedeutet", "heißt", "gibt", "geht", "macht",
+    "machen", "funktioniert", "genau", "noch", "mehr", "mir", "uns", "ein", "eine", "der", "die", "den", "dem",
+    "für", "zu", "über", "mit", "bei", "im", "in", "bitte", "erklär", "erkläre", "erzähl", "erzähle", "preis",
+}
+# Continue GPT conversations server-side via previous_response_id instead of resending history
+SESSION_RESPONSE_CHAINING = os.getenv("SESSION_RESPONSE_CHAINING", "true").lower() == "true"
+# Statuses for an expired/unknown previous_response_id, answered by resending the history
+CHAIN_FALLBACK_STATUSES = (400, 404)
+
+class ChatPlan:
+    """Everything decided before the GPT call: tools, context and how to send them."""
+
+    def __init__(self, user_query, tools=(), context=None, fallback=None,
+                 reused_context=False, previous_response_id=None, sources=()):
+        self.user_query = user_query
+        self.tools = list(tools)
+        self.context = context
+        self.sources = list(sources)
+        self.fallback = fallback
+        self.reused_context = reused_context
+        self.previous_response_id = previous_response_id
+        self.tier, self.complexity = model_tiers.LARGE, None
+        if context is not None:
+            self.tier, self.complexity = model_tiers.choose_tier(user_query, self.tools, count_tokens(context))
+
+    @property
+    def model(self):
+        return model_tiers.model_for(self.tier)
+
+class ChatTurn:
+    """Result of one pipeline run, with what's needed to continue the conversation."""
+
+    def __init__(self, answer, tools=(), context=None, response_id=None, model=None, sources=(), failed=False):
+        self.answer = answer
+        self.tools = list(tools)
+        self.context = context
+        self.response_id = response_id
+        self.model = model  # None when no LLM wrote the answer
+        self.sources = list(sources)  # ids of the retrieved articles/documents, for the query log
+        self.failed = failed  # cut off mid-stream: not kept in the session, query log or answer cache
+
+def normalize_query(user_query):
+    """Normalizes a query for deduplication: case, surrounding punctuation and whitespace."""
+    return " ".join(user_query.lower().split()).strip(" ?!.,;:")
+
+def is_follow_up(user_query, session):
+    """Heuristic: a short query referring back ("and what does that cost?") to the last turn."""
+    if session is None or not session.last_context:
+        return False
+    words = re.findall(r"\w+", user_query.lower())
+    if not words or len(words) > FOLLOW_UP_MAX_WORDS:
+        return False
+    if any(tuple(words[:len(opener)]) == opener for opener in FOLLOW_UP_OPENERS):
+        return True
+    return (any(word in FOLLOW_UP_PRONOUNS for word in words)
+            and all(word in FOLLOW_UP_PRONOUNS or word in FOLLOW_UP_FILLER for word in words))
+
+def answer_fast_path(user_query, snapshot=None, log_review=True):
+    """Returns a ChatTurn with a canned answer for greetings and known FAQs, or None."""
+    try:
+        match = fast_path.match(user_query, encode_queries, snapshot or get_snapshot(), log=log_review)
+    except Exception as e:
+        log.warning("fast_path.error", extra={"error": str(e)})
+        return None
+    if match is None:
+        return None
+    log_event(log, "fast_path.answer", intent=match.intent, score=round(match.score, 3))
+    return ChatTurn(match.answer)
+
+def is_unsure(answer):
+    """An answer that shouldn't be kept: the model said it doesn't know, or (almost) nothing."""
+    return "I don't know" in answer or len(answer.strip()) < 5
+
+def remember_answer(user_query, session, turn):
+    """Keeps a first-turn answer (it doesn't depend on history) as a fallback."""
+    if (session is None or session.is_new) and turn.answer not in (UNSURE_ANSWER, ERROR_ANSWER):
+        answer_cache.set(normalize_query(user_query), turn.answer)
+
+def cached_answer_turn(user_query):
+    """Returns the last good answer to this question, or None."""
+    answer = answer_cache.get(normalize_query(user_query))
+    if answer is None:
+        return None
+    log.info("answer.cached")
+    metrics.incr("answers.served_cached")
+    return ChatTurn(answer)
+
+def degraded_turn(user_query):
+    """Answer that needs no LLM call (fast path or cached), or None."""
+    return answer_fast_path(user_query) or cached_answer_turn(user_query)
+
+def plan_chat(user_query, snapshot=None, session=None, retrieved_articles=None):
+    """Selects the tools, runs them and builds the context for the GPT call.
+
+    Follow-ups in a session reuse the previous turn's tools and context
+    instead of routing and retrieving again. The plan carries a fallback
+    answer instead if no tool fits the query or none produced output.
+    """
+    previous_response_id = session.last_response_id if session and SESSION_RESPONSE_CHAINING else None
+
+    if is_follow_up(user_query, session):
+        log_event(log, "session.context_reused", tools=session.last_tools)
+        metrics.incr("session.context_reused")
+        return ChatPlan(user_query, session.last_tools, session.last_context, reused_context=True,
+                        previous_response_id=previous_response_id)
 
-    Context:
-    {context_text}
+    # Pin one snapshot for the whole request so a concurrent reload can't mix versions
+    snapshot = snapshot or get_snapshot()
 
-    If the requested information is unavailable, direct users to Neckarmedia's official website https://www.neckarmedia.com.
-    Keep responses professional, well-structured, and concise.
+    # Local retrieval runs while the router LLM is deciding, so its latency is hidden
+    speculative = start_speculative_tools(user_query, snapshot, retrieved_articles)
+    selected_tools = []
+    started = time.perf_counter()
+    try:
+        selected_tools = decide_tools_to_use(user_query)
+    finally:
+        discard_speculative_tools(speculative, selected_tools)
+    log_event(log, "routing.done", tools=selected_tools, ms=round((time.perf_counter() - started) * 1000, 1))
+    if not selected_tools:
+        log.info("routing.no_tool")
+        return ChatPlan(user_query, fallback=NO_TOOL_ANSWER)
+
+    started = time.perf_counter()
+    outputs = run_tools(selected_tools, user_query, snapshot, retrieved_articles, speculative)
+    if not outputs:
+        return ChatPlan(user_query, fallback=ERROR_ANSWER)
+
+    context_text = merge_tool_context(outputs, user_query)
+    sources = [source for _, _, ids in outputs.values() for source in ids]
+    plan = ChatPlan(user_query, list(outputs), context_text, previous_response_id=previous_response_id,
+                    sources=sources)
+    log_event(log, "context.built", tools=plan.tools, ms=round((time.perf_counter() - started) * 1000, 1),
+              context_tokens=count_tokens(context_text), complexity=plan.complexity, tier=plan.tier, model=plan.model)
+    log_payload(log, "context.text", context_text)
+    return plan
+
+def build_chat_messages(plan, session=None, chained=False):
+    """Builds the GPT input for a plan.
+
+    Static instructions come first and byte-identical on every call, so the
+    provider's prompt cache can reuse the prefix; per-request context follows.
+    When chained to the previous response, the instructions, history and a
+    reused context are already on the server and are not sent again.
     """
+    messages = []
+    if not chained:
+        messages.append({"role": "system", "content": SYSTEM_INSTRUCTIONS})
+    if not (chained and plan.reused_context):
+        messages.append({"role": "system", "content": f"Context:\n{plan.context}"})
+    if not chained and session is not None:
+        messages.extend(session.history)
+    messages.append({"role": "user", "content": plan.user_query})
+    return messages
+
+def create_gpt_response(plan, session=None, stream=False):
+    """Calls GPT for a plan, chaining to the previous response when possible."""
+    if plan.previous_response_id:
+        try:
+            return client.responses.create(
+                model=plan.model,
+                input=build_chat_messages(plan, session, chained=True),
+                previous_response_id=plan.previous_response_id,
+                stream=stream,
+                **model_tiers.model_options(plan.tier)
+            )
+        except APIStatusError as e:
+            # Only an expired or unknown previous response is worth resending the history for;
+            # rate limits and server errors go to the caller (and the breaker) unretried
+            if e.status_code not in CHAIN_FALLBACK_STATUSES:
+                raise
+            log.warning("session.chain_failed", extra={"status": e.status_code})
+            metrics.incr("session.chain_fallbacks")
+
+    return client.responses.create(
+        model=plan.model,
+        input=build_chat_messages(plan, session),
+        stream=stream,
+        **model_tiers.model_options(plan.tier)
+    )
 
-    messages = [
-        {"role": "system", "content": system_prompt},
-        {"role": "user", "content": user_query},
-    ]
+def log_generation(plan, seconds, usage, answer):
+    """One structured event per GPT answer: model, latency and token counts."""
+    log_event(log, "generation.done", tier=plan.tier, model=plan.model, ms=round(seconds * 1000, 1),
+              input_tokens=getattr(usage, "input_tokens", None), output_tokens=getattr(usage, "output_tokens", None),
+              answer_chars=len(answer))
+    log_payload(log, "generation.answer", answer)
 
-    print(f"💬 Sending request to GPT with system prompt (first 500 chars):\n{system_prompt[:500]}...")
+def generate_chat_turn(user_query, session=None, snapshot=None, retrieved_articles=None):
+    """Runs the pipeline for one query and returns the ChatTurn (doesn't touch the session).
+
+    Raises UpstreamUnavailable when the LLM can't be called right now and
+    there is no cached answer to fall back on.
+    """
+    log_event(log, "chat.query", query_chars=len(user_query))
+    log_payload(log, "chat.query_text", user_query)
+
+    fast_turn = answer_fast_path(user_query, snapshot)
+    if fast_turn:
+        return fast_turn
 
     try:
-        response = client.responses.create(
-            model="gpt-5",
-            input=messages,
-            stream=False
-        )
+        if not generation_upstream.accepting():
+            # Don't spend a routing call on a query that can't be answered now
+            raise UpstreamUnavailable("generation circuit open", generation_upstream.retry_after())
+
+        plan = plan_chat(user_query, snapshot, session, retrieved_articles)
+        if plan.fallback:
+            return ChatTurn(plan.fallback)
+
+        started = time.perf_counter()
+        response = generation_upstream.call(create_gpt_response, plan, session)
+        seconds = time.perf_counter() - started
+        model_tiers.record_call(plan.tier, plan.model, seconds, response.usage)
 
         answer = response.output_text
         if not answer:
             # If streaming didn't work, response might be an object
-            print("⚠️  No content from streaming, trying to parse response object...")
+            log.warning("generation.empty_output_text")
             if hasattr(response, 'output'):
                 for item in response.output:
                     if hasattr(item, 'text'):
                         answer += item.text
         
-        print(f"📝 GPT Response ({len(answer)} chars): {answer[:200]}..." if len(answer) > 200 else f"📝 GPT Response: {answer}")
+        log_generation(plan, seconds, response.usage, answer)
 
-        if "I don't know" in answer or len(answer.strip()) < 5:
-            answer = (
-                "I'm not entirely sure, but you can check out Neckarmedia’s website for more details. "
-                "\n\n👉 [Neckarmedia Website](https://neckarmedia.com)"
-            )
-            print(f"⚠️ GPT did not generate a confident response, redirecting user to website.")
+        if is_unsure(answer):
+            answer = UNSURE_ANSWER
+            log.info("generation.unsure")
+
+        turn = ChatTurn(answer, plan.tools, plan.context, response.id, plan.model, plan.sources)
+        remember_answer(user_query, session, turn)
+        return turn
 
-        return answer
+    except UpstreamUnavailable:
+        cached = cached_answer_turn(user_query)
+        if cached:
+            return cached
+        raise
+    except Exception as e:
+        log.exception("generation.error")
+        return cached_answer_turn(user_query) or ChatTurn(ERROR_ANSWER)
 
+def generate_chat_response(user_query, session=None):
+    """Handles tool selection and retrieves the appropriate response."""
+    turn = generate_chat_turn(user_query, session)
+    if session is not None:
+        session_store.record_turn(session, user_query, turn)
+    return turn.answer
+
+def stream_chat_turn(user_query, session=None):
+    """Streaming pipeline: yields the answer as text deltas, then the finished ChatTurn."""
+    log_event(log, "chat.query", query_chars=len(user_query), stream=True)
+    log_payload(log, "chat.query_text", user_query)
+
+    fast_turn = answer_fast_path(user_query)
+    if fast_turn:
+        yield fast_turn.answer
+        yield fast_turn
+        return
+
+    parts, response_id = [], None
+    try:
+        plan = plan_chat(user_query, session=session)
+        if plan.fallback:
+            yield plan.fallback
+            yield ChatTurn(plan.fallback)
+            return
+
+        started = time.perf_counter()
+        for event in generation_upstream.stream(create_gpt_response, plan, session, stream=True):
+            if event.type == "response.created":
+                response_id = event.response.id
+            elif event.type == "response.completed":
+                seconds = time.perf_counter() - started
+                model_tiers.record_call(plan.tier, plan.model, seconds, event.response.usage)
+                log_generation(plan, seconds, event.response.usage, "".join(parts))
+            elif event.type == "response.output_text.delta" and event.delta:
+                parts.append(event.delta)
+                yield event.delta
+            elif event.type in ("response.failed", "response.incomplete", "error"):
+                raise RuntimeError(f"Stream ended with {event.type}")
     except Exception as e:
-        print(f"🔥 Error in GPT response generation: {e}")
-        return "I'm currently unable to process your request. Please try again later."
+        log.exception("generation.stream_error")
+        if not parts:
+            # The response has started already, so a 503 is no longer possible
+            fallback = cached_answer_turn(user_query) or ChatTurn(
+                BUSY_ANSWER if isinstance(e, UpstreamUnavailable) else ERROR_ANSWER
+            )
+            yield fallback.answer
+            yield fallback
+            return
+        # Part of the answer is out: say it broke off, and don't keep the fragment anywhere
+        metrics.incr("generation.stream_interrupted")
+        yield INTERRUPTED_NOTE
+        yield ChatTurn("".join(parts) + INTERRUPTED_NOTE, plan.tools, plan.context, model=plan.model, failed=True)
+        return
+
+    if not parts:
+        log.info("generation.unsure")
+        yield UNSURE_ANSWER
+        yield ChatTurn(UNSURE_ANSWER)
+        return
+
+    turn = ChatTurn("".join(parts), plan.tools, plan.context, response_id, plan.model, plan.sources)
+    if is_unsure(turn.answer):
+        log.info("generation.unsure")  # already streamed as it is, but not served again from the cache
+    else:
+        remember_answer(user_query, session, turn)
+    yield turn
+
+def stream_chat_response(user_query, session=None):
+    """Yields the answer as text deltas and records the turn in the session at the end."""
+    for item in stream_chat_turn(user_query, session):
+        if isinstance(item, ChatTurn):
+            if session is not None and not item.failed:
+                session_store.record_turn(session, user_query, item)
+        else:
+            yield item
+
+def warm_caches(queries, answers=WARMUP_ANSWERS):
+    """Replays queries (e.g. the most frequent ones from the query log) to fill the caches.
+
+    One batched embedding pass fills the embedding cache, the blog search
+    fills the retrieval cache and the fast path builds its index. With
+    ``answers``, the full pipeline also runs and refills the answer cache.
+    """
+    snapshot = get_snapshot()
+    encode_queries(queries)
+    for query in queries:
+        if answer_fast_path(query, snapshot, log_review=False):  # replays aren't new queries to review
+            continue
+        agent_search_blog_articles(query, snapshot)
+        if answers:
+            generate_chat_turn(query, snapshot=snapshot)
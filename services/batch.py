@@ -0,0 +1,131 @@
+import argparse
+import json
+import os
+import random
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+# Allow running as a script: python services/batch.py questions.txt answers.jsonl
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.agent import encode_queries, generate_chat_turn, search_articles_batch
+from services.knowledge import get_snapshot
+from services.upstream import UpstreamUnavailable
+from services import metrics
+from services.logs import get_logger, log_event
+
+BATCH_CONCURRENCY = int(os.getenv("BATCH_CONCURRENCY", "8"))  # parallel pipeline runs (LLM calls)
+BATCH_MAX_QUERIES = int(os.getenv("BATCH_MAX_QUERIES", "1000"))
+# Batch items share the LLM slots with live traffic and are shed the same way when they're full;
+# unlike a chat user, a bulk job can wait, so shed items are retried with exponential backoff
+BATCH_RETRIES = int(os.getenv("BATCH_RETRIES", "6"))
+BATCH_RETRY_BASE_SECONDS = float(os.getenv("BATCH_RETRY_BASE_SECONDS", "1"))
+BATCH_RETRY_MAX_SECONDS = float(os.getenv("BATCH_RETRY_MAX_SECONDS", "30"))
+
+log = get_logger("batch")
+
+
+def generate_with_retries(query, snapshot, retrieved_articles, retries=BATCH_RETRIES):
+    """generate_chat_turn, retried with jittered exponential backoff while the LLM is unavailable.
+
+    Waits at least the breaker's Retry-After; the last UpstreamUnavailable is raised.
+    """
+    for attempt in range(retries + 1):
+        try:
+            return generate_chat_turn(query, snapshot=snapshot, retrieved_articles=retrieved_articles)
+        except UpstreamUnavailable as e:
+            if attempt == retries:
+                raise
+            backoff = min(BATCH_RETRY_MAX_SECONDS, BATCH_RETRY_BASE_SECONDS * 2 ** attempt)
+            delay = max(e.retry_after or 0, backoff * random.uniform(0.5, 1.0))
+            metrics.incr("batch.retries")
+            log_event(log, "batch.retry", attempt=attempt + 1, delay_s=round(delay, 2), reason=str(e))
+            time.sleep(delay)
+
+
+def run_batch(queries, concurrency=BATCH_CONCURRENCY):
+    """Answers many queries and yields one result dict per query as soon as it completes.
+
+    All queries are embedded up front (in full micro-batches) and searched with
+    one matrix product against a single snapshot, ranked like single queries
+    (recency intents and weights, compressed index); only routing and answer
+    generation run per query, ``concurrency`` at a time. Queries shed by the
+    LLM limiter or breaker are retried with backoff instead of failing.
+    """
+    queries = list(queries)
+    if not queries:
+        return
+
+    snapshot = get_snapshot()
+    started = time.perf_counter()
+    retrieved = search_articles_batch(queries, encode_queries(queries), snapshot=snapshot)
+    ms = (time.perf_counter() - started) * 1000
+    metrics.observe("batch.retrieval_ms", ms)
+    log_event(log, "batch.retrieved", queries=len(queries), ms=round(ms, 1))
+
+    def answer(index):
+        query_started = time.perf_counter()
+        turn = generate_with_retries(queries[index], snapshot, retrieved[index])
+        return {
+            "index": index,
+            "query": queries[index],
+            "response": turn.answer,
+            "tools": turn.tools,
+            "latency_ms": round((time.perf_counter() - query_started) * 1000),
+        }
+
+    with ThreadPoolExecutor(max_workers=max(1, concurrency), thread_name_prefix="batch") as executor:
+        futures = {executor.submit(answer, index): index for index in range(len(queries))}
+        for future in as_completed(futures):
+            try:
+                result = future.result()
+            except Exception as e:
+                index = futures[future]
+                result = {"index": index, "query": queries[index], "error": str(e)}
+                metrics.incr("batch.errors")
+            metrics.incr("batch.queries")
+            yield result
+
+
+def run_batch_jsonl(queries, concurrency=BATCH_CONCURRENCY):
+    """Same as run_batch, serialized as JSON Lines."""
+    for result in run_batch(queries, concurrency):
+        yield json.dumps(result, ensure_ascii=False) + "\n"
+
+
+def read_queries(path):
+    """Reads questions from a text file (one per line) or JSON Lines ("user_prompt" or "query")."""
+    queries = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            if line.startswith("{"):
+                record = json.loads(line)
+                line = record.get("user_prompt") or record.get("query") or ""
+            if line:
+                queries.append(line)
+    return queries
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Answer a list of questions with the chatbot pipeline.")
+    parser.add_argument("input", help="Text file (one question per line) or JSON Lines file")
+    parser.add_argument("output", help="JSON Lines file the results are written to")
+    parser.add_argument("-c", "--concurrency", type=int, default=BATCH_CONCURRENCY)
+    args = parser.parse_args()
+
+    queries = read_queries(args.input)
+    print(f"📂 Loaded {len(queries)} questions from {args.input}")
+
+    with open(args.output, "w", encoding="utf-8") as out:
+        for line in run_batch_jsonl(queries, args.concurrency):
+            out.write(line)
+            out.flush()  # results appear as they complete
+    print(f"✅ Wrote {len(queries)} results to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+import threading
+import time
+from collections import OrderedDict
+
+from services import metrics
+
+
+class TTLCache:
+    """Small thread-safe LRU cache whose entries also expire after ``ttl`` seconds."""
+
+    def __init__(self, name, maxsize=256, ttl=300):
+        self.name = name
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None:
+                expires, value = entry
+                if expires > time.monotonic():
+                    self._data.move_to_end(key)
+                    metrics.incr(f"cache.{self.name}.hits")
+                    return value
+                del self._data[key]
+        metrics.incr(f"cache.{self.name}.misses")
+        return default
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def get_or_set(self, key, compute, should_cache=lambda value: True):
+        """Returns the cached value or computes, caches and returns it."""
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            value = compute()
+            if should_cache(value):
+                self.set(key, value)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+_MISSING = object()
@@ -0,0 +1,153 @@
+import json
+import os
+import re
+
+from services import metrics
+
+# Max prompt tokens spent on retrieved context per GPT call
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", "2500"))
+# Don't bother keeping a truncated item shorter than this
+MIN_TRUNCATED_TOKENS = 40
+TOKEN_ENCODING = os.getenv("TOKEN_ENCODING", "o200k_base")  # gpt-4o / gpt-5 family
+
+_encoder = None
+_encoder_failed = False
+
+
+def _get_encoder():
+    """Loads the tiktoken encoding once; None if it can't be loaded (e.g. offline)."""
+    global _encoder, _encoder_failed
+    if _encoder is None and not _encoder_failed:
+        try:
+            import tiktoken
+            _encoder = tiktoken.get_encoding(TOKEN_ENCODING)
+        except Exception as e:
+            _encoder_failed = True
+            print(f"⚠️ tiktoken unavailable ({e}), estimating tokens from characters")
+    return _encoder
+
+
+def count_tokens(text):
+    """Counts tokens with tiktoken, or estimates ~4 characters per token as a fallback."""
+    encoder = _get_encoder()
+    if encoder is None:
+        return (len(text) + 3) // 4
+    return len(encoder.encode(text))
+
+
+def truncate_to_tokens(text, max_tokens):
+    """Cuts text to at most max_tokens tokens and marks the cut."""
+    encoder = _get_encoder()
+    if encoder is None:
+        return text[:max_tokens * 4] + "…"
+    return encoder.decode(encoder.encode(text)[:max_tokens]) + "…"
+
+
+def compact_json(data):
+    """Serializes JSON without indentation or ASCII escaping (both only cost tokens)."""
+    return json.dumps(data, ensure_ascii=False, separators=(",", ":"))
+
+
+class ContextItem:
+    """One unit of context that can be kept, truncated or dropped as a whole."""
+
+    __slots__ = ("label", "text", "tokens", "label_tokens", "position")
+
+    def __init__(self, label, text, position, tokens=None):
+        self.label = label
+        self.text = text
+        self.tokens = count_tokens(text) if tokens is None else tokens  # known when loaded prebuilt
+        self.label_tokens = count_tokens(f"{label}: ") if label else 0
+        self.position = position
+
+    @property
+    def cost(self):
+        """Tokens of the rendered line: label, text and the line break."""
+        return self.label_tokens + self.tokens + 1
+
+    def render(self, text=None):
+        text = self.text if text is None else text
+        return f"{self.label}: {text}" if self.label else text
+
+
+def prepare_items(tool_output, label=""):
+    """Splits a tool output into context items in their natural order.
+
+    Lists become one item per element (already ranked by the tool, e.g. vector
+    search). Dicts are split per nested key, so "services.seo" or
+    "employees.Karla" can be kept or dropped independently.
+    """
+    items = []
+
+    def add(key, value):
+        text = value if isinstance(value, str) else compact_json(value)
+        items.append(ContextItem(key, text, len(items)))
+
+    if isinstance(tool_output, list):
+        for element in tool_output:
+            add(label, element)
+    elif isinstance(tool_output, dict):
+        for key, value in tool_output.items():
+            prefix = f"{label}.{key}" if label else key
+            if isinstance(value, dict) and value:
+                for sub_key, sub_value in value.items():
+                    add(f"{prefix}.{sub_key}", sub_value)
+            else:
+                add(prefix, value)
+    else:
+        add(label, str(tool_output))
+    return items
+
+
+_WORD = re.compile(r"\w+")
+
+
+def _relevance(item, query_terms):
+    """Lexical overlap between the query and an item's label and text."""
+    if not query_terms:
+        return 0
+    item_terms = set(_WORD.findall(f"{item.label} {item.text}".lower().replace("_", " ")))
+    return len(query_terms & item_terms)
+
+
+def fit_to_budget(items, user_query, budget=CONTEXT_TOKEN_BUDGET, ranked=False):
+    """Renders context items into a string of at most ``budget`` tokens.
+
+    Items are ranked by their given order when ``ranked`` (tool already sorted
+    them, e.g. by similarity), otherwise by lexical overlap with the query.
+    The highest-ranked items are kept in full; the first one that doesn't fit
+    is truncated, and everything below it is summarized by label only (if
+    that note still fits). Labels and line breaks count against the budget.
+    """
+    if ranked:
+        order = list(items)
+    else:
+        query_terms = set(_WORD.findall(user_query.lower()))
+        order = sorted(items, key=lambda item: (-_relevance(item, query_terms), item.position))
+
+    kept, dropped, used = {}, [], 0
+    for item in order:
+        if used + item.cost <= budget:
+            kept[item.position] = item.render()
+            used += item.cost
+        elif budget - used - item.label_tokens >= MIN_TRUNCATED_TOKENS and not dropped:
+            # Room left after the label, minus the "…" and line break (and a token of slack
+            # for tokens merging differently across the cut)
+            text = truncate_to_tokens(item.text, budget - used - item.label_tokens - 4)
+            kept[item.position] = item.render(text)
+            used += item.label_tokens + count_tokens(text) + 1
+        else:
+            dropped.append(item)
+
+    lines = [kept[position] for position in sorted(kept)]
+    if dropped:
+        labels = ", ".join(sorted({item.label for item in dropped if item.label}))
+        note = f"(+{len(dropped)} more items omitted{': ' + labels if labels else ''})"
+        if count_tokens(note) + 1 <= budget - used:
+            lines.append(note)
+            used += count_tokens(note) + 1
+        metrics.incr("context.items_dropped", len(dropped))
+
+    context = "\n".join(lines)
+    metrics.observe("context.tokens", used)
+    return context
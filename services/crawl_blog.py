@@ -2,12 +2,21 @@ from bs4 import BeautifulSoup
 import requests
 from urllib.parse import urljoin, urlparse
 import xml.etree.ElementTree as ET
-import json
+import os
+import sys
 import time
 
+# Allow running as a script: python services/crawl_blog.py
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_ROOT)
+
+from services.dedup import canonical_url
+from services.jsonl_io import JsonlAppender, processed_keys
+
 DOMAIN = "neckarmedia.com"
 BASE_URL = "https://www.neckarmedia.com/news-blog/"
 MAX_PAGES = 1000
+OUTPUT_PATH = os.path.join(PROJECT_ROOT, "data", "blog_posts.jsonl")
 
 def fetch_blog_links():
     response = requests.get(BASE_URL, timeout=10)
@@ -76,29 +85,44 @@ def crawl_blog_post(url):
     title = soup.title.string.strip() if soup.title else "Untitled"
     content = clean_text(response.text)
     date = extract_date(soup)
-    
+
+    # Prefer the page's own canonical link, so variants of one post share a URL
+    link = soup.find("link", rel="canonical")
+    if link and link.get("href") and DOMAIN in urlparse(link["href"]).netloc:
+        url = link["href"]
+
     return {"url": url, "title": title, "content": content, "date": date}
 
-def main():
+def main(output_path=OUTPUT_PATH):
+    """Crawls all blog posts, appending each one to a JSON Lines file as soon as it's fetched.
+
+    Post URLs are canonicalized (tracking parameters, AMP and host variants
+    collapse to one), and posts already in the output are skipped, so an
+    interrupted crawl resumes where it stopped instead of starting over.
+    """
     blog_links = fetch_blog_links()
-    all_posts = set()
+    all_posts = {}  # canonical URL -> first URL seen for it
     for blog_link in blog_links:
         print(f"Fetching posts from: {blog_link}")
-        posts = fetch_blog_content(blog_link)
-        all_posts.update(posts)
+        posts = fetch_blog_content(blog_link) or []
+        for post in posts:
+            all_posts.setdefault(canonical_url(post), post)
         print(f"Found {len(posts)} posts")
         time.sleep(1)
-    
-    crawled_posts = []
-    for post in all_posts:
-        post_data = crawl_blog_post(post)
-        if post_data:
-            crawled_posts.append(post_data)
-        time.sleep(1)
 
-    with open("blog_posts.json", "w") as f:
-        json.dump(crawled_posts, f, ensure_ascii=False, indent=4)
-    print(f"Successfully crawled blog posts")
+    already_crawled = {canonical_url(url) for url in processed_keys(output_path, "url")}
+    pending = [all_posts[key] for key in sorted(all_posts.keys() - already_crawled)]
+    print(f"{len(already_crawled)} posts already crawled, {len(pending)} to go")
+
+    with JsonlAppender(output_path) as out:
+        for post in pending:
+            post_data = crawl_blog_post(post)
+            # Its canonical link may name a post we already have
+            if post_data and canonical_url(post_data["url"]) not in already_crawled:
+                already_crawled.add(canonical_url(post_data["url"]))
+                out.write(post_data)
+            time.sleep(1)
+    print(f"Successfully crawled {out.count} blog posts into {output_path}")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,163 @@
+import argparse
+import hashlib
+import os
+import re
+import sqlite3
+import sys
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+# Paths relative to project root (one level up from services/)
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_ROOT)  # allow running as a script: python services/dedup.py
+
+DB_PATH = os.path.join(PROJECT_ROOT, "neckarmedia.db")
+
+# Max differing SimHash bits for two articles to count as the same text. Distinct
+# posts of the blog are 17+ bits apart; a few inserted or changed words move 1-4 bits.
+SIMHASH_MAX_DISTANCE = int(os.getenv("SIMHASH_MAX_DISTANCE", "6"))
+SHINGLE_WORDS = 3
+
+TRACKING_PARAMS = re.compile(r"^(utm_\w+|fbclid|gclid|dclid|msclkid|mc_cid|mc_eid|_ga|_gl|ref|amp)$", re.IGNORECASE)
+
+_BITS = 64
+_MASK = (1 << _BITS) - 1
+
+
+def canonical_url(url):
+    """Normalizes a post URL so tracking, category and AMP variants map to one key.
+
+    Lowercases scheme and host, drops "www.", fragments, tracking parameters
+    and a trailing "/amp", sorts the remaining query and gives paths a
+    trailing slash (WordPress permalinks have one).
+    """
+    if not url:
+        return url
+    parts = urlsplit(url.strip())
+    host = (parts.hostname or "").lower().removeprefix("www.")
+    if parts.port and parts.port not in (80, 443):
+        host = f"{host}:{parts.port}"
+    path = re.sub(r"/+", "/", parts.path or "/")
+    path = re.sub(r"/amp/?$", "/", path)
+    if not path.endswith("/") and "." not in path.rsplit("/", 1)[-1]:
+        path += "/"
+    query = urlencode(sorted((k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True)
+                             if not TRACKING_PARAMS.match(k)))
+    scheme = "https" if parts.scheme in ("http", "https", "") else parts.scheme.lower()
+    return urlunsplit((scheme, host, path, query, ""))
+
+
+def simhash(text, shingle_words=SHINGLE_WORDS):
+    """64-bit SimHash over word shingles; near-identical texts differ in few bits."""
+    words = re.findall(r"\w+", (text or "").lower())
+    if not words:
+        return 0
+    shingles = {" ".join(words[i:i + shingle_words]) for i in range(max(1, len(words) - shingle_words + 1))}
+    weights = [0] * _BITS
+    for shingle in shingles:
+        h = int.from_bytes(hashlib.blake2b(shingle.encode("utf-8"), digest_size=8).digest(), "big")
+        for bit in range(_BITS):
+            weights[bit] += 1 if (h >> bit) & 1 else -1
+    return sum(1 << bit for bit, weight in enumerate(weights) if weight > 0)
+
+
+def to_db(fingerprint):
+    """SQLite INTEGER is signed 64-bit."""
+    return fingerprint - (1 << _BITS) if fingerprint >= 1 << (_BITS - 1) else fingerprint
+
+
+def distance(a, b):
+    return bin((a ^ b) & _MASK).count("1")
+
+
+def find_near_duplicate(fingerprint, candidates, max_distance=SIMHASH_MAX_DISTANCE):
+    """Returns the id of the closest (id, fingerprint) candidate within ``max_distance``, or None."""
+    best_id, best = None, max_distance + 1
+    for candidate_id, candidate in candidates:
+        if candidate is None:
+            continue
+        d = distance(fingerprint, candidate)
+        if d < best:
+            best_id, best = candidate_id, d
+    return best_id
+
+
+def has_dedup_columns(conn):
+    return "duplicate_of" in {row[1] for row in conn.execute("PRAGMA table_info(blog_articles)")}
+
+
+def unique_articles_sql(conn):
+    """SQL condition that keeps only canonical articles (true on databases without the columns)."""
+    return "duplicate_of IS NULL" if has_dedup_columns(conn) else "1 = 1"
+
+
+def ensure_dedup_columns(conn):
+    """Adds the canonical URL, fingerprint and duplicate link columns to blog_articles."""
+    columns = {row[1] for row in conn.execute("PRAGMA table_info(blog_articles)")}
+    for column, definition in (("canonical_url", "TEXT"), ("simhash", "INTEGER"),
+                               ("duplicate_of", "INTEGER REFERENCES blog_articles(id)")):
+        if column not in columns:
+            conn.execute(f"ALTER TABLE blog_articles ADD COLUMN {column} {definition}")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_blog_articles_canonical_url ON blog_articles(canonical_url)")
+    conn.commit()
+
+
+def canonical_candidates(conn):
+    """(id, fingerprint) of every canonical article, for find_near_duplicate."""
+    rows = conn.execute(
+        "SELECT id, simhash FROM blog_articles WHERE duplicate_of IS NULL AND simhash IS NOT NULL"
+    ).fetchall()
+    return [(article_id, fingerprint & _MASK) for article_id, fingerprint in rows]
+
+
+def backfill(conn, max_distance=SIMHASH_MAX_DISTANCE):
+    """Fingerprints existing articles and links near-duplicates to the oldest copy.
+
+    Duplicates lose their embedding, so they drop out of the retrieval index,
+    and are marked so enrichment retries skip them. Returns the number of
+    articles marked as duplicates.
+    """
+    ensure_dedup_columns(conn)
+    has_status = "enrichment_status" in {row[1] for row in conn.execute("PRAGMA table_info(blog_articles)")}
+    rows = conn.execute("SELECT id, source_url, content FROM blog_articles ORDER BY id").fetchall()
+    seen_urls, candidates, duplicates = {}, [], 0
+    for article_id, source_url, content in rows:
+        url = canonical_url(source_url)
+        fingerprint = simhash(content)
+        original = seen_urls.get(url) or find_near_duplicate(fingerprint, candidates, max_distance)
+        if original is None:
+            candidates.append((article_id, fingerprint))
+            seen_urls.setdefault(url, article_id)
+        else:
+            duplicates += 1
+            print(f"🔗 Article {article_id} duplicates {original}: {source_url}")
+        conn.execute(
+            "UPDATE blog_articles SET canonical_url = ?, simhash = ?, duplicate_of = ?, "
+            "embedding = CASE WHEN ? IS NULL THEN embedding END WHERE id = ?",
+            (url, to_db(fingerprint), original, original, article_id)
+        )
+        if has_status:
+            conn.execute(
+                "UPDATE blog_articles SET enrichment_status = CASE WHEN ? IS NOT NULL THEN 'duplicate' "
+                "WHEN enrichment_status = 'duplicate' THEN 'pending' ELSE enrichment_status END WHERE id = ?",
+                (original, article_id)
+            )
+    conn.commit()
+    print(f"✅ Fingerprinted {len(rows)} articles: {duplicates} near-duplicates linked.")
+    return duplicates
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fingerprint blog articles and link near-duplicates.")
+    parser.add_argument("--db", default=DB_PATH)
+    parser.add_argument("--max-distance", type=int, default=SIMHASH_MAX_DISTANCE,
+                        help="Max differing SimHash bits for a near-duplicate")
+    args = parser.parse_args()
+    conn = sqlite3.connect(args.db)
+    try:
+        backfill(conn, args.max_distance)
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
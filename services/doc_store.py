@@ -0,0 +1,350 @@
+import argparse
+import glob
+import hashlib
+import json
+import os
+import sqlite3
+import sys
+import time
+
+import numpy as np
+
+# Paths relative to project root (one level up from services/)
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_ROOT)  # allow running as a script: python services/doc_store.py
+
+from services.dedup import unique_articles_sql
+from services.recency import parse_date, published_at_sql
+
+DB_PATH = os.path.join(PROJECT_ROOT, "neckarmedia.db")
+DOCS_DIR = os.path.join(PROJECT_ROOT, "data", "docs")
+EMBEDDING_MODEL = "all-MiniLM-L6-v2"  # same model as the blog embeddings, so all vectors share one space
+
+DOC_CHUNK_CHARS = int(os.getenv("DOC_CHUNK_CHARS", "1000"))      # max characters per document chunk
+DOC_CHUNK_OVERLAP = int(os.getenv("DOC_CHUNK_OVERLAP", "200"))   # characters repeated from the previous chunk
+BATCH_SIZE = 64  # chunks encoded together
+
+# Where a document came from; every chunk of every source lives in the same index
+SOURCE_BLOG, SOURCE_DOCX, SOURCE_PDF = "blog", "docx", "pdf"
+
+
+def setup_doc_store(conn):
+    """Creates the document and chunk tables if they don't exist."""
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS documents (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            source_type TEXT NOT NULL,
+            source_key TEXT NOT NULL,
+            title TEXT,
+            url TEXT,
+            keywords TEXT,
+            content_hash TEXT,
+            updated_at TEXT,
+            published_at TEXT,
+            UNIQUE (source_type, source_key)
+        )
+    """)
+    if "published_at" not in {row[1] for row in conn.execute("PRAGMA table_info(documents)")}:
+        conn.execute("ALTER TABLE documents ADD COLUMN published_at TEXT")
+    # One row per retrievable chunk; embedding is a normalized float32 vector as raw bytes
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS chunks (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            document_id INTEGER NOT NULL REFERENCES documents(id) ON DELETE CASCADE,
+            chunk_index INTEGER NOT NULL,
+            text TEXT NOT NULL,
+            embedding BLOB NOT NULL,
+            UNIQUE (document_id, chunk_index)
+        )
+    """)
+    conn.commit()
+
+
+def has_doc_store(conn):
+    return conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'chunks'").fetchone() is not None
+
+
+def encode_vector(vector):
+    """L2-normalizes a vector and packs it as float32 bytes (4 bytes per dimension, vs ~20 as JSON)."""
+    vector = np.asarray(vector, dtype=np.float32).ravel()
+    norm = np.linalg.norm(vector)
+    return (vector / norm if norm else vector).tobytes()
+
+
+def decode_vector(blob):
+    return np.frombuffer(blob, dtype=np.float32)
+
+
+def _stored_embedding(value):
+    """blog_articles.embedding holds JSON text; accept packed float32 bytes as well."""
+    if isinstance(value, bytes) and not value.lstrip().startswith(b"["):
+        return decode_vector(value)
+    return np.asarray(json.loads(value), dtype=np.float32)
+
+
+def content_hash(*parts):
+    digest = hashlib.sha1()
+    for part in parts:
+        digest.update(part if isinstance(part, bytes) else str(part or "").encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+def split_text(text, chunk_chars=DOC_CHUNK_CHARS, overlap=DOC_CHUNK_OVERLAP):
+    """Splits text into chunks of at most ``chunk_chars``, preferring paragraph and word boundaries.
+
+    Each chunk after the first starts with the last ``overlap`` characters of
+    the previous one, so a sentence cut at a boundary is still found whole.
+    """
+    text = "\n".join(line.strip() for line in text.splitlines() if line.strip())
+    chunks, start = [], 0
+    while start < len(text):
+        end = min(start + chunk_chars, len(text))
+        if end < len(text):
+            cut = max(text.rfind("\n", start, end), text.rfind(" ", start + chunk_chars // 2, end))
+            if cut > start + overlap:
+                end = cut
+        chunks.append(text[start:end].strip())
+        if end >= len(text):
+            break
+        start = max(end - overlap, start + 1)
+        if text[start - 1] not in " \n":  # don't start a chunk mid-word
+            space = text.find(" ", start, end)
+            start = space + 1 if space != -1 else start
+    return [chunk for chunk in chunks if chunk]
+
+
+def extract_docx_text(path):
+    import docx
+    document = docx.Document(path)
+    paragraphs = [p.text for p in document.paragraphs]
+    for table in document.tables:
+        for row in table.rows:
+            paragraphs.append(" | ".join(cell.text.strip() for cell in row.cells))
+    return "\n".join(paragraphs)
+
+
+def extract_pdf_text(path):
+    from PyPDF2 import PdfReader
+    reader = PdfReader(path)
+    return "\n".join(page.extract_text() or "" for page in reader.pages)
+
+
+EXTRACTORS = {".docx": (SOURCE_DOCX, extract_docx_text), ".pdf": (SOURCE_PDF, extract_pdf_text)}
+
+
+def upsert_document(conn, source_type, source_key, title, url, keywords, chunks, vectors, digest, published_at=None):
+    """Stores a document and replaces its chunks; returns the document id."""
+    now = time.strftime("%Y-%m-%dT%H:%M:%S")
+    conn.execute("""
+        INSERT INTO documents (source_type, source_key, title, url, keywords, content_hash, updated_at, published_at)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        ON CONFLICT (source_type, source_key) DO UPDATE SET
+            title = excluded.title, url = excluded.url, keywords = excluded.keywords,
+            content_hash = excluded.content_hash, updated_at = excluded.updated_at,
+            published_at = excluded.published_at
+    """, (source_type, source_key, title, url, keywords, digest, now, published_at))
+    document_id = conn.execute(
+        "SELECT id FROM documents WHERE source_type = ? AND source_key = ?", (source_type, source_key)
+    ).fetchone()[0]
+    conn.execute("DELETE FROM chunks WHERE document_id = ?", (document_id,))
+    conn.executemany(
+        "INSERT INTO chunks (document_id, chunk_index, text, embedding) VALUES (?, ?, ?, ?)",
+        [(document_id, i, text, encode_vector(vector)) for i, (text, vector) in enumerate(zip(chunks, vectors))]
+    )
+    return document_id
+
+
+def _known_hashes(conn, source_type):
+    return dict(conn.execute(
+        "SELECT source_key, content_hash FROM documents WHERE source_type = ?", (source_type,)
+    ))
+
+
+def delete_missing(conn, source_type, keep_keys):
+    """Removes documents of a source type that no longer exist upstream."""
+    stale = [key for key in _known_hashes(conn, source_type) if key not in keep_keys]
+    for key in stale:
+        document_id = conn.execute(
+            "SELECT id FROM documents WHERE source_type = ? AND source_key = ?", (source_type, key)
+        ).fetchone()[0]
+        conn.execute("DELETE FROM chunks WHERE document_id = ?", (document_id,))
+        conn.execute("DELETE FROM documents WHERE id = ?", (document_id,))
+    return len(stale)
+
+
+def sync_blog(conn):
+    """Mirrors embedded blog articles into the store, one chunk each, reusing their stored vectors.
+
+    Only articles whose title, summary, keywords, URL, date or embedding changed are
+    rewritten; articles deleted from blog_articles, or linked as near-duplicates,
+    are removed.
+    """
+    setup_doc_store(conn)
+    known = _known_hashes(conn, SOURCE_BLOG)
+    seen, written = set(), 0
+    rows = conn.execute(
+        f"SELECT id, title, summary, keywords, source_url, embedding, {published_at_sql(conn)} FROM blog_articles "
+        f"WHERE embedding IS NOT NULL AND {unique_articles_sql(conn)} ORDER BY id"
+    ).fetchall()
+    for article_id, title, summary, keywords, source_url, embedding, published in rows:
+        key = str(article_id)
+        seen.add(key)
+        published_at = parse_date(published)
+        digest = content_hash(title, summary, keywords, source_url, embedding, published_at)
+        if known.get(key) == digest:
+            continue
+        text = summary if summary and summary != "No summary available" else title
+        upsert_document(conn, SOURCE_BLOG, key, title, source_url, keywords,
+                        [text], [_stored_embedding(embedding)], digest, published_at)
+        written += 1
+    removed = delete_missing(conn, SOURCE_BLOG, seen)
+    conn.commit()
+    print(f"✅ Blog synced into the document store: {written} updated, {removed} removed, {len(seen)} total.")
+    return written
+
+
+def refresh_blog_mirror(conn):
+    """Re-syncs the blog into the store after blog_articles changed (e.g. new summaries).
+
+    Without a store the agent reads blog_articles directly, so there is nothing to do.
+    """
+    return sync_blog(conn) if has_doc_store(conn) else 0
+
+
+def _has_blog_embeddings(conn):
+    return "embedding" in {row[1] for row in conn.execute("PRAGMA table_info(blog_articles)")}
+
+
+def load_encoder(model_name=EMBEDDING_MODEL):
+    """Returns encode(texts) -> normalized float32 rows, with the blog's embedding model."""
+    from sentence_transformers import SentenceTransformer
+    model = SentenceTransformer(model_name)
+    return lambda texts: model.encode(texts, batch_size=BATCH_SIZE, normalize_embeddings=True)
+
+
+def default_document_paths(docs_dir=DOCS_DIR):
+    return sorted(path for ext in EXTRACTORS for path in glob.glob(os.path.join(docs_dir, f"*{ext}")))
+
+
+def ingest_files(conn, paths, encode=None, prune=False):
+    """Extracts, chunks and embeds DOCX/PDF files into the store; unchanged files are skipped.
+
+    ``encode`` embeds a list of texts (default: the blog's embedding model).
+    With ``prune``, documents of these types whose file is not in ``paths``
+    are removed. The blog is mirrored first: once the store has any chunk,
+    the agent searches it instead of blog_articles.
+    """
+    setup_doc_store(conn)
+    if _has_blog_embeddings(conn):
+        sync_blog(conn)
+    seen, ingested = {source_type: set() for source_type, _ in EXTRACTORS.values()}, 0
+    for path in paths:
+        ext = os.path.splitext(path)[1].lower()
+        if ext not in EXTRACTORS:
+            print(f"⚠️ Skipping unsupported file: {path}")
+            continue
+        source_type, extract = EXTRACTORS[ext]
+        key = os.path.relpath(os.path.abspath(path), PROJECT_ROOT)
+        seen[source_type].add(key)
+        with open(path, "rb") as f:
+            digest = content_hash(f.read())
+        if _known_hashes(conn, source_type).get(key) == digest:
+            continue
+
+        chunks = split_text(extract(path))
+        if not chunks:
+            print(f"⚠️ No text extracted from {path}")
+            continue
+        encode = encode or load_encoder()
+        vectors = encode(chunks)
+        title = os.path.splitext(os.path.basename(path))[0]
+        upsert_document(conn, source_type, key, title, key, "", chunks, vectors, digest)
+        conn.commit()
+        ingested += 1
+        print(f"📄 Ingested {key}: {len(chunks)} chunks")
+
+    if prune:
+        for source_type, keys in seen.items():
+            delete_missing(conn, source_type, keys)
+        conn.commit()
+    return ingested
+
+
+def load_index(db_path=DB_PATH):
+    """Loads every chunk of every source into one search index.
+
+    Returns (items, matrix, tag_index), or None if the store doesn't exist or
+    is empty (callers then fall back to the blog table). ``items[i]`` describes
+    row ``i`` of the (n_chunks, dim) float32 matrix.
+    """
+    conn = sqlite3.connect(db_path)
+    try:
+        if not has_doc_store(conn):
+            return None
+        rows = conn.execute("""
+            SELECT c.id, c.document_id, d.source_type, d.title, c.text, d.url, d.keywords, d.published_at, c.embedding
+            FROM chunks c JOIN documents d ON d.id = c.document_id
+            ORDER BY d.source_type, c.document_id, c.chunk_index
+        """).fetchall()
+    finally:
+        conn.close()
+    if not rows:
+        return None
+
+    items, tag_index = [], {}
+    matrix = np.empty((len(rows), len(rows[0][8]) // 4), dtype=np.float32)
+    for row, (chunk_id, document_id, source_type, title, text, url, keywords, published_at, embedding) in enumerate(rows):
+        items.append({
+            "id": chunk_id,
+            "document_id": document_id,
+            "source_type": source_type,
+            "title": title,
+            "summary": text,
+            "source_url": url,
+            "keywords": keywords,
+            "published_at": published_at,
+        })
+        matrix[row] = decode_vector(embedding)
+        for kw in (keywords or "").split(","):
+            kw = kw.strip().lower()
+            if kw:
+                tag_index.setdefault(kw, []).append(row)
+    return items, matrix, {k: tuple(v) for k, v in tag_index.items()}
+
+
+def print_stats(conn):
+    if not has_doc_store(conn):
+        print("ℹ️ No document store yet.")
+        return
+    for source_type, documents, chunks in conn.execute("""
+        SELECT d.source_type, COUNT(DISTINCT d.id), COUNT(c.id)
+        FROM documents d LEFT JOIN chunks c ON c.document_id = d.id GROUP BY d.source_type
+    """):
+        print(f"📚 {source_type}: {documents} documents, {chunks} chunks")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Unified document/chunk store for blog articles and DOCX/PDF files.")
+    parser.add_argument("--db", default=DB_PATH)
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("sync-blog", help="Mirror embedded blog articles into the store")
+    ingest = sub.add_parser("ingest", help="Ingest DOCX/PDF files (default: data/docs)")
+    ingest.add_argument("paths", nargs="*")
+    ingest.add_argument("--prune", action="store_true", help="Remove stored documents whose file is gone")
+    sub.add_parser("stats", help="Show documents and chunks per source type")
+    args = parser.parse_args()
+
+    conn = sqlite3.connect(args.db)
+    try:
+        if args.command == "sync-blog":
+            sync_blog(conn)
+        elif args.command == "ingest":
+            ingest_files(conn, args.paths or default_document_paths(), prune=args.prune)
+        print_stats(conn)
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
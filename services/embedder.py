@@ -0,0 +1,110 @@
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+import numpy as np
+
+from services import metrics
+from services.cache import TTLCache
+
+EMBED_MAX_BATCH = int(os.getenv("EMBED_MAX_BATCH", "32"))           # texts per forward pass
+EMBED_MAX_WAIT_MS = float(os.getenv("EMBED_MAX_WAIT_MS", "5"))      # how long a batch waits to fill up
+EMBED_CACHE_SIZE = int(os.getenv("EMBED_CACHE_SIZE", "2048"))       # recent query embeddings kept
+EMBED_CACHE_TTL = int(os.getenv("EMBED_CACHE_TTL", "86400"))
+# Every worker process runs its own model: split the cores between them instead of
+# letting each one start a torch thread per core
+WEB_CONCURRENCY = int(os.getenv("WEB_CONCURRENCY", "1"))
+EMBED_TORCH_THREADS = int(os.getenv("EMBED_TORCH_THREADS", str(max(1, (os.cpu_count() or 1) // WEB_CONCURRENCY))))
+
+
+def set_torch_threads(threads=EMBED_TORCH_THREADS):
+    """Caps torch's intra-op thread pool for this process."""
+    import torch
+    torch.set_num_threads(threads)
+    print(f"🧵 Torch intra-op threads: {threads}")
+
+
+class EmbeddingWorker:
+    """Runs all query embeddings of a process through one thread, in micro-batches.
+
+    Callers get a Future per text. The worker takes whatever is queued, waits up
+    to ``max_wait_ms`` for more (at most ``max_batch`` texts) and encodes the lot
+    in one forward pass, so concurrent requests share a batch instead of
+    contending for the cores with batch-size-1 passes. Rows are L2-normalized
+    float32. The thread starts on first use, and again in a forked child.
+    """
+
+    def __init__(self, model, max_batch=EMBED_MAX_BATCH, max_wait_ms=EMBED_MAX_WAIT_MS, cache_size=EMBED_CACHE_SIZE):
+        self.model = model
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000
+        self.cache = TTLCache("embeddings", maxsize=cache_size, ttl=EMBED_CACHE_TTL) if cache_size else None
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._pid = None
+
+    def _ensure_started(self):
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid != os.getpid():
+                self._queue = queue.Queue()  # a queue inherited over fork has no reader
+                threading.Thread(target=self._run, args=(self._queue,), name="embedder", daemon=True).start()
+                self._pid = os.getpid()
+
+    def submit(self, text):
+        """Queues one text; the Future resolves to its normalized embedding."""
+        if self.cache is not None:
+            cached = self.cache.get(text)
+            if cached is not None:
+                future = Future()
+                future.set_result(cached)
+                return future
+        self._ensure_started()
+        future = Future()
+        self._queue.put((text, future, time.perf_counter()))
+        metrics.set_gauge("embed.queue_depth", self._queue.qsize())
+        return future
+
+    def encode(self, texts):
+        """Embeds texts through the batching thread; returns a (len(texts), dim) matrix."""
+        futures = [self.submit(text) for text in texts]
+        return np.stack([future.result() for future in futures])
+
+    def _collect(self, pending):
+        batch = [pending.get()]
+        deadline = time.perf_counter() + self.max_wait
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.perf_counter()
+            try:
+                batch.append(pending.get(timeout=remaining) if remaining > 0 else pending.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self, pending):
+        while True:
+            batch = self._collect(pending)
+            texts = [text for text, _, _ in batch]
+            started = time.perf_counter()
+            try:
+                embeddings = self.model.encode(texts, batch_size=len(texts)).astype(np.float32)
+                embeddings /= np.maximum(np.linalg.norm(embeddings, axis=1, keepdims=True), 1e-12)
+            except Exception as e:
+                for _, future, _ in batch:
+                    future.set_exception(e)
+                metrics.incr("embed.errors")
+                continue
+
+            done = time.perf_counter()
+            metrics.observe("embed.batch_size", len(batch))
+            metrics.observe("embed.batch_ms", (done - started) * 1000)
+            metrics.set_gauge("embed.queue_depth", pending.qsize())
+            embeddings.setflags(write=False)  # rows are shared with the cache
+            for (text, future, queued_at), embedding in zip(batch, embeddings):
+                metrics.observe("embed.wait_ms", (started - queued_at) * 1000)
+                if self.cache is not None:
+                    self.cache.set(text, embedding)
+                future.set_result(embedding)
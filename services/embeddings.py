@@ -1,9 +1,17 @@
+import os
 import sqlite3
+import sys
 import numpy as np
 import json
 from sentence_transformers import SentenceTransformer
 
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))  # allow running as a script
+
+from services.dedup import unique_articles_sql
+from services.doc_store import sync_blog
+
 DB_PATH = "neckarmedia.db"
+BATCH_SIZE = 64  # articles encoded and committed together
 
 model = SentenceTransformer("all-MiniLM-L6-v2")
 
@@ -22,21 +30,38 @@ model = SentenceTransformer("all-MiniLM-L6-v2")
 
 #     print("✅ Created embedding column.")
 
-def store_embeddings():
-    """Compute and store embeddings for existing articles."""
+def store_embeddings(batch_size=BATCH_SIZE):
+    """Compute and store embeddings for articles that don't have one yet.
+
+    Works in batches: one encode call and one commit per batch, so only a
+    batch of article texts is held in memory and an interrupted run resumes
+    with the articles still missing an embedding.
+    """
     conn = sqlite3.connect(DB_PATH)
     cursor = conn.cursor()
 
-    cursor.execute("SELECT title, content FROM blog_articles WHERE embedding IS NULL")
-    articles = cursor.fetchall()
-
-    for article_title, content in articles:
-        embedding = model.encode(content).tolist()
-        cursor.execute("UPDATE blog_articles SET embedding = ? WHERE title = ?", (json.dumps(embedding), article_title))
+    stored, last_id = 0, 0
+    unique = unique_articles_sql(conn)  # near-duplicates are never embedded
+    while True:
+        cursor.execute(
+            f"SELECT id, content FROM blog_articles WHERE embedding IS NULL AND {unique} AND id > ? ORDER BY id LIMIT ?",
+            (last_id, batch_size)
+        )
+        articles = cursor.fetchall()
+        if not articles:
+            break
+        embeddings = model.encode([content for _, content in articles], batch_size=batch_size)
+        cursor.executemany(
+            "UPDATE blog_articles SET embedding = ? WHERE id = ?",
+            [(json.dumps(embedding.tolist()), article_id) for (article_id, _), embedding in zip(articles, embeddings)]
+        )
+        conn.commit()
+        stored += len(articles)
+        last_id = articles[-1][0]
 
-    conn.commit()
+    print(f"✅ {stored} embeddings stored.")
+    sync_blog(conn)  # keep the unified retrieval index in step with the blog table
     conn.close()
-    print(f"✅ {len(articles)} embeddings stored.")
 
 # Run setup & generate embeddings
 if __name__ == "__main__":
@@ -0,0 +1,152 @@
+import json
+import os
+import re
+import threading
+import time
+
+import numpy as np
+
+from services import metrics
+from services.knowledge import PROJECT_ROOT
+from services.logs import JsonLinesAppender
+
+FAST_PATH_ENABLED = os.getenv("FAST_PATH_ENABLED", "true").lower() == "true"
+FAST_PATH_THRESHOLD = float(os.getenv("FAST_PATH_THRESHOLD", "0.85"))     # min cosine similarity to a known question
+FAST_PATH_REVIEW_MARGIN = float(os.getenv("FAST_PATH_REVIEW_MARGIN", "0.1"))  # near misses this close are logged too
+FAST_PATH_MAX_CHARS = int(os.getenv("FAST_PATH_MAX_CHARS", "200"))        # longer queries are never canned
+FAST_PATH_INTENTS_PATH = os.getenv("FAST_PATH_INTENTS_PATH", os.path.join(PROJECT_ROOT, "data", "fast_path_intents.json"))
+FAST_PATH_LOG_PATH = os.getenv("FAST_PATH_LOG_PATH", os.path.join(PROJECT_ROOT, "data", "fast_path_log.jsonl"))
+
+
+def greeting_key(text):
+    """Lowercases and drops punctuation/emoji, so "Hallo!! 👋" matches "hallo"."""
+    return " ".join(re.sub(r"[^\w\s]", " ", text.lower()).split())
+
+
+class FastAnswer:
+    """A canned answer and why it was chosen."""
+
+    def __init__(self, answer, intent, score, lang, question=None):
+        self.answer = answer
+        self.intent = intent
+        self.score = score
+        self.lang = lang
+        self.question = question
+
+
+class FastPath:
+    """Answers greetings and known FAQ questions without any LLM call.
+
+    Greetings are looked up exactly; other queries are embedded and compared
+    with the example questions of every intent in ``fast_path_intents.json``.
+    Above the threshold the intent's answer is returned, in the language of
+    the matched question. German FAQ answers come from
+    ``services.json["faqs"]`` of the current knowledge snapshot, so they stay
+    in sync with it. Matches and near misses are logged for review (written
+    by a background thread, never on the request path).
+    """
+
+    def __init__(self, intents_path=FAST_PATH_INTENTS_PATH, threshold=FAST_PATH_THRESHOLD,
+                 log_path=FAST_PATH_LOG_PATH, enabled=FAST_PATH_ENABLED):
+        self.intents_path = intents_path
+        self.threshold = threshold
+        self.review_log = JsonLinesAppender(log_path)
+        self.enabled = enabled and os.path.exists(intents_path)
+        self._lock = threading.Lock()
+        self._greetings = None
+        self._intents = None
+        self._questions = None   # [(intent id, lang, question)]
+        self._matrix = None      # normalized question embeddings, one row per question
+        self._rendered = (None, {})  # (snapshot, {(intent id, lang): answer})
+
+    def _load(self):
+        with open(self.intents_path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        greetings = {}
+        for intent in ("greetings", "thanks"):
+            for lang in ("de", "en"):
+                for phrase in data.get(intent, {}).get(lang, []):
+                    greetings[greeting_key(phrase)] = (intent, lang)
+        intents = {intent["id"]: intent for intent in data.get("intents", [])}
+        intents["greetings"] = data.get("greetings", {})
+        intents["thanks"] = data.get("thanks", {})
+        questions = [
+            (intent["id"], lang, question)
+            for intent in data.get("intents", [])
+            for lang, texts in intent.get("questions", {}).items()
+            for question in texts
+        ]
+        return greetings, intents, questions
+
+    def _ensure_index(self, encode):
+        if self._matrix is not None:
+            return
+        with self._lock:
+            if self._matrix is None:
+                started = time.perf_counter()
+                greetings, intents, questions = self._load()
+                matrix = encode([question for _, _, question in questions]) if questions else np.zeros((0, 0))
+                self._greetings, self._intents, self._questions = greetings, intents, questions
+                self._matrix = np.asarray(matrix, dtype=np.float32)
+                print(f"⚡ Fast path index: {len(questions)} questions, {len(greetings)} greetings "
+                      f"in {(time.perf_counter() - started) * 1000:.0f} ms")
+
+    def _answers(self, snapshot):
+        """Answers rendered once per knowledge snapshot."""
+        rendered_for, answers = self._rendered
+        if rendered_for is snapshot:
+            return answers
+
+        faqs = snapshot.services.get("faqs", {})
+        about = snapshot.services.get("about", "")
+        answers = {}
+        for intent_id, intent in self._intents.items():
+            for lang, text in intent.get("answer", {}).items():
+                answers[(intent_id, lang)] = text.replace("{about}", about)
+            if intent.get("faq") in faqs:
+                answers[(intent_id, "de")] = faqs[intent["faq"]]
+        self._rendered = (snapshot, answers)
+        return answers
+
+    def match(self, user_query, encode, snapshot, log=True):
+        """Returns a FastAnswer for the query, or None if it needs the full pipeline.
+
+        ``encode`` embeds a list of texts into normalized rows (agent.encode_queries).
+        ``log=False`` keeps replays (cache warm-up) out of the review log.
+        """
+        if not self.enabled:
+            return None
+        started = time.perf_counter()
+        self._ensure_index(encode)
+        answers = self._answers(snapshot)
+
+        result, question, score, intent_id, lang = None, None, 0.0, None, None
+        greeting = self._greetings.get(greeting_key(user_query))
+        if greeting:
+            intent_id, lang = greeting
+            score = 1.0
+        elif len(user_query) <= FAST_PATH_MAX_CHARS and len(self._questions):
+            scores = self._matrix @ encode([user_query])[0]
+            best = int(np.argmax(scores))
+            score = float(scores[best])
+            intent_id, lang, question = self._questions[best]
+
+        answer = answers.get((intent_id, lang))
+        if answer and score >= self.threshold:
+            result = FastAnswer(answer, intent_id, score, lang, question)
+            metrics.incr("fast_path.hits")
+        else:
+            metrics.incr("fast_path.misses")
+        metrics.observe("fast_path.ms", (time.perf_counter() - started) * 1000)
+
+        if log and intent_id and score >= self.threshold - FAST_PATH_REVIEW_MARGIN:
+            self._log({"query": user_query, "intent": intent_id, "lang": lang, "question": question,
+                       "score": round(score, 4), "answered": result is not None})
+        return result
+
+    def _log(self, record):
+        """Queues a match (or near miss) for the JSON Lines review log."""
+        self.review_log.append({"ts": time.strftime("%Y-%m-%dT%H:%M:%S"), **record})
+
+
+fast_path = FastPath()
@@ -0,0 +1,152 @@
+import argparse
+import os
+import re
+import sqlite3
+import sys
+import time
+
+# Paths relative to project root (one level up from services/)
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_ROOT)  # allow running as a script: python services/fts_index.py
+
+DB_PATH = os.path.join(PROJECT_ROOT, "neckarmedia.db")
+
+FTS_TABLE = "blog_articles_fts"
+FTS_COLUMNS = ("title", "content", "summary", "keywords", "source_url")
+_EXTERNAL_CONTENT = re.compile(r"content\s*=\s*'?blog_articles'?", re.IGNORECASE)
+
+_columns = ", ".join(FTS_COLUMNS)
+_new_values = ", ".join(f"new.{c}" for c in FTS_COLUMNS)
+_old_values = ", ".join(f"old.{c}" for c in FTS_COLUMNS)
+
+# The index stores only tokens; the text itself is read from blog_articles by rowid (= article id)
+CREATE_FTS = f"""
+    CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5(
+        {_columns}, content='blog_articles', content_rowid='id'
+    )
+"""
+
+# Keep the index in step with every write to blog_articles. The update trigger
+# only fires for indexed columns, so embedding/enrichment bookkeeping writes cost nothing.
+TRIGGERS = (
+    f"""
+    CREATE TRIGGER IF NOT EXISTS blog_articles_fts_ai AFTER INSERT ON blog_articles BEGIN
+        INSERT INTO {FTS_TABLE} (rowid, {_columns}) VALUES (new.id, {_new_values});
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS blog_articles_fts_ad AFTER DELETE ON blog_articles BEGIN
+        INSERT INTO {FTS_TABLE} ({FTS_TABLE}, rowid, {_columns}) VALUES ('delete', old.id, {_old_values});
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS blog_articles_fts_au AFTER UPDATE OF {_columns} ON blog_articles BEGIN
+        INSERT INTO {FTS_TABLE} ({FTS_TABLE}, rowid, {_columns}) VALUES ('delete', old.id, {_old_values});
+        INSERT INTO {FTS_TABLE} (rowid, {_columns}) VALUES (new.id, {_new_values});
+    END
+    """,
+)
+
+
+def _fts_sql(conn):
+    row = conn.execute("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = ?", (FTS_TABLE,)).fetchone()
+    return row[0] if row else None
+
+
+def is_external_content(conn):
+    sql = _fts_sql(conn)
+    return bool(sql and _EXTERNAL_CONTENT.search(sql))
+
+
+def setup_fts(conn):
+    """Creates the external-content index and its triggers; returns True if it was (re)built.
+
+    An older standalone index, which kept its own copy of every article, is
+    dropped and replaced. Safe to call on every run.
+    """
+    rebuilt = False
+    if not is_external_content(conn):
+        if _fts_sql(conn) is not None:
+            print(f"🔁 Replacing standalone {FTS_TABLE} with an external-content index")
+            conn.execute(f"DROP TABLE {FTS_TABLE}")
+        conn.execute(CREATE_FTS)
+        rebuild(conn)
+        rebuilt = True
+    for trigger in TRIGGERS:
+        conn.execute(trigger)
+    conn.commit()
+    return rebuilt
+
+
+def rebuild(conn):
+    """Re-reads every article into the index (e.g. after rows were written with triggers missing)."""
+    conn.execute(f"INSERT INTO {FTS_TABLE} ({FTS_TABLE}) VALUES ('rebuild')")
+    conn.commit()
+
+
+def optimize(conn):
+    """Merges the index b-trees into one segment, for faster queries after many small writes."""
+    conn.execute(f"INSERT INTO {FTS_TABLE} ({FTS_TABLE}) VALUES ('optimize')")
+    conn.commit()
+
+
+def check(conn):
+    """True if the index matches blog_articles ('integrity-check' against the content table)."""
+    try:
+        conn.execute(f"INSERT INTO {FTS_TABLE} ({FTS_TABLE}, rank) VALUES ('integrity-check', 1)")
+        return True
+    except sqlite3.DatabaseError as e:
+        print(f"⚠️ FTS index out of sync: {e}")
+        return False
+
+
+def search_ids(conn, query_text, limit=10):
+    """Article ids ranked by BM25 for any of the query's words."""
+    terms = re.findall(r"\w+", query_text)
+    if not terms:
+        return []
+    match = " OR ".join(f'"{term}"' for term in terms)
+    rows = conn.execute(
+        f"SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH ? ORDER BY rank LIMIT ?", (match, limit)
+    ).fetchall()
+    return [row[0] for row in rows]
+
+
+def _size_mb(db_path):
+    return round(os.path.getsize(db_path) / (1024 * 1024), 2)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Maintain the external-content FTS5 index over blog_articles.")
+    parser.add_argument("command", choices=("setup", "rebuild", "optimize", "check"),
+                        help="setup: migrate and add triggers; rebuild: re-read all articles; "
+                             "optimize: merge segments; check: verify the index against the table")
+    parser.add_argument("--db", default=DB_PATH)
+    parser.add_argument("--vacuum", action="store_true", help="VACUUM afterwards so freed pages shrink the file")
+    args = parser.parse_args()
+
+    size_before = _size_mb(args.db)
+    conn = sqlite3.connect(args.db)
+    try:
+        started = time.perf_counter()
+        if args.command == "setup":
+            setup_fts(conn)
+        elif args.command == "rebuild":
+            setup_fts(conn) or rebuild(conn)
+        elif args.command == "optimize":
+            setup_fts(conn)
+            optimize(conn)
+        ok = check(conn)
+        conn.commit()
+        if args.vacuum:
+            conn.execute("VACUUM")
+        print(f"{'✅' if ok else '❌'} {args.command} finished in {(time.perf_counter() - started) * 1000:.0f} ms; "
+              f"DB {size_before} MB -> {_size_mb(args.db)} MB")
+    finally:
+        conn.close()
+    if not ok:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,18 +1,36 @@
 from sentence_transformers import SentenceTransformer
+import os
 import sqlite3
+import sys
 import json
 
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))  # allow running as a script
+
+from services.dedup import unique_articles_sql
+from services.doc_store import sync_blog
+
+BATCH_SIZE = 64  # articles encoded and committed together
+
 model = SentenceTransformer("all-MiniLM-L6-v2")
 
 conn = sqlite3.connect("neckarmedia.db")
 cursor = conn.cursor()
 
-cursor.execute("SELECT id, content FROM blog_articles")
-articles = cursor.fetchall()
-
-for article_id, content in articles:
-    embedding = model.encode(content).tolist()
-    cursor.execute("UPDATE blog_articles SET embedding = ? WHERE id = ?", (json.dumps(embedding), article_id))
+# Walk the table by id in batches instead of loading every article at once
+last_id = 0
+unique = unique_articles_sql(conn)  # near-duplicates are never embedded
+while True:
+    cursor.execute(f"SELECT id, content FROM blog_articles WHERE {unique} AND id > ? ORDER BY id LIMIT ?", (last_id, BATCH_SIZE))
+    articles = cursor.fetchall()
+    if not articles:
+        break
+    embeddings = model.encode([content for _, content in articles], batch_size=BATCH_SIZE)
+    cursor.executemany(
+        "UPDATE blog_articles SET embedding = ? WHERE id = ?",
+        [(json.dumps(embedding.tolist()), article_id) for (article_id, _), embedding in zip(articles, embeddings)]
+    )
+    conn.commit()
+    last_id = articles[-1][0]
 
-conn.commit()
+sync_blog(conn)  # keep the unified retrieval index in step with the blog table
 conn.close()
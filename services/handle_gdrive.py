@@ -1,46 +1,19 @@
-import glob
-import PyPDF2
-import docx
 import os
+import sqlite3
+import sys
 import requests
-import json
-from langchain.text_splitter import RecursiveCharacterTextSplitter
-from langchain.docstore.document import Document
-from langchain_community.embeddings import HuggingFaceEmbeddings
-from langchain_community.vectorstores import Chroma
-from langchain_community.vectorstores.utils import filter_complex_metadata
 from dotenv import load_dotenv
-from langdetect import detect
-import spacy
-from transformers import pipeline
-import shutil
 
-load_dotenv()
-
-pdf_files = glob.glob("pdfs/*.pdf")
-docx_files = glob.glob("docs/*.docx")
-API_KEY = os.getenv("GOOGLE_DRIVE_API")
-FOLDER_ID = "1af9TUTNrBSkaoHZrSyqYWSTYqk0UiER3"
-
-nlp = spacy.load("de_core_news_md")  # German model
-classifier = pipeline("zero-shot-classification", model="facebook/bart-large-mnli")
+# Paths relative to project root (one level up from services/)
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_ROOT)  # allow running as a script: python services/handle_gdrive.py
 
-SERVICE_CATEGORIES = [
-    "Digital Analytics", "SEO", "SEA", "PLA", "CRO", "Content Marketing", "Social Media Marketing"
-]
-chroma_db_path = "./chroma_db"
+from services.doc_store import DB_PATH, DOCS_DIR, EXTRACTORS, default_document_paths, ingest_files, print_stats
 
-if os.path.exists(chroma_db_path):
-    shutil.rmtree(chroma_db_path)  # Deletes the existing database
-
-print("ChromaDB reset. Reinitializing...")
+load_dotenv()
 
-# Reinitialize ChromaDB collection
-db = Chroma(
-    collection_name="neckarmedia",
-    embedding_function=embedding,
-    persist_directory=chroma_db_path
-)
+API_KEY = os.getenv("GOOGLE_DRIVE_API")
+FOLDER_ID = os.getenv("GOOGLE_DRIVE_FOLDER_ID", "1af9TUTNrBSkaoHZrSyqYWSTYqk0UiER3")
 
 def list_folder_files(folder_id, api_key=API_KEY):
     base_url = "https://www.googleapis.com/drive/v3/files"
@@ -59,56 +32,22 @@ def download_file(file_id, local_path, api_key=API_KEY):
                     f.write(chunk)
         print(f"Saved {file_id}")
 
-def extract_pdf_text(pdf_path):
-    text = ""
-    with open(pdf_path, "rb") as f:
-        reader = PyPDF2.PdfReader(f)
-        for page in reader.pages:
-            text += (page.extract_text() or "") + "\n"
-    return text
-
-def extract_docx_text(docx_path):
-    d = docx.Document(docx_path)
-    return "\n".join([p.text for p in d.paragraphs])
-
-def annotate_metadata(text, file_path):
-    metadata = {
-        "url": file_path,
-        "title": os.path.basename(file_path),
-        "category": "",
-        "language": str(detect(text)),
-        "keywords": "",
-        "entities": ""
-    }
-    
-    doc = nlp(text)
-    metadata["entities"] = ", ".join([ent.text for ent in doc.ents])  # Convert list to string
-    
-    # Use Hugging Face model for category prediction
-    prediction = classifier(text, candidate_labels=SERVICE_CATEGORIES)
-    metadata["category"] = prediction["labels"][0] if "labels" in prediction else "Unknown"  # Handle missing keys safely
-    metadata["keywords"] = ", ".join(set(text.split()[:10]))  # Simple keyword extraction
-    
-    return metadata
-
-splitter = RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=200)
-embedding = HuggingFaceEmbeddings(model_name="sentence-transformers/all-MiniLM-L6-v2")
-db = Chroma(collection_name="neckarmedia", embedding_function=embedding, persist_directory="./chroma_db")
-
-for pdf_path in pdf_files:
-    raw_text = extract_pdf_text(pdf_path)
-    docs = splitter.create_documents([raw_text])
-    for d in docs:
-        d.metadata = filter_complex_metadata(annotate_metadata(d.page_content, pdf_path))
-    db.add_texts([d.page_content for d in docs], [d.metadata for d in docs])
-
-for docx_path in docx_files:
-    raw_text = extract_docx_text(docx_path)
-    docs = splitter.create_documents([raw_text])
-    for d in docs:
-        metadata = annotate_metadata(d.page_content, docx_path)  # Ensure metadata is a dictionary
-        d.metadata = filter_complex_metadata(metadata)  # Apply filtering to a dictionary
-    db.add_texts([d.page_content for d in docs], [d.metadata for d in docs])
-
-
-db.persist()
+def sync_drive_folder(folder_id=FOLDER_ID, docs_dir=DOCS_DIR):
+    """Downloads the DOCX/PDF files of a Drive folder into data/docs."""
+    os.makedirs(docs_dir, exist_ok=True)
+    for file in list_folder_files(folder_id):
+        if os.path.splitext(file["name"])[1].lower() in EXTRACTORS:
+            download_file(file["id"], os.path.join(docs_dir, file["name"]))
+
+if __name__ == "__main__":
+    # Drive documents go into the same document store as the blog, so the agent searches them too
+    if API_KEY:
+        sync_drive_folder()
+    else:
+        print("⚠️ GOOGLE_DRIVE_API not set; ingesting the local files in data/docs only.")
+    conn = sqlite3.connect(DB_PATH)
+    try:
+        ingest_files(conn, default_document_paths())
+        print_stats(conn)
+    finally:
+        conn.close()
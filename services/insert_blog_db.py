@@ -1,8 +1,13 @@
+import argparse
 import json
 import os
 import sqlite3
 import re
+import sys
+from datetime import datetime, timezone
+from typing import List
 from openai import OpenAI as OAI
+from pydantic import BaseModel, Field
 from dotenv import load_dotenv
 
 # ✅ Load API Key
@@ -10,14 +15,53 @@ load_dotenv()
 openai_api_key = os.getenv("OPENAI_API_KEY")
 client = OAI()
 
-with open("services.json", "r", encoding="utf-8") as f:
+# Paths relative to project root (one level up from services/)
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_ROOT)  # allow running as a script: python services/insert_blog_db.py
+
+from services.dedup import canonical_candidates, canonical_url, ensure_dedup_columns, find_near_duplicate, simhash, to_db
+from services.doc_store import refresh_blog_mirror
+from services.fts_index import setup_fts
+from services.recency import ensure_published_at, parse_date
+from services.jsonl_io import iter_records, resolve_input
+
+DB_PATH = os.path.join(PROJECT_ROOT, "neckarmedia.db")
+BLOG_POSTS_PATH = os.path.join(PROJECT_ROOT, "data", "blog_posts.json")
+
+with open(os.path.join(PROJECT_ROOT, "data", "services.json"), "r", encoding="utf-8") as f:
     SERVICE_DATA = json.load(f)
 STANDARDIZED_KEYWORDS = list(SERVICE_DATA["services"].keys()) + ["case study", "testimonial", "client", "reference", "feedback"]
 
+# Enrichment status per article: pending -> done | failed (failed ones are retried in a batch);
+# near-duplicates of a stored article are never enriched or embedded
+STATUS_PENDING, STATUS_DONE, STATUS_FAILED, STATUS_DUPLICATE = "pending", "done", "failed", "duplicate"
+
+
+class BlogEnrichment(BaseModel):
+    """Schema the enrichment model must answer with (JSON structured output)."""
+    summary: str = Field(description="Summary of the article in 3-4 sentences.")
+    companies: List[str] = Field(description="Names of companies mentioned in the article, excluding Neckarmedia itself.")
+    keywords: List[str] = Field(description="Relevant keywords from the standardized keyword list.")
+
+
+def connect_db():
+    """Connect to SQLite database, with foreign keys enforced (off by default in SQLite),
+    so deleting an article also deletes its article_companies rows."""
+    conn = sqlite3.connect(DB_PATH)
+    conn.execute("PRAGMA foreign_keys = ON")
+    return conn
+
+def _ensure_column(cursor, table, column, definition):
+    cursor.execute(f"PRAGMA table_info({table})")
+    if column not in {row[1] for row in cursor.fetchall()}:
+        cursor.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+        return True
+    return False
+
 # ✅ Define Database Setup
 def setup_database():
     """Creates an SQLite database and initializes tables if they don't exist."""
-    conn = sqlite3.connect("neckarmedia.db")
+    conn = connect_db()
     cursor = conn.cursor()
 
     # Create a table for blog articles with summary and keywords
@@ -26,14 +70,51 @@ def setup_database():
             id INTEGER PRIMARY KEY AUTOINCREMENT,
             title TEXT NOT NULL,
             content TEXT NOT NULL,
-            summary TEXT, 
-            keywords TEXT, 
+            summary TEXT,
+            keywords TEXT,
             source_url TEXT,
             date TEXT
         )
     """)
 
+    # Enrichment bookkeeping, so failures can be retried without reloading everything
+    if _ensure_column(cursor, "blog_articles", "enrichment_status", f"TEXT DEFAULT '{STATUS_PENDING}'"):
+        # Existing rows: a real summary means the article was already enriched
+        cursor.execute("""
+            UPDATE blog_articles
+            SET enrichment_status = CASE
+                WHEN summary IS NOT NULL AND summary != 'No summary available' THEN ?
+                ELSE ?
+            END
+        """, (STATUS_DONE, STATUS_FAILED))
+    _ensure_column(cursor, "blog_articles", "enrichment_error", "TEXT")
+    _ensure_column(cursor, "blog_articles", "enriched_at", "TEXT")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_blog_articles_enrichment_status ON blog_articles(enrichment_status)")
+
+    # Companies mentioned per article, normalized so lookups are an indexed query
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS companies (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT NOT NULL UNIQUE COLLATE NOCASE
+        )
+    """)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS article_companies (
+            article_id INTEGER NOT NULL REFERENCES blog_articles(id) ON DELETE CASCADE,
+            company_id INTEGER NOT NULL REFERENCES companies(id) ON DELETE CASCADE,
+            PRIMARY KEY (article_id, company_id)
+        ) WITHOUT ROWID
+    """)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_article_companies_company ON article_companies(company_id)")
     conn.commit()
+
+    # Canonical URL and content fingerprint per article, to link near-duplicates
+    ensure_dedup_columns(conn)
+    # Indexed ISO date parsed from the scraped date text, for recency queries
+    ensure_published_at(conn)
+
+    # Keyword index over the article text, kept current by triggers on blog_articles
+    setup_fts(conn)
     conn.close()
     print("✅ Database setup complete.")
 
@@ -49,101 +130,196 @@ def extract_keywords(text):
     return ", ".join(found_keywords) if found_keywords else "miscellaneous"
 
 def enrich_blog_content(title, content):
-    """Uses GPT-4 to generate a summary, extract company names, and assign keywords."""
-    
+    """Uses GPT-4o with a JSON schema to generate a summary, extract company names and assign keywords.
+
+    Returns (summary, keywords, companies); raises if the model returns no valid
+    structured output, so the caller can mark the article for a retry.
+    """
     prompt = f"""
     **Task:** Summarize this blog article, extract relevant company names, and assign standardized keywords.
-    
+
     **Blog Title:** {title}
 
-    **Content:** {content[:2000]}  # Limit to avoid token overflow
+    **Content:** {content[:2000]}
 
     **Instructions:**
     1. Summarize the article in 3-4 sentences.
     2. Extract any **company names** from the text.
     3. Assign relevant keywords from this list: {", ".join(STANDARDIZED_KEYWORDS)}.
     4. If the article is about a **client reference, case study, or testimonial**, include `"case study"`, `"client"`, or `"reference"` as keywords.
-    
-    **Format:**
-    Summary: <summary>
-    Companies: <comma-separated company names>
-    Keywords: <comma-separated keywords>
     """
 
-    response = client.chat.completions.create(
+    response = client.chat.completions.parse(
         model="gpt-4o",
         messages=[{"role": "system", "content": "You extract summaries, company names, and keywords from articles."},
                   {"role": "user", "content": prompt}],
+        response_format=BlogEnrichment,
         temperature=0.5
     )
 
-    result_text = response.choices[0].message.content.strip()
-
-    try:
-        summary = re.search(r"Summary:\s*(.*)", result_text).group(1).strip()
-        companies = re.search(r"Companies:\s*(.*)", result_text).group(1).strip()
-        keywords = re.search(r"Keywords:\s*(.*)", result_text).group(1).strip()
-    except AttributeError:
-        summary, companies, keywords = "No summary available", "", "miscellaneous"
+    message = response.choices[0].message
+    if message.refusal or message.parsed is None:
+        raise ValueError(f"No structured enrichment returned: {message.refusal or 'empty response'}")
+    enrichment = message.parsed
 
     # ✅ Ensure non-empty keywords and prevent duplicates
     extracted_keywords = extract_keywords(content)  # Standardized keyword extraction
-    all_keywords = list(set(keywords.split(", ") + extracted_keywords.split(", ")))  # Avoid duplicates
+    all_keywords = list(dict.fromkeys(
+        [kw.strip() for kw in enrichment.keywords if kw.strip()] + extracted_keywords.split(", ")
+    ))
+    companies = list(dict.fromkeys(c.strip() for c in enrichment.companies if c.strip()))
+
+    return enrichment.summary.strip(), ", ".join(all_keywords), companies
 
-    return summary, ", ".join(all_keywords)
+def store_companies(cursor, article_id, companies):
+    """Replaces the article's company links, creating companies as needed."""
+    cursor.execute("DELETE FROM article_companies WHERE article_id = ?", (article_id,))
+    for name in companies:
+        cursor.execute("INSERT OR IGNORE INTO companies (name) VALUES (?)", (name,))
+        cursor.execute("SELECT id FROM companies WHERE name = ?", (name,))
+        company_id = cursor.fetchone()[0]
+        cursor.execute("INSERT OR IGNORE INTO article_companies (article_id, company_id) VALUES (?, ?)",
+                       (article_id, company_id))
 
-def insert_or_update_blog_article(title, content, source_url, date):
-    """Inserts a new blog article or updates only the summary and keywords."""
-    summary, keywords = enrich_blog_content(title, content)
+def _now():
+    return datetime.now(timezone.utc).isoformat(timespec="seconds")
 
-    conn = sqlite3.connect("neckarmedia.db")
+def enrich_article(cursor, article_id, title, content):
+    """Enriches one stored article and records the outcome; returns True on success."""
+    try:
+        summary, keywords, companies = enrich_blog_content(title, content)
+    except Exception as e:
+        cursor.execute("""
+            UPDATE blog_articles SET enrichment_status = ?, enrichment_error = ? WHERE id = ?
+        """, (STATUS_FAILED, str(e)[:500], article_id))
+        print(f"⚠️ Enrichment failed for: {title} ({e})")
+        return False
+
+    cursor.execute("""
+        UPDATE blog_articles
+        SET summary = ?, keywords = ?, enrichment_status = ?, enrichment_error = NULL, enriched_at = ?
+        WHERE id = ?
+    """, (summary, keywords, STATUS_DONE, _now(), article_id))
+    store_companies(cursor, article_id, companies)
+    return True
+
+def insert_or_update_blog_article(title, content, source_url, date, force=False):
+    """Inserts a new blog article or updates only the summary and keywords.
+
+    Articles that were already enriched successfully are skipped unless ``force``.
+    A new article whose text nearly matches a stored one (SimHash) is stored
+    as a duplicate linked to it, without enrichment or embedding.
+    """
+    conn = connect_db()
     cursor = conn.cursor()
+    url = canonical_url(source_url)
+    fingerprint = simhash(content)
 
-    # ✅ First, check if the article already exists
-    cursor.execute("SELECT id FROM blog_articles WHERE title = ?", (title,))
+    # ✅ First, check if the article already exists (same canonical URL, or same title)
+    cursor.execute("""
+        SELECT id, enrichment_status FROM blog_articles WHERE canonical_url = ? OR title = ?
+        ORDER BY canonical_url = ? DESC, id LIMIT 1
+    """, (url, title, url))
     existing_article = cursor.fetchone()
 
     if existing_article:
+        article_id, status = existing_article
+        cursor.execute("UPDATE blog_articles SET canonical_url = ?, simhash = ?, published_at = ? WHERE id = ?",
+                       (url, to_db(fingerprint), parse_date(date), article_id))
+        if status in (STATUS_DONE, STATUS_DUPLICATE) and not force:
+            conn.commit()
+            conn.close()
+            print(f"⏭️ Already {'enriched' if status == STATUS_DONE else 'stored as a duplicate'}: {title}")
+            return
         # ✅ If exists, only update summary and keywords
-        cursor.execute("""
-            UPDATE blog_articles 
-            SET summary = ?, keywords = ? 
-            WHERE title = ?
-        """, (summary, keywords, title))
-        print(f"🔄 Updated summary/keywords for: {title}")
+        if enrich_article(cursor, article_id, title, content):
+            print(f"🔄 Updated summary/keywords for: {title}")
 
     else:
-        # ✅ If not exists, insert new article
+        original = find_near_duplicate(fingerprint, canonical_candidates(conn))
+        if original is not None:
+            # 🔗 Same text under another URL: link it, skip the LLM and the embedding
+            cursor.execute("""
+                INSERT INTO blog_articles (title, content, source_url, date, published_at, enrichment_status,
+                                           canonical_url, simhash, duplicate_of)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """, (title, content, source_url, date, parse_date(date), STATUS_DUPLICATE, url, to_db(fingerprint), original))
+            print(f"🔗 Near-duplicate of article {original}, not enriched: {title}")
+            conn.commit()
+            conn.close()
+            return
+
+        # ✅ If not exists, insert new article (pending), then enrich it
         cursor.execute("""
-            INSERT INTO blog_articles (title, content, summary, keywords, source_url, date)
-            VALUES (?, ?, ?, ?, ?, ?)
-        """, (title, content, summary, keywords, source_url, date))
-        print(f"✅ Inserted new article: {title}")
+            INSERT INTO blog_articles (title, content, source_url, date, published_at, enrichment_status,
+                                       canonical_url, simhash)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        """, (title, content, source_url, date, parse_date(date), STATUS_PENDING, url, to_db(fingerprint)))
+        if enrich_article(cursor, cursor.lastrowid, title, content):
+            print(f"✅ Inserted new article: {title}")
 
     conn.commit()
     conn.close()
 
+def retry_failed_enrichments(limit=None):
+    """Re-runs enrichment only for articles whose enrichment failed or never ran."""
+    conn = connect_db()
+    cursor = conn.cursor()
+    query = "SELECT id, title, content FROM blog_articles WHERE enrichment_status IN (?, ?) ORDER BY id"
+    params = [STATUS_FAILED, STATUS_PENDING]
+    if limit:
+        query += " LIMIT ?"
+        params.append(limit)
+    pending = cursor.execute(query, params).fetchall()
+
+    succeeded = 0
+    for article_id, title, content in pending:
+        if enrich_article(cursor, article_id, title, content):
+            succeeded += 1
+        conn.commit()  # keep progress if the batch is interrupted
+
+    refresh_blog_mirror(conn)  # new summaries reach the document store's blog chunks
+    conn.close()
+    print(f"✅ Retried {len(pending)} articles: {succeeded} enriched, {len(pending) - succeeded} still failing.")
+
+def find_articles_by_company(company_name):
+    """Returns (id, title, source_url) of articles mentioning a company (indexed lookup)."""
+    conn = connect_db()
+    rows = conn.execute("""
+        SELECT a.id, a.title, a.source_url
+        FROM companies c
+        JOIN article_companies ac ON ac.company_id = c.id
+        JOIN blog_articles a ON a.id = ac.article_id
+        WHERE c.name = ?
+        ORDER BY a.id
+    """, (company_name,)).fetchall()
+    conn.close()
+    return rows
+
 # ✅ Load Blog Articles from JSON
-def load_articles_from_json(json_path="blog_posts.json"):
-    """Loads blog articles from a JSON file and inserts them into the database."""
-    
+def load_articles_from_json(json_path=BLOG_POSTS_PATH, force=False):
+    """Streams blog articles from the crawler output and inserts them into the database.
+
+    Reads ``blog_posts.jsonl`` when it exists next to the given ``.json`` path,
+    one record at a time, so memory stays flat however large the crawl is.
+    Articles already enriched are skipped, so a rerun resumes where it stopped.
+    """
+    json_path = resolve_input(json_path)
     if not os.path.exists(json_path):
         print(f"❌ Error: JSON file not found at {json_path}")
         return
 
+    print(f"📂 Streaming blog articles from {json_path}")
+    count = 0
     try:
-        with open(json_path, "r", encoding="utf-8") as f:
-            articles = json.load(f)
-        
-        print(f"📂 Loaded {len(articles)} blog articles from {json_path}")
-
-        for article in articles:
+        for article in iter_records(json_path):
             title = article.get("title", "Untitled")
             content = article.get("content", "No content available")
             source_url = article.get("url", "No URL")
             date = article.get("date", "Unknown Date")
 
-            insert_or_update_blog_article(title, content, source_url, date)
+            insert_or_update_blog_article(title, content, source_url, date, force=force)
+            count += 1
 
     except json.JSONDecodeError as e:
         print(f"❌ JSON decoding error: {e}")
@@ -151,8 +327,24 @@ def load_articles_from_json(json_path="blog_posts.json"):
     except Exception as e:
         print(f"❌ Unexpected error: {e}")
 
+    print(f"📂 Processed {count} blog articles")
+    conn = connect_db()
+    try:
+        refresh_blog_mirror(conn)  # new summaries reach the document store's blog chunks
+    finally:
+        conn.close()
+
 
 # ✅ Run the Setup & Load Articles
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load, enrich and store blog articles.")
+    parser.add_argument("json_path", nargs="?", default=BLOG_POSTS_PATH, help="Crawled blog posts (.jsonl, or a legacy .json array)")
+    parser.add_argument("--retry-failed", action="store_true", help="Only re-enrich articles whose enrichment failed")
+    parser.add_argument("--force", action="store_true", help="Re-enrich articles that were already enriched")
+    args = parser.parse_args()
+
     setup_database()
-    load_articles_from_json()
+    if args.retry_failed:
+        retry_failed_enrichments()
+    else:
+        load_articles_from_json(args.json_path, force=args.force)
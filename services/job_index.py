@@ -0,0 +1,84 @@
+import os
+import re
+import threading
+import time
+
+import numpy as np
+
+from services import metrics
+
+JOB_MATCH_THRESHOLD = float(os.getenv("JOB_MATCH_THRESHOLD", "0.45"))  # min cosine similarity for a role-specific answer
+JOB_MATCH_MARGIN = float(os.getenv("JOB_MATCH_MARGIN", "0.05"))        # other postings this close to the best are included
+JOB_TOP_K = int(os.getenv("JOB_TOP_K", "2"))                           # max full postings per answer
+
+# Title words that don't identify a role on their own
+_GENERIC_TITLE_WORDS = {
+    "m", "w", "d", "x", "manager", "managerin", "mitarbeiter", "mitarbeiterin", "junior", "senior", "und", "für",
+    "mit", "als", "in", "im", "the", "and", "for", "of", "job", "stelle", "vollzeit", "teilzeit", "remote",
+}
+
+
+def job_text(job):
+    return f"{job.get('title', '')}\n{job.get('profile', '')}"
+
+
+def title_words(title):
+    return {w for w in re.findall(r"\w+", (title or "").lower()) if len(w) > 1 and w not in _GENERIC_TITLE_WORDS}
+
+
+class JobIndex:
+    """The current job postings, embedded once per scrape.
+
+    ``select`` returns only the postings a question is about (by title words
+    or embedding similarity); a generic question ("any open positions?") gets
+    a compact title list instead of every full profile.
+    """
+
+    def __init__(self, threshold=JOB_MATCH_THRESHOLD, margin=JOB_MATCH_MARGIN, top_k=JOB_TOP_K):
+        self.threshold = threshold
+        self.margin = margin
+        self.top_k = top_k
+        self._lock = threading.Lock()
+        self._indexed = (None, None, ())  # (jobs list, matrix, title words per job)
+
+    def build(self, jobs, encode):
+        """Embeds a freshly scraped job list; returns it unchanged (for use as a cache factory)."""
+        if jobs and not any("error" in job for job in jobs):
+            started = time.perf_counter()
+            matrix = np.asarray(encode([job_text(job) for job in jobs]), dtype=np.float32)
+            with self._lock:
+                self._indexed = (jobs, matrix, [title_words(job.get("title")) for job in jobs])
+            metrics.observe("jobs.index_ms", (time.perf_counter() - started) * 1000)
+        return jobs
+
+    def _ensure(self, jobs, encode):
+        indexed = self._indexed
+        if indexed[0] is not jobs:
+            self.build(jobs, encode)
+            indexed = self._indexed
+        return indexed
+
+    def select(self, user_query, jobs, encode):
+        """Returns the postings for a question: full matches, or a compact list of all titles."""
+        if not jobs or any("error" in job for job in jobs):
+            return jobs
+        _, matrix, words = self._ensure(jobs, encode)
+
+        query_words = set(re.findall(r"\w+", user_query.lower()))
+        by_title = [i for i, title in enumerate(words) if title & query_words]
+        scores = matrix @ np.asarray(encode([user_query])[0], dtype=np.float32)
+        best = float(scores.max())
+
+        if by_title:
+            rows = sorted(by_title, key=lambda i: -scores[i])[:self.top_k]
+        elif best >= self.threshold:
+            rows = [i for i in np.argsort(-scores)[:self.top_k] if scores[i] >= best - self.margin]
+        else:
+            metrics.incr("jobs.compact")
+            return [{"title": job["title"], "apply_link": job["apply_link"]} for job in jobs]
+
+        metrics.incr("jobs.matched")
+        return [jobs[i] for i in rows]
+
+
+job_index = JobIndex()
@@ -0,0 +1,116 @@
+import json
+import os
+import sys
+
+CHUNK_SIZE = 1 << 16  # bytes read at a time when streaming a legacy JSON array
+
+
+def iter_jsonl(path):
+    """Yields one record per non-empty line of a JSON Lines file.
+
+    A truncated last line (e.g. the writer was killed mid-record) is skipped,
+    so an interrupted run can always be resumed from what was written.
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        for line_number, line in enumerate(f, start=1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError:
+                print(f"⚠️ Skipping unreadable line {line_number} in {path}")
+
+
+def iter_json_array(path, chunk_size=CHUNK_SIZE):
+    """Yields the elements of a top-level JSON array without loading the whole file."""
+    decoder = json.JSONDecoder()
+    with open(path, "r", encoding="utf-8") as f:
+        buffer = f.read(chunk_size).lstrip()
+        if not buffer.startswith("["):
+            raise ValueError(f"{path} does not contain a JSON array")
+        buffer = buffer[1:]
+        eof = False
+        while True:
+            buffer = buffer.lstrip()
+            if buffer.startswith(","):
+                buffer = buffer[1:].lstrip()
+            if buffer.startswith("]"):
+                return
+            try:
+                record, end = decoder.raw_decode(buffer)
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+                chunk = f.read(chunk_size)
+                eof = not chunk
+                buffer += chunk
+                continue
+            yield record
+            buffer = buffer[end:]
+
+
+def iter_records(path):
+    """Streams records from a .jsonl file or a legacy .json array file."""
+    if path.endswith(".jsonl"):
+        return iter_jsonl(path)
+    return iter_json_array(path)
+
+
+def resolve_input(path):
+    """Prefers the JSON Lines variant of a .json path if it exists."""
+    if path.endswith(".json") and os.path.exists(path + "l"):
+        return path + "l"
+    return path
+
+
+def processed_keys(path, key):
+    """Keys of the records already in a JSON Lines output, i.e. the resume checkpoint."""
+    if not os.path.exists(path):
+        return set()
+    return {record.get(key) for record in iter_jsonl(path)}
+
+
+class JsonlAppender:
+    """Appends records to a JSON Lines file, flushing each one so progress survives crashes."""
+
+    def __init__(self, path):
+        self.path = path
+        self.count = 0
+        self._file = None
+
+    def __enter__(self):
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        needs_newline = False
+        if os.path.exists(self.path) and os.path.getsize(self.path):
+            with open(self.path, "rb") as f:
+                f.seek(-1, os.SEEK_END)
+                needs_newline = f.read(1) != b"\n"
+        self._file = open(self.path, "a", encoding="utf-8")
+        if needs_newline:
+            self._file.write("\n")  # close off a record truncated by a crash
+        return self
+
+    def write(self, record):
+        self._file.write(json.dumps(record, ensure_ascii=False) + "\n")
+        self._file.flush()
+        self.count += 1
+
+    def __exit__(self, *exc):
+        self._file.close()
+
+
+def convert_json_to_jsonl(src, dst):
+    """Converts a legacy JSON array file to JSON Lines, record by record."""
+    with JsonlAppender(dst) as out:
+        for record in iter_json_array(src):
+            out.write(record)
+    return out.count
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 3:
+        print("Usage: python services/jsonl_io.py <input.json> <output.jsonl>")
+        sys.exit(1)
+    count = convert_json_to_jsonl(sys.argv[1], sys.argv[2])
+    print(f"✅ Converted {count} records to {sys.argv[2]}")
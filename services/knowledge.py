@@ -0,0 +1,284 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+import numpy as np
+
+from services import knowledge_artifact, quantize
+from services.context_budget import compact_json, prepare_items
+from services.dedup import unique_articles_sql
+from services.doc_store import SOURCE_BLOG, load_index
+from services.recency import parse_date, published_at_sql, published_days
+
+# Paths relative to project root (one level up from services/)
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DB_PATH = os.path.join(PROJECT_ROOT, "neckarmedia.db")
+SERVICES_PATH = os.path.join(PROJECT_ROOT, "data", "services.json")
+LATEST_INFO_PATH = os.path.join(PROJECT_ROOT, "data", "latest_info.json")
+# Everything a snapshot is built from, including SQLite's write-ahead log (uncheckpointed commits)
+SOURCE_PATHS = (DB_PATH, DB_PATH + "-wal", SERVICES_PATH, LATEST_INFO_PATH)
+# Prebuilt, memory-mapped snapshot (python services/knowledge_artifact.py build); empty disables
+KNOWLEDGE_ARTIFACT_DIR = os.getenv("KNOWLEDGE_ARTIFACT_DIR", os.path.join(PROJECT_ROOT, "data", "knowledge_artifact"))
+
+# How often (seconds) the background refresher checks the sources for changes
+REFRESH_INTERVAL = float(os.getenv("KNOWLEDGE_REFRESH_INTERVAL", "5"))
+
+
+class KnowledgeSnapshot:
+    """Read-only view of all knowledge the agent uses to answer one request.
+
+    A snapshot is never mutated after it is built. Refreshes build a new
+    snapshot and swap the module-level reference, so a request that grabbed
+    a snapshot keeps a consistent view until it finishes.
+    """
+
+    def __init__(self, version, services, latest_info, articles, matrix, tag_index, precomputed=None):
+        self.version = version
+        self.services = services
+        self.latest_info = latest_info
+        self.articles = articles        # one entry per chunk: {"id", "document_id", "source_type", "title", "summary", "source_url", "keywords", "published_at"}
+        self.matrix = matrix            # (n_chunks, dim) float32, rows L2-normalized (read-only memmap when prebuilt)
+        self.tag_index = tag_index      # keyword -> tuple of row indices into articles/matrix
+        self.vector_index = quantize.build_index(matrix)  # compressed first-pass copy, None unless VECTOR_QUANTIZATION
+        self.built_at = time.time()
+        # Everything below is derived from the sources above; a prebuilt
+        # artifact (services/knowledge_artifact.py) passes it in ready-made
+        precomputed = precomputed or {}
+
+        # Publication day per row (NaN if undated) and dated rows newest first, for recency queries
+        self.published_days = precomputed.get("published_days")
+        if self.published_days is None:
+            self.published_days = np.array([published_days(a.get("published_at")) for a in articles], dtype=np.float64)
+        self.recent_rows = precomputed.get("recent_rows")
+        if self.recent_rows is None:
+            dated = np.flatnonzero(~np.isnan(self.published_days))
+            self.recent_rows = tuple(dated[np.argsort(-self.published_days[dated], kind="stable")].tolist())
+
+        # Pre-rendered context strings and token-counted context items, so
+        # requests don't re-serialize or re-tokenize the static JSON sources
+        self.services_context = precomputed.get("services_context") or compact_json(services)
+        self.services_items = precomputed.get("services_items") or prepare_items(services)
+        self.latest_info_items = precomputed.get("latest_info_items") or prepare_items(latest_info)
+
+    def articles_with_tag(self, tag):
+        """Returns the articles tagged with a standardized keyword."""
+        return [self.articles[i] for i in self.tag_index.get(tag.strip().lower(), ())]
+
+
+def _mtime(path):
+    try:
+        return os.stat(path).st_mtime_ns
+    except FileNotFoundError:
+        return None
+
+
+def _load_json(path, fallback):
+    """Loads a JSON file, keeping the fallback if it is missing or invalid."""
+    if not os.path.exists(path):
+        print(f"❌ Error: JSON file not found at {path}")
+        return fallback
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except json.JSONDecodeError as e:
+        print(f"❌ JSON decoding error in {path}: {e}")
+        return fallback
+
+
+def _load_articles(db_path):
+    """Loads the unified document store, or the blog table if the store wasn't built yet."""
+    index = load_index(db_path)
+    if index is not None:
+        return index
+    return _load_blog_articles(db_path)
+
+
+def _load_blog_articles(db_path):
+    """Reads articles and decodes their embeddings into a normalized matrix."""
+    conn = sqlite3.connect(db_path)
+    try:
+        rows = conn.execute(
+            f"SELECT id, title, summary, source_url, keywords, embedding, {published_at_sql(conn)} FROM blog_articles "
+            f"WHERE embedding IS NOT NULL AND {unique_articles_sql(conn)} ORDER BY id"
+        ).fetchall()
+    finally:
+        conn.close()
+
+    articles, vectors, tag_index = [], [], {}
+    for article_id, title, summary, source_url, keywords, embedding, published in rows:
+        row = len(articles)
+        articles.append({
+            "id": article_id,
+            "document_id": article_id,
+            "source_type": SOURCE_BLOG,
+            "title": title,
+            "summary": summary,
+            "source_url": source_url,
+            "keywords": keywords,
+            "published_at": parse_date(published),
+        })
+        vectors.append(json.loads(embedding))
+        for kw in (keywords or "").split(","):
+            kw = kw.strip().lower()
+            if kw:
+                tag_index.setdefault(kw, []).append(row)
+
+    if vectors:
+        matrix = np.asarray(vectors, dtype=np.float32)
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        matrix /= np.where(norms == 0, 1.0, norms)
+    else:
+        matrix = np.zeros((0, 0), dtype=np.float32)
+
+    return articles, matrix, {k: tuple(v) for k, v in tag_index.items()}
+
+
+def build_snapshot(version=None):
+    """Builds a fresh snapshot: from the prebuilt artifact if it matches the sources, else from scratch."""
+    if KNOWLEDGE_ARTIFACT_DIR:
+        try:
+            parts = knowledge_artifact.load(KNOWLEDGE_ARTIFACT_DIR, SOURCE_PATHS)
+        except Exception as e:
+            print(f"⚠️ Knowledge artifact unusable, building from the sources: {e}")
+            parts = None
+        if parts is not None:
+            return KnowledgeSnapshot(version, **parts)
+    return build_snapshot_from_sources(version)
+
+
+def build_snapshot_from_sources(version=None):
+    """Builds a fresh snapshot from the database and JSON files."""
+    services = _load_json(SERVICES_PATH, {})
+    latest_info = _load_json(LATEST_INFO_PATH, {"error": "Employee data file is missing."})
+    articles, matrix, tag_index = _load_articles(DB_PATH)
+    return KnowledgeSnapshot(version, services, latest_info, articles, matrix, tag_index)
+
+
+_current = None
+_build_lock = threading.Lock()
+
+
+def get_snapshot():
+    """Returns the current snapshot, building it on first use."""
+    snapshot = _current
+    if snapshot is None:
+        with _build_lock:
+            if _current is None:
+                _swap(build_snapshot())
+            snapshot = _current
+    return snapshot
+
+
+def _swap(snapshot):
+    global _current
+    _current = snapshot  # single reference assignment, atomic for readers
+
+
+class KnowledgeRefresher(threading.Thread):
+    """Background thread that rebuilds the snapshot when its sources change.
+
+    Changes are detected through SQLite's ``PRAGMA data_version`` (bumped when
+    another connection commits) and the mtimes of the DB and JSON files, which
+    also catches a bind-mounted file being replaced wholesale.
+    """
+
+    def __init__(self, interval=REFRESH_INTERVAL):
+        super().__init__(name="knowledge-refresher", daemon=True)
+        self.interval = interval
+        self._stop_event = threading.Event()
+        self._conn = None
+        self._db_mtime = None
+
+    def stop(self):
+        self._stop_event.set()
+
+    def _data_version(self):
+        db_mtime = _mtime(DB_PATH)
+        if self._conn is None or db_mtime != self._db_mtime:
+            # The file may have been swapped out; reopen so we watch the new one
+            if self._conn is not None:
+                self._conn.close()
+            self._conn = sqlite3.connect(DB_PATH, check_same_thread=False)
+            self._db_mtime = db_mtime
+        return self._conn.execute("PRAGMA data_version").fetchone()[0]
+
+    def signature(self):
+        """Fingerprint of all knowledge sources; changes whenever one of them does."""
+        return (
+            self._data_version(),
+            _mtime(DB_PATH),
+            _mtime(DB_PATH + "-wal"),
+            _mtime(SERVICES_PATH),
+            _mtime(LATEST_INFO_PATH),
+        )
+
+    def close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    def run(self):
+        last = self.signature()
+        current_version = getattr(_current, "version", None)
+        # A snapshot built elsewhere (e.g. by a pre-fork master) carries another
+        # connection's data_version; only the file mtimes are comparable
+        if current_version is not None and current_version[1:] != last[1:]:
+            last = current_version
+        while not self._stop_event.wait(self.interval):
+            try:
+                current = self.signature()
+                if current == last:
+                    continue
+                started = time.perf_counter()
+                snapshot = build_snapshot(version=current)
+                _swap(snapshot)
+                last = current
+                print(f"🔄 Knowledge snapshot reloaded: {len(snapshot.articles)} articles "
+                      f"in {(time.perf_counter() - started) * 1000:.0f} ms")
+            except Exception as e:
+                # Keep serving the previous snapshot; try again next tick
+                print(f"⚠️ Knowledge refresh failed: {e}")
+        self.close()
+
+
+_refresher = None
+
+
+def start_refresher(interval=REFRESH_INTERVAL):
+    """Builds the initial snapshot and starts watching the sources for changes."""
+    global _refresher
+    if _refresher is not None and _refresher.is_alive():
+        return _refresher
+
+    refresher = KnowledgeRefresher(interval)
+    with _build_lock:
+        if _current is None:
+            _swap(build_snapshot(version=refresher.signature()))
+    if interval > 0:
+        _refresher = refresher
+        _refresher.start()
+    return _refresher
+
+
+def preload_snapshot():
+    """Builds the snapshot without starting a refresher, e.g. in a server's pre-fork master.
+
+    Forked workers inherit it, so their ``start_refresher`` doesn't rebuild it.
+    """
+    refresher = KnowledgeRefresher()
+    try:
+        with _build_lock:
+            if _current is None:
+                _swap(build_snapshot(version=refresher.signature()))
+    finally:
+        refresher.close()  # never carry an open SQLite connection across fork
+    return _current
+
+
+def stop_refresher():
+    """Stops the background refresher, if running."""
+    global _refresher
+    if _refresher is not None:
+        _refresher.stop()
+        _refresher = None
@@ -0,0 +1,233 @@
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+# Paths relative to project root (one level up from services/)
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_ROOT)  # allow running as a script: python services/knowledge_artifact.py
+
+from services.context_budget import ContextItem
+
+FORMAT_VERSION = 1
+CURRENT_FILE = "CURRENT"     # name of the active version directory, replaced atomically
+MANIFEST_FILE = "manifest.json"
+KEEP_VERSIONS = int(os.getenv("KNOWLEDGE_ARTIFACT_KEEP", "2"))  # older versions are pruned after a build
+
+
+def source_hash(paths):
+    """SHA-256 over the contents of the knowledge sources (missing files count as empty)."""
+    digest = hashlib.sha256()
+    for path in paths:
+        digest.update(os.path.basename(path).encode("utf-8") + b"\0")
+        if os.path.exists(path):
+            with open(path, "rb") as f:
+                for block in iter(lambda: f.read(1 << 20), b""):
+                    digest.update(block)
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+def source_signature(paths):
+    """Cheap fingerprint of the knowledge sources: [name, size, mtime_ns] per file (None if missing)."""
+    signature = []
+    for path in paths:
+        try:
+            stat = os.stat(path)
+            signature.append([os.path.basename(path), stat.st_size, stat.st_mtime_ns])
+        except FileNotFoundError:
+            signature.append([os.path.basename(path), None, None])
+    return signature
+
+
+def is_current(manifest, source_paths):
+    """Whether an artifact was built from these sources.
+
+    Unchanged sizes and mtimes are enough; only when they differ (e.g. files
+    copied into an image) are the contents hashed and compared.
+    """
+    if manifest.get("format") != FORMAT_VERSION:
+        return False
+    if manifest.get("source_signature") == source_signature(source_paths):
+        return True
+    return manifest.get("source_hash") == source_hash(source_paths)
+
+
+def _items_to_json(items):
+    return [[item.label, item.text, item.tokens] for item in items]
+
+
+def _items_from_json(rows):
+    return [ContextItem(label, text, position, tokens) for position, (label, text, tokens) in enumerate(rows)]
+
+
+def _write_json(path, data):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, separators=(",", ":"))
+
+
+def current_version(artifact_dir):
+    try:
+        with open(os.path.join(artifact_dir, CURRENT_FILE), "r", encoding="utf-8") as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+def has_current_version(artifact_dir, source_paths):
+    """Whether the active version was built from these sources; reads only its manifest."""
+    version = current_version(artifact_dir)
+    if version is None:
+        return False
+    with open(os.path.join(artifact_dir, version, MANIFEST_FILE), "r", encoding="utf-8") as f:
+        return is_current(json.load(f), source_paths)
+
+
+def write(snapshot, artifact_dir, source_paths, keep=KEEP_VERSIONS):
+    """Writes a snapshot as a new artifact version and makes it current; returns the version name.
+
+    The version directory is filled under a temporary name and renamed into
+    place, then ``CURRENT`` is replaced atomically, so workers starting
+    meanwhile see either the old or the new version, never a partial one.
+    """
+    signature = source_signature(source_paths)
+    digest = source_hash(source_paths)
+    version = digest[:16]
+    os.makedirs(artifact_dir, exist_ok=True)
+    target = os.path.join(artifact_dir, version)
+
+    if not os.path.exists(os.path.join(target, MANIFEST_FILE)):
+        tmp = tempfile.mkdtemp(prefix=".build-", dir=artifact_dir)
+        os.chmod(tmp, 0o755)  # mkdtemp is owner-only; workers may run as another user
+        try:
+            matrix = np.ascontiguousarray(snapshot.matrix, dtype=np.float32)
+            np.save(os.path.join(tmp, "embeddings.npy"), matrix)
+            np.save(os.path.join(tmp, "published_days.npy"), np.asarray(snapshot.published_days, dtype=np.float64))
+            np.save(os.path.join(tmp, "recent_rows.npy"), np.asarray(snapshot.recent_rows, dtype=np.int64))
+            _write_json(os.path.join(tmp, "articles.json"), snapshot.articles)
+            _write_json(os.path.join(tmp, "knowledge.json"), {
+                "services": snapshot.services,
+                "latest_info": snapshot.latest_info,
+                "tag_index": {tag: list(rows) for tag, rows in snapshot.tag_index.items()},
+                "services_context": snapshot.services_context,
+                "services_items": _items_to_json(snapshot.services_items),
+                "latest_info_items": _items_to_json(snapshot.latest_info_items),
+            })
+            # Manifest last: a version directory without one is never loaded
+            _write_json(os.path.join(tmp, MANIFEST_FILE), {
+                "format": FORMAT_VERSION,
+                "source_hash": digest,
+                "source_signature": signature,
+                "sources": [os.path.basename(path) for path in source_paths],
+                "built_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+                "rows": int(matrix.shape[0]),
+                "dim": int(matrix.shape[1]) if matrix.ndim == 2 else 0,
+            })
+            shutil.rmtree(target, ignore_errors=True)
+            os.rename(tmp, target)
+        except BaseException:
+            shutil.rmtree(tmp, ignore_errors=True)
+            raise
+
+    pointer = os.path.join(artifact_dir, f".{CURRENT_FILE}.tmp")
+    with open(pointer, "w", encoding="utf-8") as f:
+        f.write(version)
+    os.replace(pointer, os.path.join(artifact_dir, CURRENT_FILE))
+    prune(artifact_dir, keep)
+    return version
+
+
+def prune(artifact_dir, keep=KEEP_VERSIONS):
+    """Removes all but the ``keep`` newest versions (never the current one)."""
+    current = current_version(artifact_dir)
+    versions = sorted(
+        (name for name in os.listdir(artifact_dir)
+         if os.path.isfile(os.path.join(artifact_dir, name, MANIFEST_FILE))),
+        key=lambda name: os.path.getmtime(os.path.join(artifact_dir, name, MANIFEST_FILE)),
+        reverse=True,
+    )
+    for name in versions[max(keep, 1):]:
+        if name != current:
+            shutil.rmtree(os.path.join(artifact_dir, name), ignore_errors=True)
+
+
+def load(artifact_dir, source_paths):
+    """Opens the current artifact if it was built from exactly these sources; returns snapshot parts or None.
+
+    The embedding matrix is memory-mapped read-only, so all worker processes
+    share one copy in the page cache instead of each decoding its own.
+    """
+    version = current_version(artifact_dir)
+    if version is None:
+        return None
+    path = os.path.join(artifact_dir, version)
+    with open(os.path.join(path, MANIFEST_FILE), "r", encoding="utf-8") as f:
+        manifest = json.load(f)
+    if not is_current(manifest, source_paths):
+        print(f"⚠️ Knowledge artifact {version} is stale (sources changed since it was built)")
+        return None
+
+    with open(os.path.join(path, "articles.json"), "r", encoding="utf-8") as f:
+        articles = json.load(f)
+    with open(os.path.join(path, "knowledge.json"), "r", encoding="utf-8") as f:
+        knowledge = json.load(f)
+    if manifest["rows"]:
+        matrix = np.load(os.path.join(path, "embeddings.npy"), mmap_mode="r")
+    else:
+        matrix = np.zeros((0, 0), dtype=np.float32)  # an empty file can't be memory-mapped
+    return {
+        "services": knowledge["services"],
+        "latest_info": knowledge["latest_info"],
+        "articles": articles,
+        "matrix": matrix,
+        "tag_index": {tag: tuple(rows) for tag, rows in knowledge["tag_index"].items()},
+        "precomputed": {
+            "published_days": np.load(os.path.join(path, "published_days.npy")),
+            "recent_rows": tuple(np.load(os.path.join(path, "recent_rows.npy")).tolist()),
+            "services_context": knowledge["services_context"],
+            "services_items": _items_from_json(knowledge["services_items"]),
+            "latest_info_items": _items_from_json(knowledge["latest_info_items"]),
+        },
+    }
+
+
+def main():
+    from services import knowledge
+
+    parser = argparse.ArgumentParser(description="Prebuild the knowledge snapshot as a memory-mappable artifact.")
+    parser.add_argument("command", choices=["build", "check"], help="build: write a new version; check: is it current?")
+    parser.add_argument("--dir", default=knowledge.KNOWLEDGE_ARTIFACT_DIR or
+                        os.path.join(PROJECT_ROOT, "data", "knowledge_artifact"))
+    parser.add_argument("--if-stale", action="store_true",
+                        help="build: skip when the current version already matches the sources")
+    args = parser.parse_args()
+
+    if args.command == "check":
+        started = time.perf_counter()
+        parts = load(args.dir, knowledge.SOURCE_PATHS)
+        if parts is None:
+            print(f"❌ No current artifact in {args.dir}; run: python services/knowledge_artifact.py build")
+            sys.exit(1)
+        print(f"✅ Artifact {current_version(args.dir)} is current: {len(parts['articles'])} rows, "
+              f"opened in {(time.perf_counter() - started) * 1000:.0f} ms")
+        return
+
+    if args.if_stale and has_current_version(args.dir, knowledge.SOURCE_PATHS):
+        print(f"✅ Knowledge artifact {current_version(args.dir)} is current, nothing to build")
+        return
+
+    started = time.perf_counter()
+    snapshot = knowledge.build_snapshot_from_sources()
+    version = write(snapshot, args.dir, knowledge.SOURCE_PATHS)
+    print(f"✅ Knowledge artifact {version}: {len(snapshot.articles)} rows, "
+          f"built in {(time.perf_counter() - started) * 1000:.0f} ms -> {os.path.join(args.dir, version)}")
+
+
+if __name__ == "__main__":
+    main()
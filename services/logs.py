@@ -0,0 +1,195 @@
+import atexit
+import contextvars
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import sys
+import threading
+import time
+
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()           # DEBUG adds (sampled) prompts, context and answers
+LOG_FILE = os.getenv("LOG_FILE", "")                         # also append JSON lines here; empty = stdout only
+LOG_SAMPLE_RATE = float(os.getenv("LOG_SAMPLE_RATE", "0.1"))  # share of verbose payloads logged at DEBUG
+LOG_PAYLOAD_CHARS = int(os.getenv("LOG_PAYLOAD_CHARS", "500"))
+
+ROOT_LOGGER = "neckarmedia"
+
+# Set per request by the API middleware; FastAPI's thread pool copies it into the worker thread
+request_id_var = contextvars.ContextVar("request_id", default=None)
+
+_RECORD_ATTRS = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime"}
+
+_lock = threading.Lock()
+_handler = None
+_listener = None
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line: time, level, logger, event message, request id and extra fields."""
+
+    def format(self, record):
+        entry = {
+            "ts": round(record.created, 3),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        if getattr(record, "request_id", None):
+            entry["request_id"] = record.request_id
+        entry.update({k: v for k, v in vars(record).items() if k not in _RECORD_ATTRS and k != "request_id"})
+        exc = self.formatException(record.exc_info) if record.exc_info else record.exc_text
+        if exc:
+            entry["exc"] = exc
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class _RequestQueueHandler(logging.handlers.QueueHandler):
+    """Enqueues records without formatting them; JSON encoding and I/O happen on the listener thread."""
+
+    def prepare(self, record):
+        record.request_id = request_id_var.get()
+        record.msg, record.args = record.getMessage(), None
+        record.exc_text = logging.Formatter().formatException(record.exc_info) if record.exc_info else None
+        record.exc_info = None
+        return record
+
+
+def _output_handlers():
+    formatter = JsonFormatter()
+    handlers = [logging.StreamHandler(sys.stdout)]
+    if LOG_FILE:
+        handlers.append(logging.FileHandler(LOG_FILE, encoding="utf-8"))
+    for handler in handlers:
+        handler.setFormatter(formatter)
+    return handlers
+
+
+def _start_listener(log_queue):
+    global _listener
+    _listener = logging.handlers.QueueListener(log_queue, *_output_handlers(), respect_handler_level=False)
+    _listener.start()
+
+
+def setup_logging(level=LOG_LEVEL):
+    """Routes the "neckarmedia" loggers through an unbounded queue to a background writer thread.
+
+    Logging calls on the request path only enqueue; stdout and the log file
+    are written by the listener, so a slow terminal or disk never blocks a
+    request. Idempotent; forked workers (gunicorn) get their own listener.
+    """
+    global _handler
+    with _lock:
+        root = logging.getLogger(ROOT_LOGGER)
+        root.setLevel(level)
+        if _listener is not None:
+            return root
+        _handler = _RequestQueueHandler(queue.SimpleQueue())
+        root.addHandler(_handler)
+        root.propagate = False
+        _start_listener(_handler.queue)
+        atexit.register(stop_logging)
+        return root
+
+
+def stop_logging():
+    """Flushes the queue and stops the writer thread."""
+    global _listener
+    with _lock:
+        if _listener is not None:
+            _listener.stop()
+            _listener = None
+
+
+def _restart_after_fork():
+    # The writer thread doesn't survive fork(); the child gets its own, on a fresh
+    # queue so records the parent hadn't written yet aren't written twice
+    global _lock
+    _lock = threading.Lock()
+    if _listener is not None:
+        _handler.queue = queue.SimpleQueue()
+        _start_listener(_handler.queue)
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_restart_after_fork)
+
+
+def get_logger(name):
+    return logging.getLogger(f"{ROOT_LOGGER}.{name}")
+
+
+def log_event(logger, msg, level=logging.INFO, **fields):
+    """Logs one structured event; ``fields`` become top-level JSON keys."""
+    if logger.isEnabledFor(level):
+        logger.log(level, msg, extra=fields)
+
+
+def new_request_id():
+    return f"{int(time.time() * 1000):x}-{random.getrandbits(32):08x}"
+
+
+def payload_sampled():
+    """Whether to log a verbose payload: only at DEBUG level, and then for LOG_SAMPLE_RATE of them."""
+    return logging.getLogger(ROOT_LOGGER).isEnabledFor(logging.DEBUG) and random.random() < LOG_SAMPLE_RATE
+
+
+class JsonLinesAppender:
+    """Appends JSON records to a file (e.g. a review log) from a background thread.
+
+    ``append`` only enqueues, so the request path never opens or writes the
+    file; the writer takes everything queued and appends it in one write.
+    The thread starts on first use, and again in a forked child.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._queue = None
+        self._pid = None
+        self._lock = threading.Lock()
+        atexit.register(self.flush)
+
+    def _ensure_started(self):
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid != os.getpid():
+                self._queue = queue.Queue()  # records inherited over fork belong to the parent
+                threading.Thread(target=self._run, args=(self._queue,), name="jsonl-appender", daemon=True).start()
+                self._pid = os.getpid()
+
+    def append(self, record):
+        if not self.path:
+            return
+        self._ensure_started()
+        self._queue.put(record)
+
+    def flush(self):
+        """Waits until every record appended so far is written."""
+        if self._pid == os.getpid():
+            self._queue.join()
+
+    def _run(self, pending):
+        while True:
+            records = [pending.get()]
+            while True:
+                try:
+                    records.append(pending.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                with open(self.path, "a", encoding="utf-8") as f:
+                    f.write("".join(json.dumps(record, ensure_ascii=False) + "\n" for record in records))
+            except OSError as e:
+                get_logger("logs").warning("appender.write_failed", extra={"path": self.path, "error": str(e)})
+            finally:
+                for _ in records:
+                    pending.task_done()
+
+
+def log_payload(logger, msg, text, **fields):
+    """Logs a verbose payload (context, answer) truncated to LOG_PAYLOAD_CHARS, if sampled."""
+    if payload_sampled():
+        logger.debug(msg, extra={"chars": len(text), "text": text[:LOG_PAYLOAD_CHARS], **fields})
@@ -0,0 +1,71 @@
+import math
+import threading
+from collections import defaultdict, deque
+
+# Keep only the most recent observations per timing so memory stays bounded
+MAX_SAMPLES = 2048
+
+_lock = threading.Lock()
+_counters = defaultdict(int)
+_gauges = {}
+_samples = defaultdict(lambda: deque(maxlen=MAX_SAMPLES))
+
+
+def incr(name, value=1):
+    """Increments a counter."""
+    with _lock:
+        _counters[name] += value
+
+
+def set_gauge(name, value):
+    """Sets a gauge to its current value."""
+    with _lock:
+        _gauges[name] = value
+
+
+def observe(name, value):
+    """Records one observation (e.g. a latency in ms) for a timing series."""
+    with _lock:
+        _samples[name].append(value)
+        _counters[f"{name}.count"] += 1
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile of an already sorted list."""
+    if not values:
+        return None
+    index = min(len(values) - 1, max(0, math.ceil(pct / 100 * len(values)) - 1))
+    return values[index]
+
+
+def summarize(values):
+    """Returns count, mean and p50/p95/p99 for a list of observations."""
+    values = sorted(values)
+    return {
+        "count": len(values),
+        "mean": round(sum(values) / len(values), 3) if values else None,
+        "p50": percentile(values, 50),
+        "p95": percentile(values, 95),
+        "p99": percentile(values, 99),
+    }
+
+
+def snapshot():
+    """Returns all counters, gauges and timing summaries as a JSON-able dict."""
+    with _lock:
+        counters = dict(_counters)
+        gauges = dict(_gauges)
+        samples = {name: list(values) for name, values in _samples.items()}
+    return {
+        "counters": counters,
+        "gauges": gauges,
+        "timings": {name: summarize(values) for name, values in samples.items()},
+    }
+
+
+def reset():
+    """Clears everything (for benchmarks that compare runs in one process)."""
+    with _lock:
+        _counters.clear()
+        _gauges.clear()
+        _samples.clear()
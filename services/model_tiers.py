@@ -0,0 +1,91 @@
+import os
+import re
+
+from services import metrics
+
+# Answers to simple lookups come from a small fast model, open-ended ones from the large model
+MODEL_TIERING = os.getenv("MODEL_TIERING", "true").lower() == "true"
+FAST_MODEL = os.getenv("FAST_MODEL", "gpt-5-mini")
+LARGE_MODEL = os.getenv("LARGE_MODEL", "gpt-5")
+FAST_MODEL_REASONING_EFFORT = os.getenv("FAST_MODEL_REASONING_EFFORT", "minimal")  # empty = model default
+FAST_TIER_MAX_SCORE = int(os.getenv("FAST_TIER_MAX_SCORE", "1"))  # complexity up to this uses the fast model
+
+# USD per 1M input / output tokens, for the cost metrics ("model=input:output,...")
+MODEL_PRICES = {
+    "gpt-5": (1.25, 10.0),
+    "gpt-5-mini": (0.25, 2.0),
+    "gpt-5-nano": (0.05, 0.4),
+}
+for _entry in filter(None, os.getenv("MODEL_PRICES", "").split(",")):
+    _name, _prices = _entry.split("=")
+    MODEL_PRICES[_name.strip()] = tuple(float(p) for p in _prices.split(":"))
+
+FAST, LARGE = "fast", "large"
+
+# Tools whose output is a fact to read out rather than material for an open-ended answer
+LOOKUP_TOOLS = {"Founder/Employee Info", "Jobs Scraper", "Service Offerings"}
+OPEN_ENDED_MARKERS = re.compile(
+    r"\b(why|how (do|does|can|could|should|would)|compare|difference|strategy|recommend|should|explain|ideas?|"
+    r"warum|wieso|wie (kann|können|könnte|sollte|funktioniert)|vergleich\w*|unterschied\w*|strategie\w*|"
+    r"empfehl\w*|sollte\w*|erklär\w*|ideen?)\b",
+    re.IGNORECASE,
+)
+LONG_QUERY_WORDS = 25
+LARGE_CONTEXT_TOKENS = 1200
+
+
+def estimate_complexity(user_query, tools, context_tokens):
+    """Scores how open-ended an answer is: 0 is a plain lookup, higher needs more reasoning.
+
+    Two points each for a retrieval (blog/reference) tool and for open-ended
+    wording ("why", "compare", "empfehlen", ...); one point each for more than
+    one tool, a long query and a large context.
+    """
+    score = 0
+    if any(tool not in LOOKUP_TOOLS for tool in tools):
+        score += 2
+    if OPEN_ENDED_MARKERS.search(user_query):
+        score += 2
+    if len(tools) > 1:
+        score += 1
+    if len(user_query.split()) > LONG_QUERY_WORDS:
+        score += 1
+    if context_tokens > LARGE_CONTEXT_TOKENS:
+        score += 1
+    return score
+
+
+def choose_tier(user_query, tools, context_tokens):
+    """Returns (tier, complexity score) for a planned answer."""
+    score = estimate_complexity(user_query, tools, context_tokens)
+    if not MODEL_TIERING:
+        return LARGE, score
+    return (FAST if score <= FAST_TIER_MAX_SCORE else LARGE), score
+
+
+def model_for(tier):
+    return FAST_MODEL if tier == FAST else LARGE_MODEL
+
+
+def model_options(tier):
+    """Extra Responses API arguments for a tier."""
+    if tier == FAST and FAST_MODEL_REASONING_EFFORT:
+        return {"reasoning": {"effort": FAST_MODEL_REASONING_EFFORT}}
+    return {}
+
+
+def usage_cost(model, input_tokens, output_tokens):
+    input_price, output_price = MODEL_PRICES.get(model, (0.0, 0.0))
+    return (input_tokens * input_price + output_tokens * output_price) / 1_000_000
+
+
+def record_call(tier, model, seconds, usage=None):
+    """Per-tier latency, token and cost metrics for one answer."""
+    metrics.incr(f"model.{tier}.calls")
+    metrics.observe(f"model.{tier}.ms", seconds * 1000)
+    if usage is not None:
+        input_tokens = getattr(usage, "input_tokens", 0) or 0
+        output_tokens = getattr(usage, "output_tokens", 0) or 0
+        metrics.incr(f"model.{tier}.input_tokens", input_tokens)
+        metrics.incr(f"model.{tier}.output_tokens", output_tokens)
+        metrics.incr(f"model.{tier}.cost_usd", usage_cost(model, input_tokens, output_tokens))
@@ -0,0 +1,161 @@
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+# Paths relative to project root (one level up from services/)
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_ROOT)  # allow running as a script: python services/quantize.py
+
+# Compressed copy of the embedding matrix for the first-pass scan: "" (off), "int8", "pca" or "pca-int8".
+# The best candidates are then re-scored exactly against the float32 matrix.
+VECTOR_QUANTIZATION = os.getenv("VECTOR_QUANTIZATION", "").strip().lower()
+VECTOR_PCA_DIM = int(os.getenv("VECTOR_PCA_DIM", "128"))
+VECTOR_RESCORE_CANDIDATES = int(os.getenv("VECTOR_RESCORE_CANDIDATES", "50"))  # shortlist re-scored exactly
+MODES = ("int8", "pca", "pca-int8")
+SCAN_BLOCK_ROWS = 8192  # int8 rows widened to float32 per block, so the scan never copies the whole matrix
+
+
+class CompressedIndex:
+    """Reduced (PCA) and/or int8-quantized vectors for a cheap first-pass scan.
+
+    PCA keeps the ``pca_dim`` directions with the most variance; int8 stores
+    every dimension as a signed byte with a per-dimension scale. Approximate
+    scores only decide the shortlist: ``scores`` re-scores it exactly with
+    the float32 rows, which can stay memory-mapped (services/knowledge_artifact.py)
+    so only the shortlisted rows are paged in.
+    """
+
+    def __init__(self, matrix, mode, pca_dim=VECTOR_PCA_DIM):
+        if mode not in MODES:
+            raise ValueError(f"Unknown vector quantization {mode!r} (expected one of {', '.join(MODES)})")
+        self.mode = mode
+        vectors = np.asarray(matrix, dtype=np.float32)
+        self.mean = self.components = self.scale = None
+
+        if mode.startswith("pca"):
+            self.mean = vectors.mean(axis=0)
+            centered = vectors - self.mean
+            # Eigenvectors of the small (dim x dim) scatter matrix instead of an SVD of the whole corpus
+            eigenvalues, eigenvectors = np.linalg.eigh(centered.T @ centered)
+            keep = np.argsort(eigenvalues)[::-1][:min(pca_dim, vectors.shape[1])]
+            self.components = np.ascontiguousarray(eigenvectors[:, keep], dtype=np.float32)
+            vectors = centered @ self.components
+
+        if mode.endswith("int8"):
+            scale = np.abs(vectors).max(axis=0) / 127.0
+            self.scale = np.where(scale == 0, 1.0, scale).astype(np.float32)
+            self.codes = np.round(vectors / self.scale).astype(np.int8)
+        else:
+            self.codes = np.ascontiguousarray(vectors, dtype=np.float32)
+
+    @property
+    def nbytes(self):
+        extra = sum(a.nbytes for a in (self.mean, self.components, self.scale) if a is not None)
+        return self.codes.nbytes + extra
+
+    def approximate_scores(self, query_vector):
+        """Scores in the compressed domain; they rank like the cosine (PCA drops a constant offset)."""
+        query = np.asarray(query_vector, dtype=np.float32)
+        if self.components is not None:
+            query = query @ self.components
+        if self.scale is None:
+            return self.codes @ query
+        query = query * self.scale
+        scores = np.empty(len(self.codes), dtype=np.float32)
+        for start in range(0, len(self.codes), SCAN_BLOCK_ROWS):
+            block = self.codes[start:start + SCAN_BLOCK_ROWS]
+            scores[start:start + len(block)] = block.astype(np.float32) @ query
+        return scores
+
+    def shortlist(self, query_vector, candidates=VECTOR_RESCORE_CANDIDATES):
+        """Row indices of the ``candidates`` best approximate scores."""
+        approximate = self.approximate_scores(query_vector)
+        candidates = min(candidates, len(approximate))
+        return np.argpartition(-approximate, candidates - 1)[:candidates]
+
+    def scores(self, query_vector, matrix, candidates=VECTOR_RESCORE_CANDIDATES):
+        """Exact cosine scores for the shortlisted rows, -inf for all others (same shape as ``matrix @ q``)."""
+        scores = np.full(len(self.codes), -np.inf, dtype=np.float32)
+        if len(self.codes):
+            rows = np.sort(self.shortlist(query_vector, candidates))  # sorted rows read the mmap sequentially
+            scores[rows] = matrix[rows] @ np.asarray(query_vector, dtype=np.float32)
+        return scores
+
+
+def build_index(matrix, mode=VECTOR_QUANTIZATION, pca_dim=VECTOR_PCA_DIM):
+    """The compressed index for a snapshot's matrix, or None when disabled or empty."""
+    if not mode or matrix.ndim != 2 or not matrix.shape[0]:
+        return None
+    return CompressedIndex(matrix, mode, pca_dim)
+
+
+def top_k(scores, k):
+    k = min(k, len(scores))
+    top = np.argpartition(-scores, k - 1)[:k]
+    return top[np.argsort(-scores[top])]
+
+
+def compare(matrix, queries, modes=MODES, k=10, candidates=VECTOR_RESCORE_CANDIDATES, pca_dim=VECTOR_PCA_DIM):
+    """Recall@k of each compressed mode against the exact float32 search, with memory and latency."""
+    exact_started = time.perf_counter()
+    truth = [set(top_k(matrix @ q, k).tolist()) for q in queries]
+    exact_ms = (time.perf_counter() - exact_started) * 1000 / max(len(queries), 1)
+    rows = [{"mode": "float32", "recall": 1.0, "first_pass_recall": 1.0, "bytes": matrix.nbytes,
+             "ms_per_query": round(exact_ms, 3)}]
+    for mode in modes:
+        index = CompressedIndex(matrix, mode, pca_dim)
+        first_pass, rescored = [], []
+        started = time.perf_counter()
+        for q, expected in zip(queries, truth):
+            rescored.append(len(expected & set(top_k(index.scores(q, matrix, candidates), k).tolist())) / len(expected))
+        ms = (time.perf_counter() - started) * 1000 / max(len(queries), 1)
+        for q, expected in zip(queries, truth):
+            first_pass.append(len(expected & set(top_k(index.approximate_scores(q), k).tolist())) / len(expected))
+        rows.append({"mode": mode, "recall": round(float(np.mean(rescored)), 4),
+                     "first_pass_recall": round(float(np.mean(first_pass)), 4),
+                     "bytes": index.nbytes, "ms_per_query": round(ms, 3)})
+    return rows
+
+
+def main():
+    from services.knowledge import build_snapshot_from_sources
+
+    parser = argparse.ArgumentParser(description="Recall and memory of compressed vectors against exact search.")
+    parser.add_argument("-k", type=int, default=10)
+    parser.add_argument("--candidates", type=int, default=VECTOR_RESCORE_CANDIDATES, help="Shortlist re-scored exactly")
+    parser.add_argument("--pca-dim", type=int, default=VECTOR_PCA_DIM)
+    parser.add_argument("--queries", type=int, default=200, help="Corpus vectors (plus noise) used as queries")
+    parser.add_argument("--scale", type=int, default=1,
+                        help="Stack this many noisy copies of the corpus to time a larger index")
+    args = parser.parse_args()
+
+    matrix = np.asarray(build_snapshot_from_sources().matrix, dtype=np.float32)
+    if not len(matrix):
+        print("❌ No embedded chunks to compare.")
+        sys.exit(1)
+    rng = np.random.default_rng(0)
+
+    def noisy(vectors, amount):
+        vectors = vectors + rng.normal(0, amount, vectors.shape).astype(np.float32)
+        return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+    if args.scale > 1:
+        matrix = np.vstack([matrix] + [noisy(matrix, 0.02) for _ in range(args.scale - 1)])
+    queries = noisy(matrix[rng.choice(len(matrix), min(args.queries, len(matrix)), replace=False)], 0.05)
+
+    print(f"🧪 {len(queries)} queries over {len(matrix)} vectors ({matrix.shape[1]} dims), k={args.k}, "
+          f"shortlist {args.candidates}")
+    print(f"{'mode':<10} {'recall@k':>9} {'1st pass':>9} {'MB':>8} {'ms/query':>9}")
+    for row in compare(matrix, queries, k=args.k, candidates=args.candidates, pca_dim=args.pca_dim):
+        print(f"{row['mode']:<10} {row['recall']:>9.4f} {row['first_pass_recall']:>9.4f} "
+              f"{row['bytes'] / 1e6:>8.2f} {row['ms_per_query']:>9.3f}")
+    if args.scale > 1:
+        print("   (--scale copies differ only by random noise, which PCA can't keep: use it for timing, "
+              "take recall from a run without it)")
+
+
+if __name__ == "__main__":
+    main()
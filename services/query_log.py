@@ -0,0 +1,188 @@
+import argparse
+import atexit
+import hashlib
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+
+# Paths relative to project root (one level up from services/)
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_ROOT)  # allow running as a script: python services/query_log.py
+
+from services import metrics
+from services.logs import get_logger
+
+QUERY_LOG_DB_PATH = os.getenv("QUERY_LOG_DB_PATH", os.path.join(PROJECT_ROOT, "data", "query_log.db"))  # empty disables
+QUERY_LOG_FLUSH_SECONDS = float(os.getenv("QUERY_LOG_FLUSH_SECONDS", "2"))  # max delay before buffered rows are written
+QUERY_LOG_BATCH = int(os.getenv("QUERY_LOG_BATCH", "200"))                 # write early once this many are buffered
+# Warm-up: replay the most frequent recent queries before serving
+WARMUP_TOP_N = int(os.getenv("WARMUP_TOP_N", "50"))                        # 0 disables
+WARMUP_DAYS = float(os.getenv("WARMUP_DAYS", "14"))
+WARMUP_INTERVAL_SECONDS = float(os.getenv("WARMUP_INTERVAL_SECONDS", "0"))  # 0 = only at startup
+
+log = get_logger("query_log")
+
+
+def answer_hash(answer):
+    return hashlib.blake2b((answer or "").encode("utf-8"), digest_size=8).hexdigest()
+
+
+class QueryLog:
+    """Append-only log of answered queries in SQLite, written in batches.
+
+    ``record`` only appends to an in-memory buffer; a background thread
+    writes the buffer in one transaction every ``flush_seconds`` (or once
+    ``batch_size`` rows are waiting), so requests never wait on the disk.
+    """
+
+    def __init__(self, db_path=QUERY_LOG_DB_PATH, flush_seconds=QUERY_LOG_FLUSH_SECONDS, batch_size=QUERY_LOG_BATCH):
+        self.db_path = db_path
+        self.flush_seconds = flush_seconds
+        self.batch_size = batch_size
+        self._buffer = []
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._pid = None
+        self._ready = False
+        atexit.register(self.flush)
+
+    @property
+    def enabled(self):
+        return bool(self.db_path)
+
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=5)
+        if not self._ready:
+            conn.execute("PRAGMA journal_mode=WAL")  # several workers append to the same file
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS query_log (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    ts REAL NOT NULL,
+                    query TEXT NOT NULL,
+                    text TEXT NOT NULL,
+                    tools TEXT,
+                    retrieved_ids TEXT,
+                    latency_ms REAL,
+                    answer_hash TEXT
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_query_log_ts ON query_log(ts)")
+            conn.commit()
+            self._ready = True
+        return conn
+
+    def _ensure_started(self):
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid != os.getpid():
+                self._buffer = []  # rows inherited over fork belong to the parent
+                threading.Thread(target=self._run, name="query-log", daemon=True).start()
+                self._pid = os.getpid()
+
+    def record(self, query, normalized, tools=(), retrieved_ids=(), latency_ms=None, answer=None):
+        """Buffers one answered query (raw text, normalized key, tools, retrieved ids, latency, answer hash)."""
+        if not self.enabled:
+            return
+        self._ensure_started()
+        row = (time.time(), normalized, query, ",".join(tools), json.dumps(list(retrieved_ids), ensure_ascii=False),
+               latency_ms, answer_hash(answer))
+        with self._lock:
+            self._buffer.append(row)
+            full = len(self._buffer) >= self.batch_size
+        if full:
+            self._wake.set()
+
+    def flush(self):
+        """Writes all buffered rows in one transaction; returns how many."""
+        with self._lock:
+            rows, self._buffer = self._buffer, []
+        if not rows:
+            return 0
+        conn = self._connect()
+        try:
+            conn.executemany(
+                "INSERT INTO query_log (ts, query, text, tools, retrieved_ids, latency_ms, answer_hash) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)", rows
+            )
+            conn.commit()
+        finally:
+            conn.close()
+        metrics.incr("query_log.written", len(rows))
+        return len(rows)
+
+    def _run(self):
+        while True:
+            self._wake.wait(self.flush_seconds)
+            self._wake.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                metrics.incr("query_log.errors")
+                log.warning("query_log.flush_failed", extra={"error": str(e)})
+
+    def top_queries(self, limit=WARMUP_TOP_N, days=WARMUP_DAYS):
+        """Most frequent normalized queries of the last ``days``: [(latest raw text, count)]."""
+        if not self.enabled or limit <= 0 or not os.path.exists(self.db_path):
+            return []
+        conn = self._connect()
+        try:
+            # The bare "text" column comes from the row with MAX(ts) (SQLite)
+            rows = conn.execute(
+                "SELECT text, MAX(ts), COUNT(*) AS n FROM query_log WHERE ts >= ? "
+                "GROUP BY query ORDER BY n DESC LIMIT ?", (time.time() - days * 86400, limit)
+            ).fetchall()
+        finally:
+            conn.close()
+        return [(text, n) for text, _, n in rows]
+
+
+query_log = QueryLog()
+
+
+def warm_up(replay, limit=WARMUP_TOP_N, days=WARMUP_DAYS, source=None):
+    """Replays the top queries through ``replay(list_of_queries)`` to fill the caches; returns how many."""
+    queries = [text for text, _ in (source or query_log).top_queries(limit, days)]
+    if not queries:
+        return 0
+    started = time.perf_counter()
+    replay(queries)
+    ms = (time.perf_counter() - started) * 1000
+    metrics.observe("warmup.ms", ms)
+    metrics.incr("warmup.queries", len(queries))
+    log.info("warmup.done", extra={"queries": len(queries), "ms": round(ms, 1)})
+    return len(queries)
+
+
+def start_warmup_schedule(replay, interval=WARMUP_INTERVAL_SECONDS):
+    """Re-runs the warm-up every ``interval`` seconds in the background; returns a stop Event (or None)."""
+    if interval <= 0:
+        return None
+    stop = threading.Event()
+
+    def run():
+        while not stop.wait(interval):
+            try:
+                warm_up(replay)
+            except Exception as e:
+                log.warning("warmup.failed", extra={"error": str(e)})
+
+    threading.Thread(target=run, name="warmup", daemon=True).start()
+    return stop
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Show the most frequent logged queries (the warm-up set).")
+    parser.add_argument("--db", default=QUERY_LOG_DB_PATH)
+    parser.add_argument("--top", type=int, default=WARMUP_TOP_N)
+    parser.add_argument("--days", type=float, default=WARMUP_DAYS)
+    args = parser.parse_args()
+    for text, count in QueryLog(args.db).top_queries(args.top, args.days):
+        print(f"{count:6d}  {text}")
+
+
+if __name__ == "__main__":
+    main()
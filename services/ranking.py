@@ -0,0 +1,75 @@
+import numpy as np
+
+from services import metrics, recency
+from services.knowledge import get_snapshot
+from services.quantize import VECTOR_RESCORE_CANDIDATES
+
+# How a knowledge snapshot is ranked for a query. The agent's blog search, the
+# batch runner and the offline evaluation (services/retrieval_eval.py) all go
+# through rank_articles, so they rank identically.
+
+# Vector search candidates per result, so several chunks of one document still leave room for others
+CHUNKS_PER_RESULT = 4
+RESULT_FIELDS = ("title", "summary", "source_url", "source_type", "published_at")
+
+
+def _one_per_document(rows, snapshot, top_k):
+    results, seen = [], set()
+    for i in rows:
+        item = snapshot.articles[i]
+        if item["document_id"] in seen:
+            continue
+        seen.add(item["document_id"])
+        results.append({k: item.get(k) for k in RESULT_FIELDS})
+        if len(results) == top_k:
+            break
+    return results
+
+
+def _top_articles(scores, snapshot, top_k):
+    """Best chunks by score, at most one per document (blog article or file)."""
+    candidates = min(top_k * CHUNKS_PER_RESULT, len(scores))
+    top = np.argpartition(-scores, candidates - 1)[:candidates]
+    top = top[np.isfinite(scores[top])]  # rows outside a compressed index's shortlist score -inf
+    return _one_per_document(top[np.argsort(-scores[top])], snapshot, top_k)
+
+
+def latest_articles(top_k=3, snapshot=None):
+    """Newest dated articles, straight from the snapshot's precomputed recency order (no embedding)."""
+    snapshot = snapshot or get_snapshot()
+    return _one_per_document(snapshot.recent_rows, snapshot, top_k)
+
+
+def vector_scores(query_vectors, snapshot, top_k=3):
+    """Cosine scores of all chunks, one row per query for a matrix of query vectors.
+
+    With a compressed index, only its shortlist is scored exactly (all other rows -inf).
+    """
+    if snapshot.vector_index is None:
+        return query_vectors @ snapshot.matrix.T
+    if query_vectors.ndim == 2:
+        return np.stack([vector_scores(q, snapshot, top_k) for q in query_vectors])
+    candidates = max(VECTOR_RESCORE_CANDIDATES, top_k * CHUNKS_PER_RESULT)
+    return snapshot.vector_index.scores(query_vectors, snapshot.matrix, candidates)
+
+
+def search_intent(user_query):
+    """(latest intent, recency weight) for a query."""
+    intent = recency.latest_intent(user_query)
+    return intent, recency.RECENCY_TOPIC_WEIGHT if intent else recency.RECENCY_WEIGHT
+
+
+def rank_articles(user_query, snapshot, top_k, query_scores):
+    """Ranks the snapshot for one query; ``query_scores()`` gives its vector scores when they're needed."""
+    # "What are your latest posts?" is answered by date alone
+    intent, weight = search_intent(user_query)
+    if intent == "latest" and snapshot.recent_rows:
+        metrics.incr("retrieval.latest")
+        return latest_articles(top_k, snapshot)
+
+    # Similarity nudged towards newer posts (strongly, and over dated posts only, when the query asks
+    # for recent posts on a topic)
+    scores = recency.blend(query_scores(), snapshot.published_days, weight)
+    if intent == "topic":
+        scores = recency.dated_only(scores, snapshot.published_days)
+    return _top_articles(scores, snapshot, top_k)
@@ -0,0 +1,178 @@
+import argparse
+import os
+import re
+import sqlite3
+import sys
+import time
+from datetime import date, datetime
+
+import numpy as np
+
+# Paths relative to project root (one level up from services/)
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_ROOT)  # allow running as a script: python services/recency.py
+
+DB_PATH = os.path.join(PROJECT_ROOT, "neckarmedia.db")
+
+# Time-decay blending for ordinary queries: score = similarity * (1 - weight + weight * decay),
+# decay halving every RECENCY_HALF_LIFE_DAYS. Undated items (documents) get the median decay of the
+# dated ones, and are left out of "latest ... about <topic>" results.
+RECENCY_HALF_LIFE_DAYS = float(os.getenv("RECENCY_HALF_LIFE_DAYS", "730"))
+RECENCY_WEIGHT = float(os.getenv("RECENCY_WEIGHT", "0.1"))
+# Weight for "latest ... about <topic>" queries, where recency matters as much as the topic
+RECENCY_TOPIC_WEIGHT = float(os.getenv("RECENCY_TOPIC_WEIGHT", "0.6"))
+
+MONTHS = {
+    "januar": 1, "jan": 1, "jänner": 1, "january": 1,
+    "februar": 2, "feb": 2, "february": 2,
+    "märz": 3, "maerz": 3, "mär": 3, "mrz": 3, "march": 3, "mar": 3,
+    "april": 4, "apr": 4,
+    "mai": 5, "may": 5,
+    "juni": 6, "jun": 6, "june": 6,
+    "juli": 7, "jul": 7, "july": 7,
+    "august": 8, "aug": 8,
+    "september": 9, "sep": 9, "sept": 9,
+    "oktober": 10, "okt": 10, "october": 10, "oct": 10,
+    "november": 11, "nov": 11,
+    "dezember": 12, "dez": 12, "december": 12, "dec": 12,
+}
+_MONTH = r"([a-zäöü]+)\.?"
+_DATE_PATTERNS = (
+    (re.compile(r"(\d{4})-(\d{1,2})-(\d{1,2})"), ("y", "m", "d")),               # 2016-04-15, ISO datetimes
+    (re.compile(r"(\d{1,2})\.\s*(\d{1,2})\.\s*(\d{4})"), ("d", "m", "y")),       # 15.04.2016
+    (re.compile(r"(\d{1,2})/(\d{1,2})/(\d{4})"), ("m", "d", "y")),               # 04/15/2016
+    (re.compile(rf"(\d{{1,2}})\.?\s+{_MONTH}\s+(\d{{4}})"), ("d", "name", "y")),  # 15. April 2016, 15 Apr 2016
+    (re.compile(rf"{_MONTH}\s+(\d{{1,2}})(?:st|nd|rd|th)?,?\s+(\d{{4}})"), ("name", "d", "y")),  # April 15, 2016
+)
+
+LATEST_QUERY = re.compile(
+    r"\b(latest|newest|most recent|recent(ly)?|neueste\w*|neuste\w*|aktuellste\w*|jüngste\w*|zuletzt)\b",
+    re.IGNORECASE,
+)
+# "new"/"last" only count next to a word for posts ("last article", "neue Beiträge")
+WEAK_LATEST_QUERY = re.compile(
+    r"\b(new|last|neue\w*|letzte\w*)\s+(blog\w*|posts?|articles?|news|beitr(ä|ae)ge?|artikel|einträge?)\b",
+    re.IGNORECASE,
+)
+# Words that only say "show me posts" and carry no topic
+_GENERIC_WORDS = {
+    "what", "which", "are", "is", "the", "your", "you", "have", "has", "tell", "me", "about", "show", "give", "any",
+    "blog", "blogs", "post", "posts", "article", "articles", "news", "published", "written", "wrote", "entries",
+    "was", "gibt", "es", "im", "in", "der", "die", "das", "den", "dem", "ihr", "euer", "eure", "euren", "eurem",
+    "zeig", "zeige", "mir", "welche", "habt", "hat", "über", "beitrag", "beiträge", "beitraege", "artikel",
+    "geschrieben", "veröffentlicht", "neuigkeiten", "some", "a", "an", "on", "of", "und", "and", "bitte", "please",
+    "vom", "von", "auf", "einen", "ein", "eine", "from", "neckarmedia", "nm", "sind", "do", "did", "we", "wir",
+    "euch", "ihre", "unsere", "can", "could", "kannst", "könnt", "list", "liste", "nenn", "nenne",
+}
+
+
+def parse_date(text):
+    """Normalizes a scraped German/English date ("15. April 2016", "15.04.2016", "April 15, 2016",
+    ISO) to "YYYY-MM-DD"; returns None for "Unknown" and anything unparseable."""
+    if not text:
+        return None
+    text = str(text).strip().lower()
+    for pattern, fields in _DATE_PATTERNS:
+        match = pattern.search(text)
+        if not match:
+            continue
+        values = dict(zip(fields, match.groups()))
+        month = MONTHS.get(values["name"]) if "name" in values else int(values["m"])
+        if not month:
+            continue
+        try:
+            return date(int(values["y"]), month, int(values["d"])).isoformat()
+        except ValueError:
+            continue
+    return None
+
+
+def published_days(iso_date):
+    """Days since the epoch for an ISO date, NaN if undated (vector-friendly)."""
+    if not iso_date:
+        return np.nan
+    return datetime.fromisoformat(iso_date).timestamp() / 86400
+
+
+def latest_intent(user_query):
+    """None, "latest" (just the newest posts) or "topic" (newest posts about something)."""
+    if not (LATEST_QUERY.search(user_query) or WEAK_LATEST_QUERY.search(user_query)):
+        return None
+    rest = WEAK_LATEST_QUERY.sub(" ", LATEST_QUERY.sub(" ", user_query.lower()))
+    words = [w for w in re.findall(r"\w+", rest) if w not in _GENERIC_WORDS]
+    return "topic" if words else "latest"
+
+
+def decay(days, now=None, half_life=RECENCY_HALF_LIFE_DAYS):
+    """Exponential age decay in (0, 1]; undated entries get the median decay of the dated ones (neutral)."""
+    now = time.time() / 86400 if now is None else now
+    days = np.asarray(days, dtype=np.float64)
+    decays = np.exp2(-np.clip(now - days, 0, None) / half_life)
+    undated = np.isnan(days)
+    if undated.any():
+        decays[undated] = 1.0 if undated.all() else np.median(decays[~undated])
+    return decays
+
+
+def blend(scores, days, weight=RECENCY_WEIGHT, now=None):
+    """Scales similarity scores by recency: full weight for new items, down to (1 - weight) for old ones."""
+    if weight <= 0:
+        return scores
+    return scores * (1.0 - weight + weight * decay(days, now))
+
+
+def dated_only(scores, days):
+    """Scores with undated entries set to -inf, for queries that ask for recent posts (unless none are dated)."""
+    undated = np.isnan(days)
+    if not undated.any() or undated.all():
+        return scores
+    return np.where(undated, -np.inf, scores)
+
+
+def ensure_published_at(conn):
+    """Adds the indexed ISO ``published_at`` column and fills it from the raw ``date`` text."""
+    columns = {row[1] for row in conn.execute("PRAGMA table_info(blog_articles)")}
+    if "published_at" not in columns:
+        conn.execute("ALTER TABLE blog_articles ADD COLUMN published_at TEXT")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_blog_articles_published_at ON blog_articles(published_at)")
+    rows = conn.execute("SELECT id, date FROM blog_articles WHERE published_at IS NULL").fetchall()
+    parsed = [(parse_date(raw), article_id) for article_id, raw in rows]
+    conn.executemany("UPDATE blog_articles SET published_at = ? WHERE id = ?", [p for p in parsed if p[0]])
+    conn.commit()
+    return sum(1 for iso, _ in parsed if iso), sum(1 for iso, _ in parsed if not iso)
+
+
+def published_at_sql(conn):
+    """Column holding the article date: the ISO column, or the raw text on older databases."""
+    columns = {row[1] for row in conn.execute("PRAGMA table_info(blog_articles)")}
+    for column in ("published_at", "date"):
+        if column in columns:
+            return column
+    return "NULL"
+
+
+def latest_articles(conn, limit=5):
+    """Newest articles by the indexed date: (id, title, source_url, published_at)."""
+    return conn.execute(
+        "SELECT id, title, source_url, published_at FROM blog_articles "
+        "WHERE published_at IS NOT NULL ORDER BY published_at DESC LIMIT ?", (limit,)
+    ).fetchall()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Normalize article dates and list the newest articles.")
+    parser.add_argument("--db", default=DB_PATH)
+    parser.add_argument("--latest", type=int, default=5, help="Show this many newest articles afterwards")
+    args = parser.parse_args()
+    conn = sqlite3.connect(args.db)
+    try:
+        filled, unparsed = ensure_published_at(conn)
+        print(f"✅ published_at filled for {filled} articles ({unparsed} without a recognizable date)")
+        for article_id, title, url, published_at in latest_articles(conn, args.latest):
+            print(f"   {published_at}  {title}  {url}")
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
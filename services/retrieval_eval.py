@@ -0,0 +1,329 @@
+import argparse
+import json
+import math
+import os
+import re
+import sqlite3
+import sys
+import time
+import numpy as np
+
+# Allow running as a script: python services/retrieval_eval.py
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services import metrics
+from services.dedup import unique_articles_sql
+from services.fts_index import is_external_content, search_ids
+from services.jsonl_io import iter_records, resolve_input
+from services.knowledge import DB_PATH, PROJECT_ROOT, build_snapshot_from_sources
+from services.quantize import MODES, VECTOR_RESCORE_CANDIDATES, CompressedIndex
+from services.ranking import rank_articles, vector_scores
+
+BLOG_POSTS_PATH = os.path.join(PROJECT_ROOT, "data", "blog_posts.json")
+STORED_MODEL = "all-MiniLM-L6-v2"  # model the embeddings in neckarmedia.db were computed with
+TITLE_SUFFIX = re.compile(r"\s*-\s*Neckarmedia Werbeagentur\s*$")
+SENTENCE = re.compile(r"(?<=[.!?])\s+")
+
+
+# --- Labeled queries ---------------------------------------------------------
+
+def build_labeled_queries(db_path=DB_PATH, json_path=BLOG_POSTS_PATH):
+    """Builds query -> relevant-article labels from the real corpus, no LLM involved.
+
+    Every article yields up to three queries with itself as the relevant result:
+    its cleaned title, the first sentence of its (English) summary, and a
+    sentence from the middle of its (German) crawled text.
+    """
+    conn = sqlite3.connect(db_path)
+    rows = conn.execute(
+        f"SELECT id, title, summary, source_url FROM blog_articles WHERE {unique_articles_sql(conn)} ORDER BY id"
+    ).fetchall()
+    conn.close()
+
+    contents = {}
+    json_path = resolve_input(json_path)
+    if os.path.exists(json_path):
+        contents = {post.get("url"): post.get("content", "") for post in iter_records(json_path)}
+
+    queries = []
+    for article_id, title, summary, source_url in rows:
+        clean_title = TITLE_SUFFIX.sub("", title or "").strip()
+        if clean_title:
+            queries.append({"query": clean_title, "relevant": [article_id], "kind": "title"})
+
+        first_sentence = SENTENCE.split((summary or "").strip())[0]
+        if len(first_sentence.split()) >= 5 and summary != "No summary available":
+            queries.append({"query": first_sentence, "relevant": [article_id], "kind": "summary"})
+
+        sentences = [s for s in SENTENCE.split(contents.get(source_url, "")) if 8 <= len(s.split()) <= 40]
+        if sentences:
+            queries.append({"query": sentences[len(sentences) // 2], "relevant": [article_id], "kind": "content"})
+    return queries
+
+
+# --- Ranking metrics ---------------------------------------------------------
+
+def recall_at_k(ranked_ids, relevant, k):
+    """Share of relevant ids found in the top k."""
+    if not relevant:
+        return 0.0
+    return len(set(ranked_ids[:k]) & set(relevant)) / len(relevant)
+
+
+def reciprocal_rank(ranked_ids, relevant):
+    """1 / rank of the first relevant id (0 if none was retrieved)."""
+    for rank, article_id in enumerate(ranked_ids, start=1):
+        if article_id in relevant:
+            return 1.0 / rank
+    return 0.0
+
+
+def ndcg_at_k(ranked_ids, relevant, k):
+    """Binary-relevance nDCG@k."""
+    dcg = sum(1.0 / math.log2(rank + 1) for rank, article_id in enumerate(ranked_ids[:k], start=1)
+              if article_id in relevant)
+    ideal = sum(1.0 / math.log2(rank + 1) for rank in range(1, min(len(relevant), k) + 1))
+    return dcg / ideal if ideal else 0.0
+
+
+# --- Retrieval backends ------------------------------------------------------
+
+def load_corpus(db_path=DB_PATH):
+    """Returns (ids, contents, stored embedding JSON strings) for all embedded articles.
+
+    Near-duplicates are left out, as in the labeled queries and the agent's snapshot.
+    """
+    conn = sqlite3.connect(db_path)
+    rows = conn.execute(
+        f"SELECT id, content, embedding FROM blog_articles WHERE embedding IS NOT NULL AND {unique_articles_sql(conn)} "
+        "ORDER BY id"
+    ).fetchall()
+    conn.close()
+    return [r[0] for r in rows], [r[1] for r in rows], [r[2] for r in rows]
+
+
+def normalize_rows(matrix):
+    matrix = np.asarray(matrix, dtype=np.float32)
+    return matrix / np.maximum(np.linalg.norm(matrix, axis=-1, keepdims=True), 1e-12)
+
+
+class JsonLoopBackend:
+    """The original query_vector_search: json.loads and cosine per row on every query."""
+
+    name = "json-loop"
+
+    def __init__(self, ids, stored_embeddings):
+        self.ids = ids
+        self.stored = stored_embeddings
+
+    def search(self, query_text, query_vector, k):
+        scores = []
+        for article_id, embedding in zip(self.ids, self.stored):
+            vector = json.loads(embedding)
+            scores.append((np.dot(query_vector, vector) / (np.linalg.norm(query_vector) * np.linalg.norm(vector)), article_id))
+        scores.sort(reverse=True)
+        return [article_id for _, article_id in scores[:k]]
+
+
+class MatrixBackend:
+    """Pre-normalized float32 matrix in memory, one matrix-vector product per query."""
+
+    name = "matrix"
+
+    def __init__(self, ids, matrix):
+        self.ids = np.asarray(ids)
+        self.matrix = normalize_rows(matrix)
+
+    def search(self, query_text, query_vector, k):
+        scores = self.matrix @ query_vector
+        k = min(k, len(scores))
+        top = np.argpartition(-scores, k - 1)[:k]
+        return self.ids[top[np.argsort(-scores[top])]].tolist()
+
+
+class CompressedBackend(MatrixBackend):
+    """First pass over int8/PCA-compressed vectors, exact float32 re-scoring of the shortlist."""
+
+    def __init__(self, ids, matrix, mode, candidates=VECTOR_RESCORE_CANDIDATES):
+        super().__init__(ids, matrix)
+        self.name = mode
+        self.index = CompressedIndex(self.matrix, mode)
+        self.candidates = candidates
+
+    def search(self, query_text, query_vector, k):
+        scores = self.index.scores(query_vector, self.matrix, max(self.candidates, k))
+        k = min(k, len(scores))
+        top = np.argpartition(-scores, k - 1)[:k]
+        return self.ids[top[np.argsort(-scores[top])]].tolist()
+
+
+class AgentBackend:
+    """What the agent's blog search returns: its knowledge snapshot (document store or blog
+    table) ranked by services.ranking, with recency blending, "latest" intents and the
+    compressed index if VECTOR_QUANTIZATION is set."""
+
+    name = "agent"
+
+    def __init__(self, db_path=DB_PATH, snapshot=None):
+        self.snapshot = snapshot or build_snapshot_from_sources()
+        # Results carry URLs, not article ids; map them back like the FTS5 baseline does
+        conn = sqlite3.connect(db_path)
+        self.url_to_id = dict(conn.execute("SELECT source_url, id FROM blog_articles"))
+        conn.close()
+
+    def search(self, query_text, query_vector, k):
+        if not self.snapshot.articles:
+            return []
+        results = rank_articles(query_text, self.snapshot, k,
+                                lambda: vector_scores(query_vector, self.snapshot, k))
+        return [self.url_to_id[r["source_url"]] for r in results if r["source_url"] in self.url_to_id]
+
+
+class Fts5Backend:
+    """Keyword baseline: BM25 ranking from the blog_articles_fts index."""
+
+    name = "fts5"
+
+    def __init__(self, db_path=DB_PATH):
+        self.conn = sqlite3.connect(db_path)
+        self.external = is_external_content(self.conn)  # rowids are article ids
+        self.url_to_id = dict(self.conn.execute("SELECT source_url, id FROM blog_articles"))
+
+    def search(self, query_text, query_vector, k):
+        if self.external:
+            return search_ids(self.conn, query_text, k)
+        # A standalone index has its own rowids; map results back by URL
+        terms = re.findall(r"\w+", query_text)
+        if not terms:
+            return []
+        match = " OR ".join(f'"{term}"' for term in terms)
+        rows = self.conn.execute(
+            "SELECT source_url FROM blog_articles_fts WHERE blog_articles_fts MATCH ? ORDER BY rank LIMIT ?",
+            (match, k * 3)
+        ).fetchall()
+        ranked = []
+        for (url,) in rows:
+            article_id = self.url_to_id.get(url)
+            if article_id is not None and article_id not in ranked:
+                ranked.append(article_id)
+        return ranked[:k]
+
+
+# Extra backends can register a factory here: factory(ids, matrix, stored_embeddings) -> backend
+BACKEND_FACTORIES = {
+    "json-loop": lambda ids, matrix, stored: JsonLoopBackend(ids, stored) if stored else None,
+    "matrix": lambda ids, matrix, stored: MatrixBackend(ids, matrix),
+    **{mode: (lambda ids, matrix, stored, mode=mode: CompressedBackend(ids, matrix, mode)) for mode in MODES},
+    # The snapshot holds the stored embeddings, so it only applies to the stored model
+    "agent": lambda ids, matrix, stored: AgentBackend() if stored else None,
+}
+
+
+# --- Evaluation --------------------------------------------------------------
+
+def evaluate(backend, labeled, query_vectors, k=3):
+    """Runs all labeled queries through a backend and returns quality and latency figures."""
+    recalls, mrrs, ndcgs, latencies = [], [], [], []
+    for item, vector in zip(labeled, query_vectors):
+        started = time.perf_counter()
+        ranked = backend.search(item["query"], vector, max(k, 10))
+        latencies.append((time.perf_counter() - started) * 1000)
+        recalls.append(recall_at_k(ranked, item["relevant"], k))
+        mrrs.append(reciprocal_rank(ranked, item["relevant"]))
+        ndcgs.append(ndcg_at_k(ranked, item["relevant"], k))
+
+    n = max(len(labeled), 1)
+    timing = metrics.summarize(latencies)
+    return {
+        f"recall@{k}": round(sum(recalls) / n, 4),
+        "mrr": round(sum(mrrs) / n, 4),
+        f"ndcg@{k}": round(sum(ndcgs) / n, 4),
+        "p50_ms": round(timing["p50"] or 0, 3),
+        "p95_ms": round(timing["p95"] or 0, 3),
+        "p99_ms": round(timing["p99"] or 0, 3),
+    }
+
+
+def run_evaluation(models=(STORED_MODEL,), backends=None, k=3, db_path=DB_PATH, json_path=BLOG_POSTS_PATH):
+    """Compares retrieval backends and embedding models on the labeled corpus queries.
+
+    Runs fully offline (models must be in the local Hugging Face cache); no
+    OpenAI calls. Returns a list of result rows.
+    """
+    from sentence_transformers import SentenceTransformer
+
+    labeled = build_labeled_queries(db_path, json_path)
+    ids, contents, stored = load_corpus(db_path)
+    backends = list(backends or BACKEND_FACTORIES)
+    print(f"🧪 {len(labeled)} labeled queries over {len(ids)} articles")
+
+    results = []
+    if "fts5" in backends:
+        results.append({"model": "-", "backend": "fts5", "encode_p50_ms": 0.0,
+                        **evaluate(Fts5Backend(db_path), labeled, [None] * len(labeled), k)})
+
+    for model_name in models:
+        model = SentenceTransformer(model_name)
+
+        # Per-query encode latency, as seen by a live request
+        query_vectors, encode_ms = [], []
+        for item in labeled:
+            started = time.perf_counter()
+            query_vectors.append(normalize_rows(model.encode(item["query"])))
+            encode_ms.append((time.perf_counter() - started) * 1000)
+
+        if model_name == STORED_MODEL:
+            matrix, stored_for_model = [json.loads(e) for e in stored], stored
+        else:
+            matrix, stored_for_model = model.encode(contents, batch_size=32), None
+
+        for backend_name in backends:
+            factory = BACKEND_FACTORIES.get(backend_name)
+            backend = factory(ids, matrix, stored_for_model) if factory else None
+            if backend is None:
+                continue
+            row = {"model": model_name, "backend": backend_name,
+                   "encode_p50_ms": round(metrics.summarize(encode_ms)["p50"], 3)}
+            row.update(evaluate(backend, labeled, query_vectors, k))
+            results.append(row)
+    return results
+
+
+def print_table(results):
+    if not results:
+        print("No results.")
+        return
+    columns = list(results[0])
+    widths = {c: max(len(c), *(len(str(r.get(c, ""))) for r in results)) for c in columns}
+    print("  ".join(c.ljust(widths[c]) for c in columns))
+    for row in results:
+        print("  ".join(str(row.get(c, "")).ljust(widths[c]) for c in columns))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline retrieval quality and latency evaluation.")
+    parser.add_argument("--models", nargs="+", default=[STORED_MODEL], help="Sentence-transformers models to compare")
+    parser.add_argument("--backends", nargs="+", default=list(BACKEND_FACTORIES) + ["fts5"],
+                        help=f"Backends to compare: {', '.join(list(BACKEND_FACTORIES) + ['fts5'])}")
+    parser.add_argument("-k", type=int, default=3, help="Cut-off for recall/nDCG (the agent uses top 3)")
+    parser.add_argument("--write-queries", help="Also write the labeled queries to this JSON Lines file")
+    parser.add_argument("--report", help="Write the result rows to this JSON file")
+    args = parser.parse_args()
+
+    os.environ.setdefault("HF_HUB_OFFLINE", "1")  # never download during an evaluation run
+
+    if args.write_queries:
+        with open(args.write_queries, "w", encoding="utf-8") as f:
+            for item in build_labeled_queries():
+                f.write(json.dumps(item, ensure_ascii=False) + "\n")
+
+    results = run_evaluation(args.models, args.backends, args.k)
+    print_table(results)
+    if args.report:
+        with open(args.report, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"✅ Report written to {args.report}")
+
+
+if __name__ == "__main__":
+    main()
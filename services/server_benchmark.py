@@ -0,0 +1,146 @@
+import argparse
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+
+import requests
+
+# Allow running as a script: python services/server_benchmark.py
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_ROOT)
+
+from services.retrieval_eval import print_table
+
+READY_LINE = "Application startup complete"  # logged by every uvicorn worker once its lifespan ran
+
+
+def server_commands(port, workers):
+    """The setups to compare, all with the same number of worker processes."""
+    return {
+        "uvicorn": ["uvicorn", "api:app", "--host", "127.0.0.1", "--port", str(port), "--workers", str(workers)],
+        "gunicorn-preload": ["gunicorn", "-c", "gunicorn.conf.py", "--bind", f"127.0.0.1:{port}", "api:app"],
+    }
+
+
+def _children():
+    """Maps pid -> child pids from /proc (Linux only)."""
+    children = {}
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat") as f:
+                ppid = int(f.read().rsplit(")", 1)[1].split()[1])
+        except (OSError, IndexError, ValueError):
+            continue
+        children.setdefault(ppid, []).append(int(entry))
+    return children
+
+
+def process_tree(pid):
+    tree, children, stack = [], _children(), [pid]
+    while stack:
+        current = stack.pop()
+        tree.append(current)
+        stack.extend(children.get(current, []))
+    return tree
+
+
+def _proc_kb(path, field):
+    try:
+        with open(path) as f:
+            for line in f:
+                if line.startswith(field + ":"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return 0
+
+
+def memory_mb(pid):
+    """Total RSS and PSS of a process and its descendants.
+
+    RSS counts pages shared between master and workers once per process; PSS
+    splits them, so it shows what preloading actually saves.
+    """
+    pids = process_tree(pid)
+    rss = sum(_proc_kb(f"/proc/{p}/status", "VmRSS") for p in pids)
+    pss = sum(_proc_kb(f"/proc/{p}/smaps_rollup", "Pss") for p in pids)
+    return len(pids), round(rss / 1024), round(pss / 1024)
+
+
+def measure(name, command, port, workers, settle=5.0, timeout=300.0):
+    """Starts one server setup and reports startup times and memory once all workers are up."""
+    env = dict(os.environ, WEB_CONCURRENCY=str(workers), PYTHONUNBUFFERED="1")
+    started = time.perf_counter()
+    process = subprocess.Popen(command, cwd=PROJECT_ROOT, env=env, text=True,
+                               stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
+    ready = []
+
+    def read_output():
+        for line in process.stdout:
+            if READY_LINE in line:
+                ready.append(time.perf_counter() - started)
+
+    threading.Thread(target=read_output, daemon=True).start()
+
+    first_response = None
+    try:
+        while time.perf_counter() - started < timeout and process.poll() is None:
+            if first_response is None:
+                try:
+                    if requests.get(f"http://127.0.0.1:{port}/health", timeout=1).ok:
+                        first_response = time.perf_counter() - started
+                except requests.RequestException:
+                    pass
+            if first_response is not None and len(ready) >= workers:
+                break
+            time.sleep(0.2)
+        if process.poll() is not None:
+            raise RuntimeError(f"{name} exited with code {process.returncode}")
+
+        time.sleep(settle)  # let lazily allocated memory settle before sampling
+        processes, rss, pss = memory_mb(process.pid)
+        return {
+            "server": name,
+            "workers": workers,
+            "first_response_s": round(first_response, 2) if first_response else None,
+            "all_workers_ready_s": round(ready[workers - 1], 2) if len(ready) >= workers else None,
+            "processes": processes,
+            "rss_mb": rss,
+            "pss_mb": pss,
+        }
+    finally:
+        process.terminate()
+        try:
+            process.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare startup time and memory of the API server setups (Linux).")
+    parser.add_argument("--workers", type=int, default=2, help="Worker processes for every setup")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--servers", nargs="+", default=list(server_commands(0, 0)))
+    parser.add_argument("--settle", type=float, default=5.0, help="Seconds to wait before sampling memory")
+    parser.add_argument("--report", help="Write the result rows to this JSON file")
+    args = parser.parse_args()
+
+    commands = server_commands(args.port, args.workers)
+    results = []
+    for name in args.servers:
+        print(f"⏱️ Starting {name} ...")
+        results.append(measure(name, commands[name], args.port, args.workers, args.settle))
+    print_table(results)
+    if args.report:
+        with open(args.report, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"✅ Report written to {args.report}")
+
+
+if __name__ == "__main__":
+    main()
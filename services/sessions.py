@@ -0,0 +1,152 @@
+import json
+import os
+import secrets
+import sqlite3
+import threading
+import time
+from collections import OrderedDict, deque
+
+from services import metrics
+
+SESSION_MAX = int(os.getenv("SESSION_MAX", "1000"))              # sessions kept in memory (LRU)
+SESSION_TTL = int(os.getenv("SESSION_TTL", "3600"))              # seconds of inactivity before a session expires
+SESSION_MAX_TURNS = int(os.getenv("SESSION_MAX_TURNS", "6"))     # user/assistant pairs kept per session
+SESSION_DB_PATH = os.getenv("SESSION_DB_PATH", "")               # optional SQLite file to persist sessions
+
+
+class Session:
+    """Server-side conversation state: recent turns plus what the last turn retrieved."""
+
+    def __init__(self, session_id=None, history=(), last_tools=(), last_context=None,
+                 last_response_id=None, updated_at=None):
+        self.id = session_id or secrets.token_urlsafe(24)  # unguessable; a session id is its only credential
+        self.history = deque(history, maxlen=SESSION_MAX_TURNS * 2)  # {"role", "content"} messages
+        self.last_tools = list(last_tools)
+        self.last_context = last_context
+        self.last_response_id = last_response_id
+        self.updated_at = updated_at or time.time()
+
+    @property
+    def is_new(self):
+        return not self.history
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "history": list(self.history),
+            "last_tools": self.last_tools,
+            "last_context": self.last_context,
+            "last_response_id": self.last_response_id,
+            "updated_at": self.updated_at,
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(
+            data["id"], data.get("history", ()), data.get("last_tools", ()), data.get("last_context"),
+            data.get("last_response_id"), data.get("updated_at"),
+        )
+
+
+class SessionStore:
+    """Bounded in-memory LRU of sessions, optionally written through to SQLite.
+
+    With a SQLite path, sessions evicted from memory (or held by another
+    worker process) are loaded back on demand.
+    """
+
+    def __init__(self, maxsize=SESSION_MAX, ttl=SESSION_TTL, db_path=SESSION_DB_PATH):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.db_path = db_path
+        self._sessions = OrderedDict()
+        self._lock = threading.Lock()
+        if db_path:
+            conn = self._connect()
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS chat_sessions (
+                    id TEXT PRIMARY KEY,
+                    data TEXT NOT NULL,
+                    updated_at REAL NOT NULL
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_chat_sessions_updated ON chat_sessions(updated_at)")
+            conn.commit()
+            conn.close()
+
+    def _connect(self):
+        return sqlite3.connect(self.db_path, timeout=5)
+
+    def _expired(self, session):
+        return time.time() - session.updated_at > self.ttl
+
+    def get(self, session_id):
+        """Returns the session, or None if it's unknown or expired."""
+        if not session_id:
+            return None
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is not None:
+                self._sessions.move_to_end(session_id)
+        if session is None and self.db_path:
+            conn = self._connect()
+            row = conn.execute("SELECT data FROM chat_sessions WHERE id = ?", (session_id,)).fetchone()
+            conn.close()
+            if row:
+                session = Session.from_dict(json.loads(row[0]))
+                self._remember(session)
+        if session is None or self._expired(session):
+            return None
+        return session
+
+    def get_or_create(self, session_id=None):
+        """Returns the existing session for this id or starts a new one.
+
+        A new session always gets a freshly minted id: an unknown or expired
+        id sent by a client is never adopted, so clients can't pick (or guess
+        and pre-create) session ids. Callers must return ``session.id``.
+        """
+        session = self.get(session_id)
+        if session is None:
+            if session_id:
+                metrics.incr("sessions.unknown_id")
+            session = Session()
+            self._remember(session)
+            metrics.incr("sessions.created")
+        return session
+
+    def _remember(self, session):
+        with self._lock:
+            self._sessions[session.id] = session
+            self._sessions.move_to_end(session.id)
+            while len(self._sessions) > self.maxsize:
+                self._sessions.popitem(last=False)
+            metrics.set_gauge("sessions.in_memory", len(self._sessions))
+
+    def save(self, session):
+        """Stores the session after a turn (and persists it if SQLite is configured)."""
+        session.updated_at = time.time()
+        self._remember(session)
+        if self.db_path:
+            conn = self._connect()
+            conn.execute(
+                "INSERT OR REPLACE INTO chat_sessions (id, data, updated_at) VALUES (?, ?, ?)",
+                (session.id, json.dumps(session.to_dict(), ensure_ascii=False), session.updated_at)
+            )
+            conn.execute("DELETE FROM chat_sessions WHERE updated_at < ?", (time.time() - self.ttl,))
+            conn.commit()
+            conn.close()
+
+    def record_turn(self, session, user_query, turn):
+        """Appends a finished turn (see agent.ChatTurn) to the session and saves it."""
+        session.history.append({"role": "user", "content": user_query})
+        session.history.append({"role": "assistant", "content": turn.answer})
+        if turn.tools:
+            session.last_tools = list(turn.tools)
+            session.last_context = turn.context
+        if turn.response_id:
+            session.last_response_id = turn.response_id
+        self.save(session)
+
+
+session_store = SessionStore()
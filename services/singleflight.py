@@ -0,0 +1,107 @@
+import asyncio
+
+from services import metrics
+
+_END = object()
+
+
+class _Broadcast:
+    """Buffers the chunks of one token stream and replays them to every subscriber."""
+
+    def __init__(self):
+        self.chunks = []
+        self.done = False
+        self.error = None
+        self._cond = asyncio.Condition()
+
+    async def publish(self, chunk):
+        async with self._cond:
+            self.chunks.append(chunk)
+            self._cond.notify_all()
+
+    async def close(self, error=None):
+        async with self._cond:
+            self.done = True
+            self.error = error
+            self._cond.notify_all()
+
+    async def subscribe(self):
+        """Yields every chunk from the start, then waits for new ones until the stream ends."""
+        position = 0
+        while True:
+            async with self._cond:
+                await self._cond.wait_for(lambda: len(self.chunks) > position or self.done)
+                pending = self.chunks[position:]
+                done, error = self.done, self.error
+            for chunk in pending:
+                yield chunk
+            position += len(pending)
+            if done and position >= len(self.chunks):
+                if error is not None:
+                    raise error
+                return
+
+
+class SingleFlight:
+    """Deduplicates identical concurrent calls within one event loop.
+
+    The first caller for a key starts the work; callers arriving while it is
+    in flight await the same result (or replay the same token stream) instead
+    of starting their own. Once the work finishes the key is released, so
+    later callers trigger a fresh computation.
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self._calls = {}
+        self._streams = {}
+
+    async def do(self, key, fn):
+        """Awaits ``fn()`` once per key for all concurrent callers and returns its result."""
+        task = self._calls.get(key)
+        if task is None:
+            task = asyncio.ensure_future(fn())
+            self._calls[key] = task
+            task.add_done_callback(lambda t, key=key: self._release(self._calls, key, t))
+            metrics.incr(f"{self.name}.executions")
+        else:
+            metrics.incr(f"{self.name}.coalesced")
+        # Shield so one disconnecting client doesn't cancel the work for the others
+        return await asyncio.shield(task)
+
+    def stream(self, key, make_iterator):
+        """Returns an async iterator over the shared stream of ``make_iterator()`` for this key.
+
+        ``make_iterator`` returns a blocking iterator (e.g. a generator that
+        reads from the LLM); it is drained in the default executor.
+        """
+        broadcast = self._streams.get(key)
+        if broadcast is None:
+            broadcast = _Broadcast()
+            self._streams[key] = broadcast
+            task = asyncio.ensure_future(self._produce(key, broadcast, make_iterator))
+            task.add_done_callback(lambda t, key=key: self._release(self._streams, key, t))
+            metrics.incr(f"{self.name}.stream_executions")
+        else:
+            metrics.incr(f"{self.name}.stream_coalesced")
+        return broadcast.subscribe()
+
+    async def _produce(self, key, broadcast, make_iterator):
+        loop = asyncio.get_running_loop()
+        try:
+            iterator = await loop.run_in_executor(None, lambda: iter(make_iterator()))
+            while True:
+                chunk = await loop.run_in_executor(None, next, iterator, _END)
+                if chunk is _END:
+                    break
+                await broadcast.publish(chunk)
+        except Exception as e:
+            await broadcast.close(e)
+        else:
+            await broadcast.close()
+
+    @staticmethod
+    def _release(registry, key, task):
+        registry.pop(key, None)
+        if not task.cancelled():
+            task.exception()  # mark retrieved; waiters already received it
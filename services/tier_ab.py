@@ -0,0 +1,184 @@
+import argparse
+import json
+import os
+import re
+import sys
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Allow running as a script: python services/tier_ab.py
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services import metrics
+
+# Simulated upstream latency per model: seconds to first token + seconds per output token
+STUB_LATENCY = {
+    "gpt-5": (3.0, 0.012),
+    "gpt-5-mini": (0.8, 0.006),
+    "gpt-5-nano": (0.4, 0.004),
+}
+STUB_OUTPUT_TOKENS = 180
+
+# (query, whether it needs the large model); the policy must route every hard query to it
+DEFAULT_QUERIES = [
+    ("Wer ist der Gründer von Neckarmedia?", False),
+    ("Who is the CEO of Neckarmedia?", False),
+    ("Welche Jobs sind gerade offen?", False),
+    ("Are there any open positions?", False),
+    ("Bietet ihr Google Ads Betreuung an?", False),
+    ("Do you offer social media marketing?", False),
+    ("Wie heißt die Ansprechpartnerin für SEO?", False),
+    ("Which clients have you worked with in the automotive industry?", True),
+    ("Warum sollten wir unsere SEA Kampagnen mit euch statt inhouse betreuen lassen?", True),
+    ("Compare your SEO and content marketing approach and recommend a strategy for a B2B SaaS startup", True),
+    ("Was habt ihr zuletzt im Blog über Conversion Optimierung geschrieben und was empfehlt ihr daraus?", True),
+    ("Can you explain how you would plan a tracking setup with GA4 and consent management for our shop?", True),
+]
+
+STUB_JOBS = [{"id": "job-seo", "title": "SEO Manager (m/w/d)", "profile": "Du betreust SEO Projekte.",
+              "apply_link": "https://www.neckarmedia.com/karriere"}]
+
+
+def stub_route(prompt):
+    """Deterministic stand-in for the routing LLM, by keywords in the user query."""
+    query = prompt.rsplit("User Query:", 1)[-1].split("Respond with", 1)[0].lower()
+    tools = []
+    if re.search(r"job|stelle|position|karriere", query):
+        tools.append("Jobs Scraper")
+    if re.search(r"gründer|founder|ceo|ansprech|wer ist|who is", query):
+        tools.append("Founder/Employee Info")
+    if re.search(r"client|kunde|blog|referenz|automotive|geschrieben", query):
+        tools.append("Company References (SQLite)")
+    if re.search(r"seo|sea|ads|marketing|tracking|bietet|offer|strateg", query) or not tools:
+        tools.append("Service Offerings")
+    return ", ".join(tools)
+
+
+class StubOpenAIHandler(BaseHTTPRequestHandler):
+    """Minimal OpenAI API: /v1/completions (routing) and /v1/responses (answers)."""
+
+    time_scale = 1.0
+
+    def log_message(self, *args):
+        pass
+
+    def _send(self, body):
+        data = json.dumps(body).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_POST(self):
+        request = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        model = request.get("model", "")
+        if self.path.endswith("/completions"):
+            time.sleep(0.3 * self.time_scale)
+            self._send({
+                "id": f"cmpl-{uuid.uuid4().hex}", "object": "text_completion", "created": int(time.time()),
+                "model": model,
+                "choices": [{"index": 0, "text": stub_route(request.get("prompt", "")), "finish_reason": "stop", "logprobs": None}],
+                "usage": {"prompt_tokens": 200, "completion_tokens": 10, "total_tokens": 210},
+            })
+            return
+
+        first_token, per_token = STUB_LATENCY.get(model, STUB_LATENCY["gpt-5"])
+        time.sleep((first_token + per_token * STUB_OUTPUT_TOKENS) * self.time_scale)
+        input_tokens = len(json.dumps(request.get("input", ""))) // 4
+        self._send({
+            "id": f"resp_{uuid.uuid4().hex}", "object": "response", "created_at": int(time.time()),
+            "model": model, "status": "completed",
+            "output": [{
+                "type": "message", "id": f"msg_{uuid.uuid4().hex}", "status": "completed", "role": "assistant",
+                "content": [{"type": "output_text", "text": f"Stub answer from {model}.", "annotations": []}],
+            }],
+            "usage": {"input_tokens": input_tokens, "output_tokens": STUB_OUTPUT_TOKENS,
+                      "total_tokens": input_tokens + STUB_OUTPUT_TOKENS},
+            "parallel_tool_calls": False, "tool_choice": "auto", "tools": [],
+        })
+
+
+def start_stub_server(time_scale=1.0, port=0):
+    """Starts the stub OpenAI server in a thread; returns (server, base_url)."""
+    StubOpenAIHandler.time_scale = time_scale
+    server = ThreadingHTTPServer(("127.0.0.1", port), StubOpenAIHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}/v1"
+
+
+def run_arm(name, agent, model_tiers, queries, tiering):
+    """Runs all queries with tiering on or off and summarizes latency, tiers and cost."""
+    model_tiers.MODEL_TIERING = tiering
+    metrics.reset()
+    rows, latencies = [], []
+    for query, hard in queries:
+        started = time.perf_counter()
+        turn = agent.generate_chat_turn(query)
+        latencies.append(time.perf_counter() - started)
+        tier = model_tiers.FAST if turn.model == model_tiers.FAST_MODEL else model_tiers.LARGE
+        complexity = model_tiers.estimate_complexity(query, turn.tools, agent.count_tokens(turn.context or ""))
+        rows.append({"query": query, "hard": hard, "tier": tier, "complexity": complexity,
+                     "model": turn.model, "answer": turn.answer})
+
+    counters = metrics.snapshot()["counters"]
+    timing = metrics.summarize(latencies)
+    misrouted = [row["query"] for row in rows if row["hard"] and row["tier"] != model_tiers.LARGE]
+    return {
+        "arm": name,
+        "fast_share": round(sum(row["tier"] == model_tiers.FAST for row in rows) / len(rows), 2),
+        "p50_s": round(timing["p50"], 2),
+        "p95_s": round(timing["p95"], 2),
+        "cost_usd": round(sum(v for k, v in counters.items() if k.endswith(".cost_usd")), 4),
+        "hard_on_fast": len(misrouted),
+    }, rows, misrouted
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline A/B of the model-tier policy against a stub OpenAI server.")
+    parser.add_argument("--queries", help="JSON Lines file with {\"query\", \"hard\"} per line (default: built-in set)")
+    parser.add_argument("--max-fast-score", type=int, help="Override FAST_TIER_MAX_SCORE for this run")
+    parser.add_argument("--time-scale", type=float, default=0.1, help="Multiplier on the simulated model latencies")
+    parser.add_argument("--report", help="Write per-query rows and the summary to this JSON file")
+    args = parser.parse_args()
+
+    # Point every OpenAI client at the stub before the agent creates them
+    server, base_url = start_stub_server(args.time_scale)
+    os.environ["OPENAI_BASE_URL"] = base_url
+    os.environ["OPENAI_API_BASE"] = base_url  # read by langchain_openai
+    os.environ["OPENAI_API_KEY"] = "stub"
+    os.environ.setdefault("FAST_PATH_LOG_PATH", "")
+    os.environ.setdefault("HF_HUB_OFFLINE", "1")
+
+    from services import agent, model_tiers
+    agent.jobs_cache.set("jobs", STUB_JOBS)  # no live scraping
+    agent.fast_path.enabled = False  # compare the LLM path only
+    if args.max_fast_score is not None:
+        model_tiers.FAST_TIER_MAX_SCORE = args.max_fast_score
+
+    queries = DEFAULT_QUERIES
+    if args.queries:
+        with open(args.queries, "r", encoding="utf-8") as f:
+            queries = [(r["query"], bool(r.get("hard"))) for r in map(json.loads, filter(str.strip, f))]
+
+    summaries, report = [], {}
+    for name, tiering in (("A: large only", False), ("B: tiered", True)):
+        summary, rows, misrouted = run_arm(name, agent, model_tiers, queries, tiering)
+        summaries.append(summary)
+        report[name] = {"summary": summary, "rows": rows}
+        for query in misrouted:
+            print(f"⚠️ Hard query answered by the fast model: {query}")
+    server.shutdown()
+
+    from services.retrieval_eval import print_table
+    print_table(summaries)
+    if args.report:
+        with open(args.report, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+        print(f"✅ Report written to {args.report}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,168 @@
+import math
+import os
+import threading
+import time
+from collections import deque
+
+from openai import APIConnectionError, APIStatusError
+
+from services import metrics
+from services.logs import get_logger
+
+log = get_logger("upstream")
+
+UPSTREAM_MAX_CONCURRENCY = int(os.getenv("UPSTREAM_MAX_CONCURRENCY", "16"))  # in-flight calls per process
+UPSTREAM_QUEUE_TIMEOUT = float(os.getenv("UPSTREAM_QUEUE_TIMEOUT", "2"))       # seconds to wait for a free slot
+UPSTREAM_WINDOW_SECONDS = float(os.getenv("UPSTREAM_WINDOW_SECONDS", "60"))    # calls the breaker looks at
+UPSTREAM_MIN_CALLS = int(os.getenv("UPSTREAM_MIN_CALLS", "10"))                # before it may open
+UPSTREAM_MAX_ERROR_RATE = float(os.getenv("UPSTREAM_MAX_ERROR_RATE", "0.5"))
+UPSTREAM_OPEN_SECONDS = float(os.getenv("UPSTREAM_OPEN_SECONDS", "30"))        # before a probe call is let through
+UPSTREAM_SHED_RETRY_AFTER = int(os.getenv("UPSTREAM_SHED_RETRY_AFTER", "5"))
+
+CLOSED, HALF_OPEN, OPEN = "closed", "half_open", "open"
+_STATE_GAUGE = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+
+class UpstreamUnavailable(Exception):
+    """The call was not made: the breaker is open or all slots are busy."""
+
+    def __init__(self, message, retry_after):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+def is_upstream_failure(error):
+    """Timeouts, connection errors, 429 and 5xx count against the breaker; client errors don't."""
+    if isinstance(error, APIConnectionError):  # includes APITimeoutError
+        return True
+    if isinstance(error, APIStatusError):
+        return error.status_code == 429 or error.status_code >= 500
+    return isinstance(error, TimeoutError)
+
+
+class UpstreamManager:
+    """Concurrency limit plus circuit breaker for one kind of upstream call.
+
+    At most ``max_concurrency`` calls run at once; a caller that can't get a
+    slot within ``queue_timeout`` is shed instead of queueing. The breaker
+    opens when, over the last ``window`` seconds, the error rate or the p95
+    latency exceeds its limit. While open, calls fail fast with
+    UpstreamUnavailable; after ``open_seconds`` one probe call is let through
+    and its outcome closes or reopens the breaker.
+    """
+
+    def __init__(self, name, max_p95_seconds, max_concurrency=UPSTREAM_MAX_CONCURRENCY,
+                 queue_timeout=UPSTREAM_QUEUE_TIMEOUT, window=UPSTREAM_WINDOW_SECONDS,
+                 min_calls=UPSTREAM_MIN_CALLS, max_error_rate=UPSTREAM_MAX_ERROR_RATE,
+                 open_seconds=UPSTREAM_OPEN_SECONDS):
+        self.name = name
+        self.max_p95 = max_p95_seconds
+        self.queue_timeout = queue_timeout
+        self.window = window
+        self.min_calls = min_calls
+        self.max_error_rate = max_error_rate
+        self.open_seconds = open_seconds
+        self._slots = threading.BoundedSemaphore(max_concurrency)
+        self._lock = threading.Lock()
+        self._calls = deque()  # (finished at, ok, seconds)
+        self._state = CLOSED
+        self._opened_at = 0.0
+        self._probing = False
+
+    @property
+    def state(self):
+        return self._state
+
+    def _set_state(self, state):
+        if state != self._state:
+            log.warning("upstream.circuit", extra={"upstream": self.name, "from": self._state, "to": state})
+            metrics.incr(f"upstream.{self.name}.{state}")
+        self._state = state
+        metrics.set_gauge(f"upstream.{self.name}.state", _STATE_GAUGE[state])
+
+    def retry_after(self):
+        """Seconds until the breaker lets a probe through (for a Retry-After header)."""
+        if self._state == OPEN:
+            return max(1, math.ceil(self._opened_at + self.open_seconds - time.monotonic()))
+        return UPSTREAM_SHED_RETRY_AFTER
+
+    def accepting(self):
+        """False while the breaker is open and no probe is due."""
+        with self._lock:
+            if self._state == OPEN:
+                return time.monotonic() >= self._opened_at + self.open_seconds
+            return not (self._state == HALF_OPEN and self._probing)
+
+    def _admit(self):
+        with self._lock:
+            if self._state == OPEN and time.monotonic() >= self._opened_at + self.open_seconds:
+                self._set_state(HALF_OPEN)
+            if self._state == OPEN or (self._state == HALF_OPEN and self._probing):
+                metrics.incr(f"upstream.{self.name}.rejected")
+                raise UpstreamUnavailable(f"{self.name} circuit open", self.retry_after())
+            probe = self._state == HALF_OPEN
+            if probe:
+                self._probing = True
+        if not self._slots.acquire(timeout=self.queue_timeout):
+            if probe:
+                with self._lock:
+                    self._probing = False
+            metrics.incr(f"upstream.{self.name}.shed")
+            raise UpstreamUnavailable(f"{self.name} concurrency limit reached", UPSTREAM_SHED_RETRY_AFTER)
+        return probe
+
+    def _finish(self, probe, ok, seconds):
+        self._slots.release()
+        metrics.observe(f"upstream.{self.name}.ms", seconds * 1000)
+        if not ok:
+            metrics.incr(f"upstream.{self.name}.failures")
+        with self._lock:
+            now = time.monotonic()
+            if probe:
+                self._probing = False
+                if ok:
+                    self._calls.clear()
+                    self._set_state(CLOSED)
+                else:
+                    self._opened_at = now
+                    self._set_state(OPEN)
+                return
+
+            self._calls.append((now, ok, seconds))
+            while self._calls and self._calls[0][0] < now - self.window:
+                self._calls.popleft()
+            if self._state != CLOSED or len(self._calls) < self.min_calls:
+                return
+            error_rate = sum(1 for _, call_ok, _ in self._calls if not call_ok) / len(self._calls)
+            p95 = metrics.percentile(sorted(s for _, _, s in self._calls), 95)
+            if error_rate > self.max_error_rate or p95 > self.max_p95:
+                log.warning("upstream.degraded", extra={"upstream": self.name, "error_rate": round(error_rate, 3),
+                                                        "p95_s": round(p95, 3)})
+                self._opened_at = now
+                self._set_state(OPEN)
+
+    def call(self, fn, *args, **kwargs):
+        """Runs one upstream call under the limit and the breaker."""
+        probe = self._admit()
+        started = time.perf_counter()
+        ok = True
+        try:
+            return fn(*args, **kwargs)
+        except Exception as e:
+            ok = not is_upstream_failure(e)
+            raise
+        finally:
+            self._finish(probe, ok, time.perf_counter() - started)
+
+    def stream(self, fn, *args, **kwargs):
+        """Like call(), for a streaming call: the slot is held until the stream is consumed."""
+        probe = self._admit()
+        started = time.perf_counter()
+        ok = True
+        try:
+            yield from fn(*args, **kwargs)
+        except Exception as e:
+            ok = not is_upstream_failure(e)
+            raise
+        finally:
+            self._finish(probe, ok, time.perf_counter() - started)
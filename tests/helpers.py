@@ -0,0 +1,12 @@
+"""Shared stand-ins for the tests (no model downloads)."""
+
+import numpy as np
+
+def trigram_encode(texts):
+    """Hashes character trigrams into normalized vectors; identical texts score 1.0."""
+    rows = np.zeros((len(texts), 512), dtype=np.float32)
+    for i, text in enumerate(texts):
+        text = text.lower()
+        for j in range(len(text) - 2):
+            rows[i, hash(text[j:j + 3]) % 512] += 1
+    return rows / np.maximum(np.linalg.norm(rows, axis=1, keepdims=True), 1e-12)
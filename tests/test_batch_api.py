@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""Tests for the API key check and the /chat_batch JSON Lines endpoint, with the pipeline replaced."""
+
+import sys
+import os
+import json
+from types import SimpleNamespace
+
+# Add the project root to Python path (parent directory of tests/)
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+
+os.environ.setdefault("ALLOWED_ORIGINS", "http://localhost")  # required by api.py
+
+from fastapi import HTTPException
+from fastapi.testclient import TestClient
+
+import api
+from services import batch
+from services.upstream import UpstreamUnavailable
+
+def fake_turn(user_query, snapshot=None, retrieved_articles=None):
+    """Stand-in for agent.generate_chat_turn: echoes what the batch retrieval handed it."""
+    if "kaputt" in user_query:
+        raise RuntimeError("generation failed")
+    return SimpleNamespace(answer=f"Antwort auf {user_query}", tools=[r["title"] for r in retrieved_articles])
+
+def with_fake_pipeline(test):
+    """Runs a test with API_KEY set and retrieval/generation replaced, so no model or LLM is needed."""
+    def run():
+        saved_key = api.API_KEY
+        saved = {name: getattr(batch, name) for name in
+                 ("get_snapshot", "encode_queries", "search_articles_batch", "generate_chat_turn")}
+        api.API_KEY = "geheim"
+        batch.get_snapshot = lambda: None
+        batch.encode_queries = lambda queries: [[0.0]] * len(queries)
+        batch.search_articles_batch = lambda queries, embeddings, snapshot=None: [[{"title": q}] for q in queries]
+        batch.generate_chat_turn = fake_turn
+        try:
+            test()
+        finally:
+            api.API_KEY = saved_key
+            for name, value in saved.items():
+                setattr(batch, name, value)
+    run.__name__, run.__doc__ = test.__name__, test.__doc__
+    return run
+
+def status_for(api_key):
+    try:
+        api.verify_api_key(api_key)
+    except HTTPException as e:
+        return e.status_code
+    return 200
+
+def test_verify_api_key():
+    """403 while no API_KEY is configured; 401 for a missing or wrong key; passes for the right one."""
+    saved_key = api.API_KEY
+    try:
+        api.API_KEY = ""
+        assert status_for("irgendwas") == 403
+        api.API_KEY = "geheim"
+        assert status_for(None) == 401
+        assert status_for("falsch") == 401
+        assert status_for("geheim") == 200
+    finally:
+        api.API_KEY = saved_key
+
+@with_fake_pipeline
+def test_chat_batch_requires_the_key():
+    client = TestClient(api.app)
+    response = client.post("/chat_batch", json={"user_prompts": ["Hallo"]})
+    assert response.status_code == 401
+    response = client.post("/chat_batch", json={"user_prompts": ["  "]}, headers={"X-API-Key": "geheim"})
+    assert response.status_code == 400
+
+@with_fake_pipeline
+def test_chat_batch_streams_one_line_per_prompt():
+    """Every prompt gets one JSON line with its index; a failing prompt reports its error without stopping the batch."""
+    prompts = ["Was macht ihr?", "Das ist kaputt", "Habt ihr Jobs?"]
+    response = TestClient(api.app).post("/chat_batch", json={"user_prompts": prompts, "concurrency": 2},
+                                        headers={"X-API-Key": "geheim"})
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+
+    results = sorted((json.loads(line) for line in response.text.splitlines()), key=lambda r: r["index"])
+    print(f"   {len(results)} lines: {[r.get('response', r.get('error')) for r in results]}")
+    assert [r["query"] for r in results] == prompts
+    assert results[0]["response"] == "Antwort auf Was macht ihr?"
+    assert results[0]["tools"] == ["Was macht ihr?"]  # its own row of the batch retrieval
+    assert results[1]["error"] == "generation failed"
+    assert results[2]["tools"] == ["Habt ihr Jobs?"]
+
+@with_fake_pipeline
+def test_shed_batch_items_are_retried():
+    """An item shed by the LLM limiter waits and retries instead of coming back as an error line."""
+    attempts = []
+
+    def busy_twice(user_query, snapshot=None, retrieved_articles=None):
+        attempts.append(user_query)
+        if len(attempts) <= 2:
+            raise UpstreamUnavailable("generation concurrency limit reached", 0)
+        return fake_turn(user_query, snapshot, retrieved_articles)
+
+    batch.generate_chat_turn = busy_twice
+    saved_base = batch.BATCH_RETRY_BASE_SECONDS
+    batch.BATCH_RETRY_BASE_SECONDS = 0.001
+    try:
+        results = list(batch.run_batch(["Habt ihr Jobs?"]))
+        print(f"   {len(attempts)} attempts: {results}")
+        assert results[0]["response"] == "Antwort auf Habt ihr Jobs?"
+        assert len(attempts) == 3
+
+        def always_busy(user_query, snapshot=None, retrieved_articles=None):
+            attempts.append(user_query)
+            raise UpstreamUnavailable("generation circuit open", 0)
+
+        attempts.clear()
+        batch.generate_chat_turn = always_busy
+        results = list(batch.run_batch(["Habt ihr Jobs?"]))
+        assert results[0]["error"] == "generation circuit open"  # gives up after BATCH_RETRIES
+        assert len(attempts) == batch.BATCH_RETRIES + 1
+    finally:
+        batch.BATCH_RETRY_BASE_SECONDS = saved_base
+
+if __name__ == "__main__":
+    print("=" * 60)
+    print("🚀 BATCH API TESTS")
+    print("=" * 60)
+
+    test_verify_api_key()
+    test_chat_batch_requires_the_key()
+    test_chat_batch_streams_one_line_per_prompt()
+    test_shed_batch_items_are_retried()
+
+    print("\n" + "=" * 60)
+    print("✅ All tests completed!")
+    print("=" * 60)
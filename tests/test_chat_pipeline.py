@@ -0,0 +1,229 @@
+#!/usr/bin/env python3
+"""Tests for the chat pipeline in services/agent.py, with stand-ins for the LLM calls."""
+
+import sys
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+import httpx
+import numpy as np
+
+# Add the project root to Python path (parent directory of tests/)
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+
+from services import agent, metrics
+from services.knowledge import KnowledgeSnapshot
+from services.quantize import CompressedIndex
+from services.ranking import latest_articles
+
+class StubUpstream:
+    """Replaces generation_upstream: streams the given deltas, then optionally raises."""
+    def __init__(self, deltas, error=None):
+        self.deltas = deltas
+        self.error = error
+
+    def stream(self, fn, *args, **kwargs):
+        yield SimpleNamespace(type="response.created", response=SimpleNamespace(id="resp_1"))
+        for delta in self.deltas:
+            yield SimpleNamespace(type="response.output_text.delta", delta=delta)
+        if self.error:
+            raise self.error
+        yield SimpleNamespace(type="response.completed", response=SimpleNamespace(usage=None))
+
+def run_stream(query, upstream):
+    """Runs stream_chat_turn with a fixed plan and the stub upstream; returns (text deltas, ChatTurn)."""
+    saved = agent.generation_upstream, agent.plan_chat, agent.answer_fast_path
+    agent.generation_upstream = upstream
+    agent.plan_chat = lambda user_query, session=None: agent.ChatPlan(user_query, ["Service Offerings"], "ctx")
+    agent.answer_fast_path = lambda user_query, snapshot=None: None
+    try:
+        items = list(agent.stream_chat_turn(query))
+    finally:
+        agent.generation_upstream, agent.plan_chat, agent.answer_fast_path = saved
+    return items[:-1], items[-1]
+
+def test_interrupted_stream_is_marked_and_not_cached():
+    """A stream that breaks off after some deltas ends with a note and a failed turn that isn't cached."""
+    query = "Was kostet eine Website bei euch?"
+    deltas, turn = run_stream(query, StubUpstream(["Eine Website ", "kostet ", "ab "], ConnectionError("reset")))
+    print(f"   Streamed: {deltas!r}")
+    assert deltas == ["Eine Website ", "kostet ", "ab ", agent.INTERRUPTED_NOTE]
+    assert turn.failed and turn.response_id is None
+    assert turn.answer == "Eine Website kostet ab " + agent.INTERRUPTED_NOTE
+    assert agent.answer_cache.get(agent.normalize_query(query)) is None
+
+def test_completed_stream_is_cached_unless_unsure():
+    """A complete answer is cached for the fallback; an "I don't know" answer is not."""
+    query = "Wie lange dauert ein SEO Audit?"
+    _, turn = run_stream(query, StubUpstream(["Etwa ", "zwei Wochen."]))
+    assert not turn.failed and turn.response_id == "resp_1"
+    assert agent.answer_cache.get(agent.normalize_query(query)) == "Etwa zwei Wochen."
+
+    unsure = "Wer war euer erster Kunde?"
+    _, turn = run_stream(unsure, StubUpstream(["I don't know, ", "sorry."]))
+    assert agent.answer_cache.get(agent.normalize_query(unsure)) is None
+
+def make_snapshot(rows=40, dim=16):
+    rng = np.random.default_rng(0)
+    matrix = rng.normal(size=(rows, dim)).astype(np.float32)
+    matrix /= np.linalg.norm(matrix, axis=1, keepdims=True)
+    articles = [{"id": i, "document_id": i, "source_type": "blog", "title": f"Artikel {i}", "summary": "…",
+                 "source_url": f"https://x/{i}/", "published_at": f"20{10 + i % 15}-0{1 + i % 9}-01"}
+                for i in range(rows)]
+    articles[11].update(source_type="document", published_at=None)  # an undated Drive file
+    return KnowledgeSnapshot(None, {}, {}, articles, matrix, {})
+
+def test_batch_search_matches_single_search():
+    """The batch search ranks like the single search: latest intent, recency weights, compressed index."""
+    snapshot = make_snapshot()
+    queries = ["SEO Tipps für Shops", "What are your latest blog posts?", "Was habt ihr zuletzt über SEO geschrieben?"]
+    vectors = np.stack([snapshot.matrix[3], snapshot.matrix[7], snapshot.matrix[11]])
+    saved = agent.encode_queries
+    agent.encode_queries = lambda texts: vectors[[queries.index(text) for text in texts]]
+    try:
+        for index in (None, CompressedIndex(snapshot.matrix, "int8")):
+            snapshot.vector_index = index
+            single = [agent.query_vector_search(query, snapshot=snapshot) for query in queries]
+            batch = agent.search_articles_batch(queries, vectors, snapshot=snapshot)
+            print(f"   {index.mode if index else 'float32'}: {[[a['title'] for a in r] for r in batch]}")
+            assert batch == single
+    finally:
+        agent.encode_queries = saved
+    assert batch[1] == latest_articles(3, snapshot)
+    assert "Artikel 11" not in [article["title"] for article in batch[2]]  # "zuletzt über": dated posts only
+
+def run_stub_tools(durations, workers=1, timeout=0.3, queue_timeout=2.0):
+    """Runs run_tools with tools that just sleep ``durations[tool]`` seconds, on a pool of ``workers``."""
+    def sleeping_tool(tool, user_query, snapshot, retrieved_articles=None):
+        time.sleep(durations[tool])
+        return [tool], True, []
+
+    saved = (agent.tool_context_items, agent.tool_executor, agent.TOOL_TIMEOUT_SECONDS, agent.TOOL_QUEUE_TIMEOUT_SECONDS)
+    agent.tool_context_items = sleeping_tool
+    agent.tool_executor = ThreadPoolExecutor(max_workers=workers)
+    agent.TOOL_TIMEOUT_SECONDS, agent.TOOL_QUEUE_TIMEOUT_SECONDS = timeout, queue_timeout
+    metrics.reset()
+    try:
+        outputs = agent.run_tools(list(durations), "Was macht ihr?", None)
+        agent.tool_executor.shutdown(wait=True)
+    finally:
+        (agent.tool_context_items, agent.tool_executor,
+         agent.TOOL_TIMEOUT_SECONDS, agent.TOOL_QUEUE_TIMEOUT_SECONDS) = saved
+    return sorted(outputs), metrics.snapshot()
+
+def test_tool_deadline_starts_when_the_tool_runs():
+    """Waiting for a busy pool doesn't count against a tool's timeout; the wait is measured on its own."""
+    tools, stats = run_stub_tools({"Service Offerings": 0.2, "Founder/Employee Info": 0.15})
+    wait = stats["timings"]["tool.queue_wait_ms"]
+    print(f"   Outputs: {tools}, queue wait max {max(wait['p50'], wait['p99']):.0f} ms")
+    assert tools == ["Founder/Employee Info", "Service Offerings"]
+    assert wait["count"] == 2 and wait["p99"] >= 150
+
+def test_slow_tool_times_out_others_kept():
+    """A tool running past its timeout is left out; the other tools' output is still used."""
+    tools, stats = run_stub_tools({"Service Offerings": 0.6, "Founder/Employee Info": 0.01}, workers=2)
+    assert tools == ["Founder/Employee Info"]
+    assert stats["counters"]["tool.timeouts"] == 1
+
+def test_tool_queued_too_long_is_cancelled():
+    """A tool that can't get a worker within the queue timeout is cancelled instead of running late."""
+    tools, stats = run_stub_tools({"Service Offerings": 0.25, "Founder/Employee Info": 0.01}, queue_timeout=0.1)
+    assert tools == ["Service Offerings"]
+    assert stats["counters"]["tool.queue_timeouts"] == 1
+    assert "tool.Founder/Employee Info.ms" not in stats["timings"]  # never ran
+
+def test_speculation_is_bounded_and_discarded():
+    """Speculation uses its own slots and is skipped when they're busy; results routing drops are discarded."""
+    release = threading.Event()
+
+    def blocking_tool(tool, user_query, snapshot, retrieved_articles=None):
+        release.wait(2)
+        return [tool], True, []
+
+    saved = agent.tool_context_items, agent.speculative_slots, agent.SPECULATIVE_TOOLS
+    agent.tool_context_items = blocking_tool
+    agent.speculative_slots = threading.BoundedSemaphore(1)
+    agent.SPECULATIVE_TOOLS = ["Company References (SQLite)"]
+    metrics.reset()
+    try:
+        first = agent.start_speculative_tools("SEO Tipps", None)
+        second = agent.start_speculative_tools("SEA Tipps", None)
+        assert list(first) == ["Company References (SQLite)"] and second == {}
+        agent.discard_speculative_tools(first, selected_tools=["Service Offerings"])
+        release.set()
+        first["Company References (SQLite)"].future.result(2)
+        assert agent.speculative_slots.acquire(timeout=1)  # slot given back (by a done callback)
+        agent.speculative_slots.release()
+
+        reused = agent.start_speculative_tools("GA4 Tracking", None)
+        outputs = agent.run_tools(["Company References (SQLite)"], "GA4 Tracking", None, started_tools=reused)
+    finally:
+        agent.tool_context_items, agent.speculative_slots, agent.SPECULATIVE_TOOLS = saved
+    counters = metrics.snapshot()["counters"]
+    print(f"   Speculation: { {k: v for k, v in counters.items() if k.startswith('speculative.')} }")
+    assert counters["speculative.skipped"] == 1 and counters["speculative.wasted"] == 1
+    assert outputs["Company References (SQLite)"][0] == ["Company References (SQLite)"]
+
+def test_follow_up_needs_an_explicit_cue():
+    """Continuations and bare pronouns reuse the last turn; standalone questions with pronouns don't."""
+    session = SimpleNamespace(last_context="services.seo: ...")
+    follow_ups = ["Und was kostet das?", "and for startups?", "What about Heilbronn?", "What does that cost?",
+                  "Wie lange dauert das?", "Was kostet es?"]
+    standalone = ["Bieten Sie auch SEO an?", "Is there a job opening?", "Was ist das Besondere an euch?",
+                  "Is it possible to book a workshop?", "Gibt es offene Stellen?", "Was kostet das Audit?"]
+    for query in follow_ups:
+        assert agent.is_follow_up(query, session), query
+    for query in standalone:
+        assert not agent.is_follow_up(query, session), query
+    assert not agent.is_follow_up("Und was kostet das?", SimpleNamespace(last_context=None))
+
+class FailingChainClient:
+    """Replaces the OpenAI client: the chained call fails with the given status, the unchained one answers."""
+    def __init__(self, status):
+        self.status = status
+        self.calls = []
+        self.responses = self
+
+    def create(self, **kwargs):
+        self.calls.append("previous_response_id" in kwargs)
+        if "previous_response_id" in kwargs:
+            response = httpx.Response(self.status, request=httpx.Request("POST", "https://api.openai.com/v1/responses"))
+            raise agent.APIStatusError("chained call failed", response=response, body=None)
+        return "unchained answer"
+
+def test_chain_fallback_only_for_an_expired_previous_response():
+    """400/404 resend the history once; 429 and 5xx are raised to the caller without a second call."""
+    plan = agent.ChatPlan("Und was kostet das?", ["Service Offerings"], "ctx", previous_response_id="resp_old")
+    saved = agent.client
+    try:
+        for status, falls_back in ((404, True), (400, True), (429, False), (503, False)):
+            agent.client = FailingChainClient(status)
+            try:
+                result = agent.create_gpt_response(plan)
+            except agent.APIStatusError as e:
+                result = e.status_code
+            print(f"   {status}: calls {agent.client.calls} -> {result}")
+            assert (result == "unchained answer") == falls_back
+            assert agent.client.calls == ([True, False] if falls_back else [True])
+    finally:
+        agent.client = saved
+
+if __name__ == "__main__":
+    print("=" * 60)
+    print("CHAT PIPELINE TESTS")
+    print("=" * 60)
+    test_interrupted_stream_is_marked_and_not_cached()
+    test_completed_stream_is_cached_unless_unsure()
+    test_batch_search_matches_single_search()
+    test_tool_deadline_starts_when_the_tool_runs()
+    test_slow_tool_times_out_others_kept()
+    test_tool_queued_too_long_is_cancelled()
+    test_speculation_is_bounded_and_discarded()
+    test_follow_up_needs_an_explicit_cue()
+    test_chain_fallback_only_for_an_expired_previous_response()
+    print("=" * 60)
+    print("✅ All chat pipeline tests passed")
+    print("=" * 60)
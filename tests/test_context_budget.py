@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""Tests for the prompt context budget stage."""
+
+import sys
+import os
+
+# Add the project root to Python path (parent directory of tests/)
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+
+from services.context_budget import count_tokens, fit_to_budget, prepare_items
+
+SERVICES = {
+    "about": "Wir sind eine Agentur für digitales Marketing.",
+    "services": {
+        "seo": {"description": "Technische und inhaltliche Optimierung von Webseiten. " * 10},
+        "sea": {"description": "Google Ads Kampagnen und Keyword-Recherche. " * 10},
+    },
+    "faqs": {"seo_vs_sea": "SEO ist organisch, SEA ist bezahlt."},
+}
+
+def test_prepare_items_splits_nested_dicts():
+    """Each nested key becomes its own item with compact JSON."""
+    items = prepare_items(SERVICES)
+    labels = [item.label for item in items]
+    print(f"   Labels: {labels}")
+    assert labels == ["about", "services.seo", "services.sea", "faqs.seo_vs_sea"]
+    assert '{"description":' in items[1].text
+
+def test_fit_to_budget_respects_budget():
+    """The rendered context, omission note included, never exceeds the budget."""
+    items = prepare_items(SERVICES)
+    context = fit_to_budget(items, "Was kostet Google Ads?", budget=60)
+    print(f"   Context ({count_tokens(context)} tokens): {context[:120]}...")
+    assert count_tokens(context) <= 60
+    assert "services.sea" in context  # most relevant item survives
+
+def test_fit_to_budget_keeps_ranked_order():
+    """Ranked tool output (e.g. vector search) keeps its top results first."""
+    results = [{"title": f"Artikel {i}", "summary": "Text " * 50} for i in range(5)]
+    context = fit_to_budget(prepare_items(results, "article"), "egal", budget=150, ranked=True)
+    print(f"   Context: {context[:120]}...")
+    assert context.startswith('article: {"title":"Artikel 0"')
+    assert "Artikel 4" not in context.split("(+")[0]
+
+def test_fit_to_budget_counts_labels():
+    """Many small labeled items: labels and line breaks count against the budget too."""
+    employees = {"employees": {f"Mitarbeiterin_{i}": f"Rolle {i}" for i in range(60)}}
+    items = prepare_items(employees)
+    for budget in (50, 120, 300):
+        context = fit_to_budget(items, "Wer arbeitet dort?", budget=budget)
+        print(f"   Budget {budget}: {count_tokens(context)} tokens")
+        assert count_tokens(context) <= budget
+        assert "employees.Mitarbeiterin_0" in context
+
+if __name__ == "__main__":
+    print("=" * 60)
+    print("🚀 CONTEXT BUDGET TESTS")
+    print("=" * 60)
+
+    test_prepare_items_splits_nested_dicts()
+    test_fit_to_budget_respects_budget()
+    test_fit_to_budget_keeps_ranked_order()
+    test_fit_to_budget_counts_labels()
+
+    print("\n" + "=" * 60)
+    print("✅ All tests completed!")
+    print("=" * 60)
@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""Tests for URL canonicalization and SimHash near-duplicate detection."""
+
+import sys
+import os
+import sqlite3
+import tempfile
+
+# Add the project root to Python path (parent directory of tests/)
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+
+from services.dedup import backfill, canonical_url, distance, simhash, unique_articles_sql
+
+ARTICLE = " ".join(
+    f"Satz {i} über Suchmaschinenoptimierung, Kampagnen und Tracking für Kunde {i % 7} in Heilbronn."
+    for i in range(60)
+)
+
+def test_canonical_url_collapses_variants():
+    """Tracking parameters, fragments, AMP, host case and www map to one URL."""
+    canonical = canonical_url("https://www.neckarmedia.com/seo-sea-kombination/")
+    for variant in ("https://www.neckarmedia.com/seo-sea-kombination/?utm_source=newsletter&fbclid=abc",
+                    "http://NECKARMEDIA.com/seo-sea-kombination",
+                    "https://www.neckarmedia.com/seo-sea-kombination/amp/#comments"):
+        assert canonical_url(variant) == canonical, variant
+    print(f"   Canonical: {canonical}")
+    assert canonical_url("https://www.neckarmedia.com/?p=12&utm_medium=x") == "https://neckarmedia.com/?p=12"
+
+def test_simhash_separates_near_and_distinct_texts():
+    """A lightly edited copy stays within a few bits; a different text doesn't."""
+    edited = ARTICLE.replace("Satz 10", "Anzeige: Satz 10") + " Zuerst erschienen auf neckarmedia.com"
+    other = " ".join(f"Employer Branding Workshop {i} mit Social Media Fokus und Recruiting." for i in range(60))
+    near, far = distance(simhash(ARTICLE), simhash(edited)), distance(simhash(ARTICLE), simhash(other))
+    print(f"   Edited copy: {near} bits, other article: {far} bits")
+    assert near <= 6 < far
+
+def test_backfill_links_duplicates_and_drops_their_embedding():
+    with tempfile.TemporaryDirectory() as tmp:
+        conn = sqlite3.connect(os.path.join(tmp, "dedup.db"))
+        conn.execute("CREATE TABLE blog_articles (id INTEGER PRIMARY KEY, title TEXT, content TEXT, source_url TEXT, embedding TEXT)")
+        conn.executemany("INSERT INTO blog_articles VALUES (?, ?, ?, ?, '[1]')", [
+            (1, "Post", ARTICLE, "https://www.neckarmedia.com/post/"),
+            (2, "Post (Kopie)", ARTICLE + " Teilen", "https://www.neckarmedia.com/kategorie/post-2/"),
+            (3, "Post", "Ganz anderer Text " * 40, "https://neckarmedia.com/post/?utm_source=x"),
+            (4, "Anderer Post", "Ganz anderer Text über Messen " * 40, "https://www.neckarmedia.com/messe/"),
+        ])
+        assert backfill(conn) == 2
+        rows = dict(conn.execute("SELECT id, duplicate_of FROM blog_articles"))
+        assert rows == {1: None, 2: 1, 3: 1, 4: None}
+        kept = conn.execute(f"SELECT id FROM blog_articles WHERE embedding IS NOT NULL AND {unique_articles_sql(conn)}").fetchall()
+        assert [r[0] for r in kept] == [1, 4]
+        conn.close()
+
+if __name__ == "__main__":
+    print("=" * 60)
+    print("NEAR-DUPLICATE DETECTION TESTS")
+    print("=" * 60)
+    test_canonical_url_collapses_variants()
+    test_simhash_separates_near_and_distinct_texts()
+    test_backfill_links_duplicates_and_drops_their_embedding()
+    print("=" * 60)
+    print("✅ All near-duplicate tests passed")
+    print("=" * 60)
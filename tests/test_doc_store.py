@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""Tests for the unified document/chunk store, on a temporary database."""
+
+import sys
+import os
+import json
+import sqlite3
+import tempfile
+import numpy as np
+
+# Add the project root to Python path (parent directory of tests/)
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+
+from services import doc_store
+
+def make_blog_db(path, vectors):
+    conn = sqlite3.connect(path)
+    conn.execute("""
+        CREATE TABLE blog_articles (id INTEGER PRIMARY KEY, title TEXT, content TEXT, summary TEXT,
+                                    keywords TEXT, source_url TEXT, embedding BLOB)
+    """)
+    for i, vector in enumerate(vectors, start=1):
+        conn.execute("INSERT INTO blog_articles VALUES (?, ?, ?, ?, ?, ?, ?)",
+                     (i, f"Post {i}", "...", f"Summary {i}", "seo, client", f"https://example.com/{i}",
+                      json.dumps(vector)))
+    conn.commit()
+    return conn
+
+def test_split_text_overlaps_and_bounds():
+    """Chunks respect the size limit and repeat the end of the previous chunk."""
+    text = " ".join(f"word{i}" for i in range(400))
+    chunks = doc_store.split_text(text, chunk_chars=200, overlap=50)
+    print(f"   {len(chunks)} chunks")
+    assert len(chunks) > 1
+    assert all(len(chunk) <= 200 for chunk in chunks)
+    assert chunks[0].split()[-1] in chunks[1]
+    assert chunks[-1].endswith("word399")
+
+def test_blog_and_documents_share_one_index():
+    """Blog rows and document chunks load into one matrix and are searched together."""
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "store.db")
+        conn = make_blog_db(db_path, [[1, 0, 0], [0, 1, 0]])
+        assert doc_store.load_index(db_path) is None  # no store yet: callers fall back to the blog table
+
+        assert doc_store.sync_blog(conn) == 2
+        assert doc_store.sync_blog(conn) == 0  # unchanged articles are not rewritten
+        doc_store.upsert_document(conn, doc_store.SOURCE_DOCX, "data/docs/Karla.docx", "Karla",
+                                  "data/docs/Karla.docx", "", ["Karla is the office dog."], [[0, 0, 2]], "h1")
+        conn.commit()
+
+        items, matrix, tag_index = doc_store.load_index(db_path)
+        print(f"   {len(items)} chunks: {sorted({item['source_type'] for item in items})}")
+        assert matrix.dtype == np.float32 and matrix.shape == (3, 3)
+        assert np.allclose(np.linalg.norm(matrix, axis=1), 1.0)
+        best = items[int(np.argmax(matrix @ np.array([0, 0.1, 1], dtype=np.float32)))]
+        assert best["source_type"] == "docx" and best["title"] == "Karla"
+        assert len(tag_index["seo"]) == 2
+
+        conn.execute("DELETE FROM blog_articles WHERE id = 2")
+        conn.commit()
+        doc_store.sync_blog(conn)
+        items, _, _ = doc_store.load_index(db_path)
+        assert len(items) == 2
+        conn.close()
+
+def test_ingesting_a_file_keeps_the_blog_searchable():
+    """The first ingested file mirrors the blog too, so the agent's index still holds every article."""
+    from services import knowledge
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "store.db")
+        conn = make_blog_db(db_path, [[1, 0, 0], [0, 1, 0]])
+        path = os.path.join(tmp, "Karla.docx")
+        open(path, "wb").close()
+        saved = doc_store.EXTRACTORS[".docx"]
+        doc_store.EXTRACTORS[".docx"] = (doc_store.SOURCE_DOCX, lambda path: "Karla is the office dog.")
+        try:
+            assert doc_store.ingest_files(conn, [path], encode=lambda texts: [[0, 0, 1]] * len(texts)) == 1
+        finally:
+            doc_store.EXTRACTORS[".docx"] = saved
+
+        articles, matrix, _ = knowledge._load_articles(db_path)
+        print(f"   Index: {[(a['source_type'], a['title']) for a in articles]}")
+        assert sorted(a["title"] for a in articles) == ["Karla", "Post 1", "Post 2"]
+        best = articles[int(np.argmax(matrix @ np.array([1, 0, 0], dtype=np.float32)))]
+        assert best["title"] == "Post 1"
+
+        # A changed summary (re-enrichment) reaches the mirrored chunk on refresh
+        conn.execute("UPDATE blog_articles SET summary = 'Neue Zusammenfassung' WHERE id = 1")
+        conn.commit()
+        assert doc_store.refresh_blog_mirror(conn) == 1
+        articles, _, _ = knowledge._load_articles(db_path)
+        assert {a["title"]: a["summary"] for a in articles}["Post 1"] == "Neue Zusammenfassung"
+        conn.close()
+
+if __name__ == "__main__":
+    print("=" * 60)
+    print("DOCUMENT STORE TESTS")
+    print("=" * 60)
+    test_split_text_overlaps_and_bounds()
+    test_blog_and_documents_share_one_index()
+    test_ingesting_a_file_keeps_the_blog_searchable()
+    print("=" * 60)
+    print("✅ All document store tests passed")
+    print("=" * 60)
@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""Tests for the micro-batching embedding worker (with a stand-in model, no torch needed)."""
+
+import sys
+import os
+import threading
+import time
+import numpy as np
+
+# Add the project root to Python path (parent directory of tests/)
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+
+from services.embedder import EmbeddingWorker
+
+class FakeModel:
+    """Records batch sizes; 'embeds' a text as (length, 1)."""
+    def __init__(self):
+        self.batches = []
+
+    def encode(self, texts, batch_size=None):
+        self.batches.append(len(texts))
+        time.sleep(0.01)
+        return np.array([[len(text), 1.0] for text in texts])
+
+def test_concurrent_requests_share_batches():
+    """Concurrent single-text encodes are merged into a few normalized batches."""
+    model = FakeModel()
+    worker = EmbeddingWorker(model, max_batch=16, max_wait_ms=20, cache_size=0)
+    results = {}
+
+    def request(i):
+        results[i] = worker.encode(["x" * (i + 1)])[0]
+
+    threads = [threading.Thread(target=request, args=(i,)) for i in range(40)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    print(f"   Batch sizes: {model.batches}")
+    assert len(results) == 40
+    assert max(model.batches) <= 16 and len(model.batches) < 40
+    expected = np.array([3.0, 1.0]) / np.linalg.norm([3.0, 1.0])
+    assert np.allclose(results[2], expected)
+
+def test_cache_skips_model():
+    """A repeated query is answered from the embedding cache."""
+    model = FakeModel()
+    worker = EmbeddingWorker(model, max_wait_ms=1)
+    first = worker.encode(["Hallo"])
+    second = worker.encode(["Hallo"])
+    assert model.batches == [1]
+    assert np.array_equal(first, second)
+
+if __name__ == "__main__":
+    print("=" * 60)
+    print("🚀 EMBEDDER TESTS")
+    print("=" * 60)
+
+    test_concurrent_requests_share_batches()
+    test_cache_skips_model()
+
+    print("\n" + "=" * 60)
+    print("✅ All tests completed!")
+    print("=" * 60)
@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""Tests for the fast path (canned greeting / FAQ answers), with a stand-in encoder."""
+
+import sys
+import os
+import json
+import tempfile
+
+# Add the project root to Python path (parent directory of tests/)
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+
+from services.fast_path import FastPath
+from services.knowledge import build_snapshot
+from tests.helpers import trigram_encode
+
+def make_fast_path(log_path):
+    return FastPath(threshold=0.9, log_path=log_path, enabled=True)
+
+def test_greeting_and_faq_are_answered():
+    """Greetings match exactly; a known FAQ question gets the services.json answer."""
+    snapshot = build_snapshot()
+    with tempfile.TemporaryDirectory() as tmp:
+        log_path = os.path.join(tmp, "log.jsonl")
+        fast = make_fast_path(log_path)
+
+        greeting = fast.match("Hallo! 👋", trigram_encode, snapshot)
+        print(f"   Greeting: {greeting.intent}/{greeting.lang}")
+        assert greeting.intent == "greetings" and greeting.lang == "de"
+
+        faq = fast.match("Was ist der Unterschied zwischen SEO und SEA?", trigram_encode, snapshot)
+        print(f"   FAQ: {faq.intent} ({faq.score:.2f})")
+        assert faq.answer == snapshot.services["faqs"]["seo_vs_sea"]
+
+        english = fast.match("What is the difference between SEO and SEA?", trigram_encode, snapshot)
+        assert english.lang == "en" and "SEO" in english.answer
+
+        fast.match("Hallo", trigram_encode, snapshot, log=False)  # warm-up replay: not logged
+        fast.review_log.flush()
+        with open(log_path, encoding="utf-8") as f:
+            logged = [json.loads(line) for line in f]
+        assert len(logged) == 3 and all(entry["answered"] for entry in logged)
+
+def test_specific_question_goes_to_pipeline():
+    """A question that isn't a known FAQ is left to the full pipeline."""
+    with tempfile.TemporaryDirectory() as tmp:
+        fast = make_fast_path(os.path.join(tmp, "log.jsonl"))
+        result = fast.match("Welche Stellen für Werkstudenten im Bereich SEA sind offen?", trigram_encode, build_snapshot())
+        assert result is None
+
+if __name__ == "__main__":
+    print("=" * 60)
+    print("🚀 FAST PATH TESTS")
+    print("=" * 60)
+
+    test_greeting_and_faq_are_answered()
+    test_specific_question_goes_to_pipeline()
+
+    print("\n" + "=" * 60)
+    print("✅ All tests completed!")
+    print("=" * 60)
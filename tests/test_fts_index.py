@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""Tests for the external-content FTS5 index and its sync triggers."""
+
+import sys
+import os
+import sqlite3
+import tempfile
+
+# Add the project root to Python path (parent directory of tests/)
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+
+from services.fts_index import check, is_external_content, search_ids, setup_fts
+
+def make_db(path):
+    conn = sqlite3.connect(path)
+    conn.execute("""
+        CREATE TABLE blog_articles (id INTEGER PRIMARY KEY AUTOINCREMENT, title TEXT NOT NULL, content TEXT NOT NULL,
+                                    summary TEXT, keywords TEXT, source_url TEXT, embedding BLOB)
+    """)
+    conn.execute("INSERT INTO blog_articles (title, content, source_url) VALUES ('Tracking mit GA4', 'Consent und Tagging', 'u1')")
+    # The old standalone index with its own copy of the text
+    conn.execute("CREATE VIRTUAL TABLE blog_articles_fts USING fts5(title, content, summary, keywords, source_url)")
+    conn.execute("INSERT INTO blog_articles_fts (title, content, source_url) VALUES ('Tracking mit GA4', 'Consent und Tagging', 'u1')")
+    conn.commit()
+    return conn
+
+def test_migrates_standalone_index():
+    """A standalone index is replaced and rebuilt from blog_articles."""
+    with tempfile.TemporaryDirectory() as tmp:
+        conn = make_db(os.path.join(tmp, "fts.db"))
+        assert not is_external_content(conn)
+        assert setup_fts(conn) is True
+        assert setup_fts(conn) is False  # idempotent
+        assert is_external_content(conn)
+        assert search_ids(conn, "consent") == [1]
+        tables = {row[0] for row in conn.execute("SELECT name FROM sqlite_master")}
+        print(f"   Tables: {sorted(t for t in tables if t.startswith('blog_articles_fts'))}")
+        assert "blog_articles_fts_content" not in tables  # no second copy of the text
+        conn.close()
+
+def test_triggers_keep_index_current():
+    """Inserts, updates and deletes on blog_articles show up in keyword search right away."""
+    with tempfile.TemporaryDirectory() as tmp:
+        conn = make_db(os.path.join(tmp, "fts.db"))
+        setup_fts(conn)
+        conn.execute("INSERT INTO blog_articles (title, content, source_url) VALUES ('SEO Audit', 'Crawling', 'u2')")
+        assert search_ids(conn, "audit") == [2]
+
+        conn.execute("UPDATE blog_articles SET summary = 'Linkaufbau erklärt' WHERE id = 2")
+        conn.execute("UPDATE blog_articles SET embedding = x'00' WHERE id = 1")  # not indexed, no FTS write
+        assert search_ids(conn, "linkaufbau") == [2]
+
+        conn.execute("DELETE FROM blog_articles WHERE id = 1")
+        assert search_ids(conn, "consent") == []
+        assert check(conn)
+        conn.close()
+
+if __name__ == "__main__":
+    print("=" * 60)
+    print("FTS INDEX TESTS")
+    print("=" * 60)
+    test_migrates_standalone_index()
+    test_triggers_keep_index_current()
+    print("=" * 60)
+    print("✅ All FTS index tests passed")
+    print("=" * 60)
@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""Tests for the Gradio UI's streaming API client, against a mocked API."""
+
+import sys
+import os
+import asyncio
+import httpx
+
+# Add the project root to Python path (parent directory of tests/)
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+
+import gradio_app
+
+def chat(handler, user_input="Was macht ihr?", session_id=None):
+    """Runs chat_with_api against a mocked API; returns every (textbox, history, session id) it yielded."""
+    async def run():
+        gradio_app._client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        try:
+            # The handler updates one history list in place; copy it as it was at each yield
+            return [(text, list(history), sid)
+                    async for text, history, sid in gradio_app.chat_with_api(user_input, [], session_id)]
+        finally:
+            await gradio_app._client.aclose()
+            gradio_app._client = None
+    return asyncio.run(run())
+
+def test_stream_grows_the_answer_and_keeps_the_session():
+    """The streamed answer is shown as it grows; the session id comes from X-Session-ID."""
+    async def tokens():
+        yield b"Wir sind "
+        yield b"eine Agentur."
+
+    def handler(request):
+        assert request.url.path == "/chat_stream"
+        return httpx.Response(200, headers={"X-Session-ID": "sess-1"}, content=tokens())
+
+    updates = chat(handler)
+    answers = [history[-1][1] for _, history, _ in updates]
+    print(f"   Updates: {answers}")
+    assert answers[0] == "Wir sind "
+    assert answers[-1] == "Wir sind eine Agentur."
+    assert all(session_id == "sess-1" for _, _, session_id in updates)
+
+def test_busy_api_shows_retry_after():
+    """A 503 from the API becomes a "try again in N seconds" message; the session is kept."""
+    updates = chat(lambda request: httpx.Response(503, headers={"Retry-After": "12"}), session_id="sess-1")
+    _, history, session_id = updates[-1]
+    print(f"   {history[-1][1]}")
+    assert "12 seconds" in history[-1][1]
+    assert session_id == "sess-1"
+
+def test_falls_back_to_chat_response_without_stream_endpoint():
+    """An API without /chat_stream (404) is asked through /chat_response instead."""
+    def handler(request):
+        if request.url.path == "/chat_stream":
+            return httpx.Response(404)
+        return httpx.Response(200, json={"response": "Hallo!", "session_id": "sess-2"})
+
+    _, history, session_id = chat(handler)[-1]
+    assert history[-1] == ("Was macht ihr?", "Hallo!")
+    assert session_id == "sess-2"
+
+if __name__ == "__main__":
+    print("=" * 60)
+    print("🚀 GRADIO CLIENT TESTS")
+    print("=" * 60)
+
+    test_stream_grows_the_answer_and_keeps_the_session()
+    test_busy_api_shows_retry_after()
+    test_falls_back_to_chat_response_without_stream_endpoint()
+
+    print("\n" + "=" * 60)
+    print("✅ All tests completed!")
+    print("=" * 60)
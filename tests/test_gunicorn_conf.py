@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""Tests for the gunicorn pre-fork hooks (gunicorn.conf.py)."""
+
+import sys
+import os
+import gc
+import importlib.util
+from types import SimpleNamespace
+
+# Add the project root to Python path (parent directory of tests/)
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+
+from services import knowledge
+
+def load_conf():
+    """Imports gunicorn.conf.py (not importable by name), keeping the WEB_CONCURRENCY it exports out of the test."""
+    saved = os.environ.get("WEB_CONCURRENCY")
+    spec = importlib.util.spec_from_file_location("gunicorn_conf", os.path.join(project_root, "gunicorn.conf.py"))
+    conf = importlib.util.module_from_spec(spec)
+    try:
+        spec.loader.exec_module(conf)
+    finally:
+        if saved is None:
+            os.environ.pop("WEB_CONCURRENCY", None)
+        else:
+            os.environ["WEB_CONCURRENCY"] = saved
+    return conf
+
+def test_worker_count_is_bounded():
+    """At least two workers, at most GUNICORN_MAX_WORKERS unless WEB_CONCURRENCY says otherwise."""
+    conf = load_conf()
+    print(f"   {conf.workers} workers on {conf.CPU_COUNT} cores")
+    if not os.getenv("WEB_CONCURRENCY"):
+        assert 2 <= conf.workers <= max(2, conf.MAX_WORKERS)
+    assert conf.preload_app
+
+def test_when_ready_preloads_the_snapshot_without_a_refresher():
+    """The master builds the snapshot once for all workers, starts no refresher thread and freezes the GC."""
+    conf = load_conf()
+    messages = []
+    server = SimpleNamespace(log=SimpleNamespace(info=messages.append))
+    saved = knowledge._current
+    knowledge._current = None
+    try:
+        conf.when_ready(server)
+        print(f"   {messages[0]}")
+        assert knowledge._current is not None and knowledge._current.articles
+        assert knowledge._refresher is None
+        assert gc.get_freeze_count() > 0
+    finally:
+        gc.unfreeze()
+        knowledge._current = saved
+
+if __name__ == "__main__":
+    print("=" * 60)
+    print("🚀 GUNICORN CONFIG TESTS")
+    print("=" * 60)
+
+    test_worker_count_is_bounded()
+    test_when_ready_preloads_the_snapshot_without_a_refresher()
+
+    print("\n" + "=" * 60)
+    print("✅ All tests completed!")
+    print("=" * 60)
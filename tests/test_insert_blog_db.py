@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""Tests for blog article enrichment bookkeeping and company links."""
+
+import sys
+import os
+import tempfile
+
+# Add the project root to Python path (parent directory of tests/)
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+
+os.environ.setdefault("OPENAI_API_KEY", "test")  # the module creates its client on import; no call is made
+
+from services import insert_blog_db
+
+CONTENT = "Wir haben für Musterfirma GmbH eine SEO Kampagne umgesetzt. " * 20
+
+def with_temp_db(test):
+    """Runs a test against a fresh database with the enrichment model replaced."""
+    def run():
+        original_path, original_enrich = insert_blog_db.DB_PATH, insert_blog_db.enrich_blog_content
+        with tempfile.TemporaryDirectory() as tmp:
+            insert_blog_db.DB_PATH = os.path.join(tmp, "blog.db")
+            try:
+                insert_blog_db.setup_database()
+                test()
+            finally:
+                insert_blog_db.DB_PATH, insert_blog_db.enrich_blog_content = original_path, original_enrich
+    run.__name__, run.__doc__ = test.__name__, test.__doc__
+    return run
+
+def status(title):
+    conn = insert_blog_db.connect_db()
+    try:
+        return conn.execute("SELECT enrichment_status, enrichment_error FROM blog_articles WHERE title = ?",
+                            (title,)).fetchone()
+    finally:
+        conn.close()
+
+@with_temp_db
+def test_failed_enrichment_is_retried():
+    """A failed enrichment is recorded and picked up again by the retry batch."""
+    def fail(title, content):
+        raise ValueError("No structured enrichment returned: empty response")
+
+    insert_blog_db.enrich_blog_content = fail
+    insert_blog_db.insert_or_update_blog_article("Case Study", CONTENT, "https://neckarmedia.com/case", "1. März 2024")
+    print(f"   After failure: {status('Case Study')}")
+    assert status("Case Study")[0] == insert_blog_db.STATUS_FAILED
+
+    insert_blog_db.enrich_blog_content = lambda title, content: ("Eine Zusammenfassung.", "seo, client", ["Musterfirma GmbH"])
+    insert_blog_db.retry_failed_enrichments()
+    assert status("Case Study") == (insert_blog_db.STATUS_DONE, None)
+    assert [row[1] for row in insert_blog_db.find_articles_by_company("musterfirma gmbh")] == ["Case Study"]
+
+@with_temp_db
+def test_deleting_an_article_removes_its_company_links():
+    """Foreign keys are enforced, so article_companies rows cascade with their article."""
+    insert_blog_db.enrich_blog_content = lambda title, content: ("Eine Zusammenfassung.", "seo", ["Musterfirma GmbH"])
+    insert_blog_db.insert_or_update_blog_article("Case Study", CONTENT, "https://neckarmedia.com/case", "1. März 2024")
+
+    conn = insert_blog_db.connect_db()
+    try:
+        conn.execute("DELETE FROM blog_articles WHERE title = ?", ("Case Study",))
+        conn.commit()
+        links = conn.execute("SELECT COUNT(*) FROM article_companies").fetchone()[0]
+    finally:
+        conn.close()
+    print(f"   Links left: {links}")
+    assert links == 0
+    assert insert_blog_db.find_articles_by_company("Musterfirma GmbH") == []
+
+if __name__ == "__main__":
+    print("=" * 60)
+    print("🚀 BLOG ENRICHMENT TESTS")
+    print("=" * 60)
+
+    test_failed_enrichment_is_retried()
+    test_deleting_an_article_removes_its_company_links()
+
+    print("\n" + "=" * 60)
+    print("✅ All tests completed!")
+    print("=" * 60)
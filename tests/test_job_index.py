@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+"""Tests for per-question job posting selection, with a stand-in encoder."""
+
+import sys
+import os
+import json
+
+# Add the project root to Python path (parent directory of tests/)
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+
+from services.job_index import JobIndex
+from tests.helpers import trigram_encode
+
+JOBS = [
+    {"id": "seo", "title": "SEO Manager (m/w/d)", "profile": "Du betreust SEO Projekte, Audits und Linkaufbau. " * 20,
+     "apply_link": "https://www.neckarmedia.com/karriere#seo"},
+    {"id": "dev", "title": "Webentwickler WordPress (m/w/d)", "profile": "Du baust Websites mit PHP und WordPress. " * 20,
+     "apply_link": "https://www.neckarmedia.com/karriere#dev"},
+    {"id": "sea", "title": "Google Ads Manager (m/w/d)", "profile": "Du steuerst Kampagnen in Google Ads. " * 20,
+     "apply_link": "https://www.neckarmedia.com/karriere#sea"},
+]
+
+def test_specific_question_gets_matching_posting():
+    """A question naming a role gets only that posting, with its full profile."""
+    index = JobIndex(threshold=0.9)
+    selected = index.select("Sucht ihr noch jemanden für WordPress?", index.build(JOBS, trigram_encode), trigram_encode)
+    print(f"   Selected: {[job['id'] for job in selected]}")
+    assert [job["id"] for job in selected] == ["dev"]
+    assert selected[0]["profile"] == JOBS[1]["profile"]
+
+def test_generic_question_gets_compact_list():
+    """"Any open positions?" lists every title and link, without the profiles."""
+    index = JobIndex(threshold=0.9)
+    selected = index.select("Habt ihr offene Stellen?", JOBS, trigram_encode)  # built lazily
+    assert [job["title"] for job in selected] == [job["title"] for job in JOBS]
+    assert all("profile" not in job for job in selected)
+    full, compact = len(json.dumps(JOBS)), len(json.dumps(selected))
+    print(f"   Context chars: {full} -> {compact}")
+    assert compact < full / 5
+
+def test_scrape_errors_pass_through():
+    index = JobIndex()
+    error = [{"error": "Failed to scrape job listings due to an unexpected issue."}]
+    assert index.select("Jobs?", index.build(error, trigram_encode), trigram_encode) == error
+
+if __name__ == "__main__":
+    print("=" * 60)
+    print("JOB INDEX TESTS")
+    print("=" * 60)
+    test_specific_question_gets_matching_posting()
+    test_generic_question_gets_compact_list()
+    test_scrape_errors_pass_through()
+    print("=" * 60)
+    print("✅ All job index tests passed")
+    print("=" * 60)
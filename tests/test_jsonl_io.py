@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+"""Tests for streaming JSON / JSON Lines helpers used by the ingestion pipeline."""
+
+import sys
+import os
+import json
+import tempfile
+
+# Add the project root to Python path (parent directory of tests/)
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+
+from services.jsonl_io import JsonlAppender, iter_json_array, iter_jsonl, processed_keys
+
+BLOG_POSTS_PATH = os.path.join(project_root, "data", "blog_posts.json")
+
+def test_json_array_streaming_matches_json_load():
+    """Streaming the legacy array in small chunks yields the same records as json.load."""
+    with open(BLOG_POSTS_PATH, "r", encoding="utf-8") as f:
+        expected = json.load(f)
+    streamed = list(iter_json_array(BLOG_POSTS_PATH, chunk_size=512))
+    print(f"   Streamed {len(streamed)} posts")
+    assert streamed == expected
+
+def test_resume_after_truncated_line():
+    """A half-written last line is skipped and the next append starts on a fresh line."""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "posts.jsonl")
+        with JsonlAppender(path) as out:
+            out.write({"url": "a", "title": "Ä"})
+        with open(path, "a", encoding="utf-8") as f:
+            f.write('{"url": "b", "tit')  # crawler killed mid-record
+
+        assert processed_keys(path, "url") == {"a"}
+        with JsonlAppender(path) as out:
+            out.write({"url": "b", "title": "B"})
+
+        urls = [record["url"] for record in iter_jsonl(path)]
+        print(f"   Records after resume: {urls}")
+        assert urls == ["a", "b"]
+
+if __name__ == "__main__":
+    print("=" * 60)
+    print("🚀 JSONL IO TESTS")
+    print("=" * 60)
+
+    test_json_array_streaming_matches_json_load()
+    test_resume_after_truncated_line()
+
+    print("\n" + "=" * 60)
+    print("✅ All tests completed!")
+    print("=" * 60)
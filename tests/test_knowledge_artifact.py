@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""Tests for the prebuilt, memory-mapped knowledge artifact."""
+
+import sys
+import os
+import tempfile
+import numpy as np
+
+# Add the project root to Python path (parent directory of tests/)
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+
+from services import knowledge_artifact
+from services.knowledge import KnowledgeSnapshot
+
+def make_snapshot(rows=3):
+    articles = [{"id": i, "document_id": i, "source_type": "blog", "title": f"Artikel {i}", "summary": "…",
+                 "source_url": f"https://x/{i}/", "keywords": "seo", "published_at": f"2020-0{i + 1}-01"}
+                for i in range(rows)]
+    matrix = np.eye(rows, 4, dtype=np.float32)
+    services = {"services": {"seo": "Suchmaschinenoptimierung"}, "faqs": {"preis": "Auf Anfrage"}}
+    return KnowledgeSnapshot(None, services, {"founders": ["Jane"]}, articles, matrix,
+                             {"seo": tuple(range(rows))})
+
+def write_sources(tmp, content="v1"):
+    paths = [os.path.join(tmp, name) for name in ("kb.db", "kb.db-wal", "services.json")]
+    for path in paths:
+        with open(path, "w") as f:
+            f.write(content)
+    return paths
+
+def test_roundtrip_is_memory_mapped():
+    """A loaded artifact matches the snapshot it was built from; the matrix is a read-only memmap."""
+    with tempfile.TemporaryDirectory() as tmp:
+        sources = write_sources(tmp)
+        snapshot = make_snapshot()
+        version = knowledge_artifact.write(snapshot, os.path.join(tmp, "artifact"), sources)
+        loaded = KnowledgeSnapshot(None, **knowledge_artifact.load(os.path.join(tmp, "artifact"), sources))
+        print(f"   Version {version}: {type(loaded.matrix).__name__} {loaded.matrix.shape}")
+
+        assert isinstance(loaded.matrix, np.memmap) and not loaded.matrix.flags.writeable
+        assert np.array_equal(loaded.matrix, snapshot.matrix)
+        assert loaded.articles == snapshot.articles and loaded.tag_index == snapshot.tag_index
+        assert loaded.recent_rows == snapshot.recent_rows == (2, 1, 0)
+        assert loaded.services_context == snapshot.services_context
+        assert [(i.label, i.text, i.tokens, i.position) for i in loaded.services_items] == \
+               [(i.label, i.text, i.tokens, i.position) for i in snapshot.services_items]
+
+def test_stale_artifact_is_ignored_and_replaced():
+    """Changed sources make the artifact stale; a rebuild switches CURRENT and prunes old versions."""
+    with tempfile.TemporaryDirectory() as tmp:
+        artifact_dir = os.path.join(tmp, "artifact")
+        sources = write_sources(tmp, "v1")
+        assert not knowledge_artifact.has_current_version(artifact_dir, sources)
+        first = knowledge_artifact.write(make_snapshot(), artifact_dir, sources)
+
+        assert knowledge_artifact.has_current_version(artifact_dir, sources)  # build --if-stale skips
+        write_sources(tmp, "v2")
+        assert knowledge_artifact.load(artifact_dir, sources) is None
+        assert not knowledge_artifact.has_current_version(artifact_dir, sources)
+
+        second = knowledge_artifact.write(make_snapshot(0), artifact_dir, sources, keep=1)
+        assert second != first and knowledge_artifact.current_version(artifact_dir) == second
+        assert not os.path.exists(os.path.join(artifact_dir, first))
+        loaded = knowledge_artifact.load(artifact_dir, sources)
+        assert loaded["matrix"].shape == (0, 0) and loaded["articles"] == []
+
+def test_signature_skips_hashing_and_catches_wal_changes():
+    """Unchanged sizes/mtimes accept the artifact without hashing; a changed WAL makes it stale."""
+    with tempfile.TemporaryDirectory() as tmp:
+        artifact_dir = os.path.join(tmp, "artifact")
+        sources = write_sources(tmp)
+        knowledge_artifact.write(make_snapshot(), artifact_dir, sources)
+
+        saved = knowledge_artifact.source_hash
+        knowledge_artifact.source_hash = lambda paths: "must not be called"
+        try:
+            assert knowledge_artifact.load(artifact_dir, sources) is not None
+        finally:
+            knowledge_artifact.source_hash = saved
+
+        os.utime(sources[0], ns=(1, 1))  # touched, same content: the hash decides
+        assert knowledge_artifact.load(artifact_dir, sources) is not None
+
+        with open(sources[1], "w") as f:
+            f.write("uncheckpointed commit")
+        assert knowledge_artifact.load(artifact_dir, sources) is None
+
+if __name__ == "__main__":
+    print("=" * 60)
+    print("KNOWLEDGE ARTIFACT TESTS")
+    print("=" * 60)
+    test_roundtrip_is_memory_mapped()
+    test_stale_artifact_is_ignored_and_replaced()
+    test_signature_skips_hashing_and_catches_wal_changes()
+    print("=" * 60)
+    print("✅ All knowledge artifact tests passed")
+    print("=" * 60)
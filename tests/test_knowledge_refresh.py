@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""Tests for change detection and snapshot swaps by the knowledge refresher."""
+
+import sys
+import os
+import json
+import sqlite3
+import tempfile
+import time
+
+# Add the project root to Python path (parent directory of tests/)
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+
+from services import knowledge
+
+def add_article(db_path, article_id):
+    conn = sqlite3.connect(db_path)
+    conn.execute("CREATE TABLE IF NOT EXISTS blog_articles (id INTEGER PRIMARY KEY, title TEXT, summary TEXT, "
+                 "source_url TEXT, keywords TEXT, embedding TEXT, published_at TEXT)")
+    conn.execute("INSERT INTO blog_articles VALUES (?, ?, ?, ?, ?, ?, ?)",
+                 (article_id, f"Artikel {article_id}", "…", f"https://x/{article_id}/", "seo",
+                  json.dumps([1.0, float(article_id)]), f"2024-01-{article_id:02d}"))
+    conn.commit()
+    conn.close()
+
+def write_json(path, data):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f)
+
+def with_sources(test):
+    """Points the knowledge module at temporary sources (no prebuilt artifact) for one test."""
+    def run():
+        names = ("DB_PATH", "SERVICES_PATH", "LATEST_INFO_PATH", "KNOWLEDGE_ARTIFACT_DIR", "_current")
+        saved = {name: getattr(knowledge, name) for name in names}
+        with tempfile.TemporaryDirectory() as tmp:
+            knowledge.DB_PATH = os.path.join(tmp, "kb.db")
+            knowledge.SERVICES_PATH = os.path.join(tmp, "services.json")
+            knowledge.LATEST_INFO_PATH = os.path.join(tmp, "latest_info.json")
+            knowledge.KNOWLEDGE_ARTIFACT_DIR = ""
+            knowledge._current = None
+            add_article(knowledge.DB_PATH, 1)
+            write_json(knowledge.SERVICES_PATH, {"services": {"seo": "Suchmaschinenoptimierung"}})
+            write_json(knowledge.LATEST_INFO_PATH, {"founders": ["Jane"]})
+            try:
+                test()
+            finally:
+                knowledge.stop_refresher()
+                for name, value in saved.items():
+                    setattr(knowledge, name, value)
+    run.__name__, run.__doc__ = test.__name__, test.__doc__
+    return run
+
+@with_sources
+def test_signature_changes_with_every_source():
+    """A commit from another connection and a replaced JSON file both change the signature."""
+    refresher = knowledge.KnowledgeRefresher(interval=0)
+    try:
+        first = refresher.signature()
+        assert refresher.signature() == first  # stable while nothing changes
+
+        add_article(knowledge.DB_PATH, 2)
+        after_commit = refresher.signature()
+        assert after_commit != first
+
+        write_json(knowledge.SERVICES_PATH, {"services": {"sea": "Google Ads"}})
+        os.utime(knowledge.SERVICES_PATH, ns=(time.time_ns(), time.time_ns() + 10**9))
+        print(f"   {first} -> {after_commit} -> {refresher.signature()}")
+        assert refresher.signature() != after_commit
+    finally:
+        refresher.close()
+
+@with_sources
+def test_refresher_swaps_in_a_new_snapshot():
+    """A change is picked up in the background; a request holding the old snapshot keeps its view."""
+    refresher = knowledge.start_refresher(interval=0.05)
+    old = knowledge.get_snapshot()
+    assert len(old.articles) == 1
+
+    add_article(knowledge.DB_PATH, 2)
+    deadline = time.monotonic() + 3
+    while knowledge.get_snapshot() is old and time.monotonic() < deadline:
+        time.sleep(0.02)
+
+    new = knowledge.get_snapshot()
+    print(f"   Swapped: {new is not old}, articles {len(old.articles)} -> {len(new.articles)}")
+    assert new is not old
+    assert [a["id"] for a in new.articles] == [1, 2]
+    assert [a["id"] for a in old.articles] == [1]
+    knowledge.stop_refresher()
+    refresher.join(timeout=1)
+    assert not refresher.is_alive()
+
+if __name__ == "__main__":
+    print("=" * 60)
+    print("🚀 KNOWLEDGE REFRESH TESTS")
+    print("=" * 60)
+
+    test_signature_changes_with_every_source()
+    test_refresher_swaps_in_a_new_snapshot()
+
+    print("\n" + "=" * 60)
+    print("✅ All tests completed!")
+    print("=" * 60)
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""Tests for the queued JSON logging: request ids, extra fields, payload sampling."""
+
+import sys
+import os
+import json
+import logging
+import queue
+import tempfile
+
+# Add the project root to Python path (parent directory of tests/)
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+
+from services import logs
+
+def make_logger(name, level=logging.INFO):
+    """A logger that only enqueues, like the app's, returning the queue to inspect."""
+    log_queue = queue.SimpleQueue()
+    logger = logging.getLogger(f"test_logs.{name}")
+    logger.handlers = [logs._RequestQueueHandler(log_queue)]
+    logger.setLevel(level)
+    logger.propagate = False
+    return logger, log_queue
+
+def test_event_is_one_json_line_with_request_id():
+    """Events carry the request id of the calling context and their fields as top-level keys."""
+    logger, log_queue = make_logger("event")
+    token = logs.request_id_var.set("req-1")
+    try:
+        logs.log_event(logger, "tool.done", tool="Jobs Scraper", ms=12.5)
+    finally:
+        logs.request_id_var.reset(token)
+    logger.info("no.request")
+
+    line = logs.JsonFormatter().format(log_queue.get_nowait())
+    print(f"   {line}")
+    entry = json.loads(line)
+    assert entry["msg"] == "tool.done" and entry["request_id"] == "req-1"
+    assert entry["tool"] == "Jobs Scraper" and entry["ms"] == 12.5
+    assert "request_id" not in json.loads(logs.JsonFormatter().format(log_queue.get_nowait()))
+
+def test_exceptions_are_formatted_before_queueing():
+    logger, log_queue = make_logger("exc")
+    try:
+        raise ValueError("boom")
+    except ValueError:
+        logger.exception("generation.error")
+    entry = json.loads(logs.JsonFormatter().format(log_queue.get_nowait()))
+    assert "ValueError: boom" in entry["exc"]
+
+def test_payloads_only_at_debug_and_sampled():
+    """Verbose payloads are skipped at INFO and truncated when sampled at DEBUG."""
+    logger, log_queue = make_logger("payload")
+    root = logging.getLogger(logs.ROOT_LOGGER)
+    level, rate = root.level, logs.LOG_SAMPLE_RATE
+    try:
+        root.setLevel(logging.INFO)
+        logs.LOG_SAMPLE_RATE = 1.0
+        logs.log_payload(logger, "context.text", "x" * 2000)
+        assert log_queue.empty()
+
+        root.setLevel(logging.DEBUG)
+        logger.setLevel(logging.DEBUG)
+        logs.log_payload(logger, "context.text", "x" * 2000)
+        entry = json.loads(logs.JsonFormatter().format(log_queue.get_nowait()))
+        assert entry["chars"] == 2000 and len(entry["text"]) == logs.LOG_PAYLOAD_CHARS
+
+        logs.LOG_SAMPLE_RATE = 0.0
+        logs.log_payload(logger, "context.text", "x")
+        assert log_queue.empty()
+    finally:
+        root.setLevel(level)
+        logs.LOG_SAMPLE_RATE = rate
+
+def test_appender_writes_in_the_background():
+    """Records are only queued by append(); flush() waits until they are in the file."""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "review.jsonl")
+        appender = logs.JsonLinesAppender(path)
+        for i in range(3):
+            appender.append({"query": f"Frage {i}", "score": 0.9})
+        appender.flush()
+        with open(path, encoding="utf-8") as f:
+            assert [json.loads(line)["query"] for line in f] == ["Frage 0", "Frage 1", "Frage 2"]
+        logs.JsonLinesAppender("").append({"query": "disabled"})  # no path: nothing to write
+
+if __name__ == "__main__":
+    print("=" * 60)
+    print("LOGGING TESTS")
+    print("=" * 60)
+    test_event_is_one_json_line_with_request_id()
+    test_exceptions_are_formatted_before_queueing()
+    test_payloads_only_at_debug_and_sampled()
+    test_appender_writes_in_the_background()
+    print("=" * 60)
+    print("✅ All logging tests passed")
+    print("=" * 60)
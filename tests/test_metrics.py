@@ -0,0 +1,38 @@
+#!/usr/bin/env python3
+"""Tests for the in-process metrics registry."""
+
+import sys
+import os
+
+# Add the project root to Python path (parent directory of tests/)
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+
+from services import metrics
+
+def test_percentiles_are_nearest_rank():
+    """On 1..100 the p-th percentile is exactly p; small lists round up to the next rank."""
+    values = list(range(1, 101))
+    for pct in (1, 50, 95, 99, 100):
+        assert metrics.percentile(values, pct) == pct, pct
+    assert metrics.percentile([10, 20, 30], 50) == 20
+    assert metrics.percentile([10, 20, 30], 95) == 30
+    assert metrics.percentile([10], 0) == 10
+    assert metrics.percentile([], 95) is None
+
+def test_summarize():
+    summary = metrics.summarize(range(100, 0, -1))
+    print(f"   {summary}")
+    assert summary == {"count": 100, "mean": 50.5, "p50": 50, "p95": 95, "p99": 99}
+
+if __name__ == "__main__":
+    print("=" * 60)
+    print("🚀 METRICS TESTS")
+    print("=" * 60)
+
+    test_percentiles_are_nearest_rank()
+    test_summarize()
+
+    print("\n" + "=" * 60)
+    print("✅ All tests completed!")
+    print("=" * 60)
@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+"""Tests for the model-tier policy and the stub server used by the A/B harness."""
+
+import sys
+import os
+
+# Add the project root to Python path (parent directory of tests/)
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+
+from openai import OpenAI
+from services import metrics, model_tiers
+from services.tier_ab import start_stub_server
+
+def test_lookups_fast_open_ended_large():
+    """Employee/job lookups go to the fast model; retrieval and open-ended questions don't."""
+    fast, _ = model_tiers.choose_tier("Wer ist der Gründer von Neckarmedia?", ["Founder/Employee Info"], 400)
+    blog, _ = model_tiers.choose_tier("Which clients did you work for?", ["Company References (SQLite)"], 400)
+    why, score = model_tiers.choose_tier("Warum SEO statt SEA?", ["Service Offerings"], 400)
+    print(f"   lookup={fast}, blog={blog}, why={why} ({score})")
+    assert (fast, blog, why) == (model_tiers.FAST, model_tiers.LARGE, model_tiers.LARGE)
+
+def test_stub_server_usage_metrics():
+    """The stub answers like the Responses API; usage lands in the per-tier cost metrics."""
+    server, base_url = start_stub_server(time_scale=0.0)
+    try:
+        client = OpenAI(api_key="stub", base_url=base_url)
+        response = client.responses.create(model="gpt-5-mini", input=[{"role": "user", "content": "Hallo"}])
+    finally:
+        server.shutdown()
+    assert response.output_text == "Stub answer from gpt-5-mini."
+
+    metrics.reset()
+    model_tiers.record_call(model_tiers.FAST, "gpt-5-mini", 0.5, response.usage)
+    counters = metrics.snapshot()["counters"]
+    expected = model_tiers.usage_cost("gpt-5-mini", response.usage.input_tokens, response.usage.output_tokens)
+    assert counters["model.fast.calls"] == 1
+    assert abs(counters["model.fast.cost_usd"] - expected) < 1e-12
+
+if __name__ == "__main__":
+    print("=" * 60)
+    print("🚀 MODEL TIER TESTS")
+    print("=" * 60)
+
+    test_lookups_fast_open_ended_large()
+    test_stub_server_usage_metrics()
+
+    print("\n" + "=" * 60)
+    print("✅ All tests completed!")
+    print("=" * 60)
@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""Tests for the batched query log and the cache warm-up from its top queries."""
+
+import sys
+import os
+import json
+import sqlite3
+import tempfile
+import time
+
+# Add the project root to Python path (parent directory of tests/)
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+
+from services.query_log import QueryLog, answer_hash, warm_up
+
+def test_rows_are_written_in_batches():
+    """Records are buffered, then written together by the background thread."""
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "queries.db")
+        log = QueryLog(db_path, flush_seconds=60, batch_size=3)
+        log.record("Was kostet SEO?", "was kostet seo", ["Service Offerings"], [], 812.5, "Ab 500 €")
+        log.record("Habt ihr Jobs?", "habt ihr jobs", ["Jobs Scraper"], [], 95.0, "Ja")
+        assert not os.path.exists(db_path)  # nothing written per request
+
+        log.record("GA4 Tracking", "ga4 tracking", ["Company References (SQLite)"], ["https://x/ga4/"], 640.0, "…")
+        rows, deadline = [], time.time() + 5
+        while len(rows) < 3 and time.time() < deadline:
+            time.sleep(0.05)
+            if os.path.exists(db_path):
+                conn = sqlite3.connect(db_path)
+                try:
+                    rows = conn.execute("SELECT query, tools, retrieved_ids, latency_ms, answer_hash "
+                                        "FROM query_log ORDER BY id").fetchall()
+                except sqlite3.OperationalError:
+                    pass  # table not created yet
+                conn.close()
+        print(f"   Rows: {len(rows)}")
+        assert len(rows) == 3
+        assert rows[2][:2] == ("ga4 tracking", "Company References (SQLite)")
+        assert json.loads(rows[2][2]) == ["https://x/ga4/"]
+        assert rows[0][4] == answer_hash("Ab 500 €")
+
+def test_warm_up_replays_top_queries():
+    """The most frequent normalized queries are replayed, with their latest wording."""
+    with tempfile.TemporaryDirectory() as tmp:
+        log = QueryLog(os.path.join(tmp, "queries.db"), flush_seconds=60)
+        for text in ("was macht ihr", "Was macht ihr?", "Habt ihr Jobs?", "Was macht ihr!"):
+            log.record(text, text.lower().strip("?!"))
+        log.flush()
+        assert log.top_queries(limit=1) == [("Was macht ihr!", 3)]
+
+        replayed = []
+        assert warm_up(replayed.extend, limit=5, source=log) == 2
+        print(f"   Replayed: {replayed}")
+        assert replayed == ["Was macht ihr!", "Habt ihr Jobs?"]
+        assert warm_up(replayed.extend, limit=0, source=log) == 0
+
+if __name__ == "__main__":
+    print("=" * 60)
+    print("QUERY LOG TESTS")
+    print("=" * 60)
+    test_rows_are_written_in_batches()
+    test_warm_up_replays_top_queries()
+    print("=" * 60)
+    print("✅ All query log tests passed")
+    print("=" * 60)
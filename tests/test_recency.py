@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""Tests for date normalization, recency intents and time-decay blending."""
+
+import sys
+import os
+import sqlite3
+import tempfile
+import numpy as np
+
+# Add the project root to Python path (parent directory of tests/)
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+
+from services.knowledge import KnowledgeSnapshot
+from services.recency import blend, dated_only, ensure_published_at, latest_articles, latest_intent, parse_date, published_days
+
+def test_parse_german_and_english_dates():
+    cases = {
+        "15. April 2016": "2016-04-15",
+        "17. März 2020": "2020-03-17",
+        "3 Okt. 2019": "2019-10-03",
+        "15.04.2016": "2016-04-15",
+        "April 15, 2016": "2016-04-15",
+        "2016-04-15T10:00:00+00:00": "2016-04-15",
+        "Unknown Date": None,
+        "31. Februar 2020": None,
+    }
+    for raw, expected in cases.items():
+        assert parse_date(raw) == expected, raw
+    print(f"   {len(cases)} date formats normalized")
+
+def test_latest_intent():
+    assert latest_intent("What are your latest blog posts?") == "latest"
+    assert latest_intent("Tell me about recent blog posts") == "latest"
+    assert latest_intent("Zeig mir die letzten Artikel") == "latest"
+    assert latest_intent("Was habt ihr zuletzt über Conversion Optimierung geschrieben?") == "topic"
+    assert latest_intent("Do you work with new clients?") is None
+    assert latest_intent("Wer ist der Gründer?") is None
+
+def test_blend_prefers_newer_on_ties_and_keeps_undated_neutral():
+    """Undated documents rank like a median-aged post, not like a brand-new one."""
+    now = published_days("2025-01-01")
+    days = np.array([published_days("2014-01-01"), published_days("2024-12-01"), np.nan])
+    scores = blend(np.array([0.8, 0.8, 0.8]), days, weight=0.6, now=now)
+    print(f"   Blended: {np.round(scores, 3).tolist()}")
+    assert scores[1] > scores[2] > scores[0]
+    assert np.isclose(scores[2], (scores[0] + scores[1]) / 2)
+
+def test_dated_only_for_topic_queries():
+    """"Latest posts about X" leaves out undated documents, unless nothing is dated."""
+    days = np.array([published_days("2024-12-01"), np.nan])
+    assert dated_only(np.array([0.5, 0.9]), days).tolist() == [0.5, -np.inf]
+    assert dated_only(np.array([0.5, 0.9]), np.array([np.nan, np.nan])).tolist() == [0.5, 0.9]
+
+def test_published_at_column_and_snapshot_order():
+    with tempfile.TemporaryDirectory() as tmp:
+        conn = sqlite3.connect(os.path.join(tmp, "dates.db"))
+        conn.execute("CREATE TABLE blog_articles (id INTEGER PRIMARY KEY, title TEXT, source_url TEXT, date TEXT)")
+        conn.executemany("INSERT INTO blog_articles VALUES (?, ?, ?, ?)", [
+            (1, "Alt", "u1", "6. September 2013"), (2, "Neu", "u2", "17. Januar 2025"),
+            (3, "Mitte", "u3", "30. Juni 2022"), (4, "Ohne", "u4", "Unknown Date"),
+        ])
+        assert ensure_published_at(conn) == (3, 1)
+        assert [row[0] for row in latest_articles(conn, 2)] == [2, 3]
+        plan = conn.execute("EXPLAIN QUERY PLAN SELECT id FROM blog_articles ORDER BY published_at DESC LIMIT 2").fetchall()
+        assert "idx_blog_articles_published_at" in str(plan)
+        conn.close()
+
+    articles = [{"published_at": d} for d in ("2013-09-06", "2025-01-17", None, "2022-06-30")]
+    snapshot = KnowledgeSnapshot(None, {}, {}, articles, np.zeros((4, 2), dtype=np.float32), {})
+    assert snapshot.recent_rows == (1, 3, 0)
+
+if __name__ == "__main__":
+    print("=" * 60)
+    print("RECENCY TESTS")
+    print("=" * 60)
+    test_parse_german_and_english_dates()
+    test_latest_intent()
+    test_blend_prefers_newer_on_ties_and_keeps_undated_neutral()
+    test_dated_only_for_topic_queries()
+    test_published_at_column_and_snapshot_order()
+    print("=" * 60)
+    print("✅ All recency tests passed")
+    print("=" * 60)
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""Tests for the offline retrieval evaluation harness."""
+
+import sys
+import os
+import json
+import sqlite3
+import tempfile
+
+# Add the project root to Python path (parent directory of tests/)
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+
+from services.retrieval_eval import (
+    AgentBackend,
+    CompressedBackend,
+    JsonLoopBackend,
+    MatrixBackend,
+    build_labeled_queries,
+    evaluate,
+    load_corpus,
+    ndcg_at_k,
+    recall_at_k,
+    reciprocal_rank,
+)
+
+def test_ranking_metrics():
+    """Metrics on a hand-checked ranking."""
+    ranked = [7, 3, 5]
+    assert recall_at_k(ranked, [3], 1) == 0.0
+    assert recall_at_k(ranked, [3], 3) == 1.0
+    assert reciprocal_rank(ranked, [3]) == 0.5
+    assert reciprocal_rank(ranked, [9]) == 0.0
+    assert abs(ndcg_at_k(ranked, [3], 3) - 1 / 1.5849625) < 1e-6
+
+def test_labeled_queries_from_corpus():
+    """Every article contributes at least its title as a query."""
+    labeled = build_labeled_queries()
+    ids, _, _ = load_corpus()
+    print(f"   {len(labeled)} labeled queries for {len(ids)} articles")
+    assert len(labeled) >= len(ids)
+    assert all(len(item["relevant"]) == 1 for item in labeled)
+
+def test_backends_agree_on_stored_vectors():
+    """Searching with an article's own vector ranks that article first in every backend."""
+    ids, _, stored = load_corpus()
+    vectors = [json.loads(e) for e in stored]
+    labeled = [{"query": "", "relevant": [article_id]} for article_id in ids[:10]]
+
+    for backend in (JsonLoopBackend(ids, stored), MatrixBackend(ids, vectors), CompressedBackend(ids, vectors, "int8"),
+                    AgentBackend()):
+        result = evaluate(backend, labeled, vectors[:10], k=1)
+        print(f"   {backend.name}: {result}")
+        assert result["recall@1"] == 1.0
+
+def test_corpus_skips_near_duplicates():
+    """Linked near-duplicates are not part of the evaluated corpus."""
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "eval.db")
+        conn = sqlite3.connect(db_path)
+        conn.execute("CREATE TABLE blog_articles (id INTEGER PRIMARY KEY, content TEXT, embedding TEXT, duplicate_of INTEGER)")
+        conn.executemany("INSERT INTO blog_articles VALUES (?, ?, ?, ?)",
+                         [(1, "Original", "[1, 0]", None), (2, "Kopie", "[1, 0]", 1), (3, "Anderer", "[0, 1]", None)])
+        conn.commit()
+        conn.close()
+        ids, contents, _ = load_corpus(db_path)
+    print(f"   Corpus: {ids}")
+    assert ids == [1, 3] and contents == ["Original", "Anderer"]
+
+def test_agent_backend_answers_latest_queries_by_date():
+    """The agent backend applies the agent's intents: "latest posts" is ranked by date, not similarity."""
+    backend = AgentBackend()
+    newest = [backend.url_to_id[backend.snapshot.articles[row]["source_url"]] for row in backend.snapshot.recent_rows[:3]]
+    _, _, stored = load_corpus()
+    ranked = backend.search("What are your latest blog posts?", json.loads(stored[0]), 3)
+    print(f"   Latest: {ranked}")
+    assert ranked == newest
+
+if __name__ == "__main__":
+    print("=" * 60)
+    print("🚀 RETRIEVAL EVALUATION TESTS")
+    print("=" * 60)
+
+    test_ranking_metrics()
+    test_labeled_queries_from_corpus()
+    test_backends_agree_on_stored_vectors()
+    test_corpus_skips_near_duplicates()
+    test_agent_backend_answers_latest_queries_by_date()
+
+    print("\n" + "=" * 60)
+    print("✅ All tests completed!")
+    print("=" * 60)
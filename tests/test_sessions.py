@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""Tests for the server-side session store."""
+
+import sys
+import os
+import tempfile
+
+# Add the project root to Python path (parent directory of tests/)
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+
+from services.sessions import SessionStore
+
+class FakeTurn:
+    """Stand-in for agent.ChatTurn so the test doesn't load the agent."""
+    def __init__(self, answer, tools=(), context=None, response_id=None):
+        self.answer = answer
+        self.tools = list(tools)
+        self.context = context
+        self.response_id = response_id
+
+def test_record_turn_keeps_context():
+    """A turn stores history, tools, context and the response id."""
+    store = SessionStore(maxsize=10, ttl=60, db_path="")
+    session = store.get_or_create()
+    store.record_turn(session, "Welche Jobs gibt es?", FakeTurn("Zwei.", ["Jobs Scraper"], "job: ...", "resp_1"))
+
+    again = store.get(session.id)
+    print(f"   Session {again.id}: {list(again.history)}")
+    assert again.last_tools == ["Jobs Scraper"]
+    assert again.last_context == "job: ..."
+    assert again.last_response_id == "resp_1"
+    assert len(again.history) == 2
+
+def test_lru_eviction():
+    """The in-memory store never holds more than maxsize sessions."""
+    store = SessionStore(maxsize=2, ttl=60, db_path="")
+    first = store.get_or_create()
+    store.get_or_create()
+    store.get_or_create()
+    assert store.get(first.id) is None
+
+def test_sqlite_persistence():
+    """Sessions evicted from memory are loaded back from SQLite."""
+    with tempfile.TemporaryDirectory() as tmp:
+        store = SessionStore(maxsize=1, ttl=60, db_path=os.path.join(tmp, "sessions.db"))
+        session = store.get_or_create()
+        store.record_turn(session, "Hallo", FakeTurn("Hi!"))
+        store.get_or_create()  # evicts the first session from memory
+
+        loaded = store.get(session.id)
+        assert loaded is not None
+        assert list(loaded.history)[0]["content"] == "Hallo"
+
+def test_unknown_id_gets_a_new_one():
+    """An unknown client-supplied id is not adopted; the new session has its own id."""
+    store = SessionStore(maxsize=10, ttl=60, db_path="")
+    session = store.get_or_create("chosen-by-client")
+    print(f"   New id: {session.id}")
+    assert session.id != "chosen-by-client" and len(session.id) >= 32
+    assert store.get("chosen-by-client") is None
+    assert store.get_or_create(session.id) is session
+
+if __name__ == "__main__":
+    print("=" * 60)
+    print("🚀 SESSION STORE TESTS")
+    print("=" * 60)
+
+    test_record_turn_keeps_context()
+    test_lru_eviction()
+    test_sqlite_persistence()
+    test_unknown_id_gets_a_new_one()
+
+    print("\n" + "=" * 60)
+    print("✅ All tests completed!")
+    print("=" * 60)
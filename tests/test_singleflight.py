@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""Tests for coalescing identical concurrent calls and token streams."""
+
+import sys
+import os
+import asyncio
+import time
+
+# Add the project root to Python path (parent directory of tests/)
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+
+from services.singleflight import SingleFlight
+
+async def collect(iterator):
+    """Drains an async iterator; returns (chunks, exception or None)."""
+    chunks = []
+    try:
+        async for chunk in iterator:
+            chunks.append(chunk)
+    except Exception as e:
+        return chunks, e
+    return chunks, None
+
+def test_do_coalesces_concurrent_calls():
+    """Concurrent callers share one run; a later call runs again."""
+    calls = []
+
+    async def answer():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return f"Antwort {len(calls)}"
+
+    async def main():
+        flights = SingleFlight("test")
+        results = await asyncio.gather(*(flights.do("Was macht ihr?", answer) for _ in range(5)))
+        later = await flights.do("Was macht ihr?", answer)
+        return results, later
+
+    results, later = asyncio.run(main())
+    print(f"   Shared: {set(results)}, later: {later}")
+    assert results == ["Antwort 1"] * 5
+    assert later == "Antwort 2"
+    assert len(calls) == 2
+
+def test_do_shares_errors_and_releases_the_key():
+    """Every waiter gets the error, and the next call starts fresh."""
+    calls = []
+
+    async def failing():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        raise ValueError("upstream down")
+
+    async def main():
+        flights = SingleFlight("test")
+        results = await asyncio.gather(*(flights.do("k", failing) for _ in range(3)), return_exceptions=True)
+        retry = await flights.do("k", lambda: asyncio.sleep(0, result="ok"))
+        return results, retry
+
+    results, retry = asyncio.run(main())
+    print(f"   Errors: {results}")
+    assert all(isinstance(r, ValueError) for r in results)
+    assert len(calls) == 1
+    assert retry == "ok"
+
+def test_cancelled_caller_doesnt_cancel_the_others():
+    """One client disconnecting doesn't abort the shared run."""
+    async def slow():
+        await asyncio.sleep(0.05)
+        return "fertig"
+
+    async def main():
+        flights = SingleFlight("test")
+        first = asyncio.ensure_future(flights.do("k", slow))
+        second = asyncio.ensure_future(flights.do("k", slow))
+        await asyncio.sleep(0.01)
+        first.cancel()
+        return await second, first.cancelled()
+
+    result, cancelled = asyncio.run(main())
+    assert cancelled and result == "fertig"
+
+def test_stream_replays_to_late_subscribers():
+    """A subscriber joining mid-stream still gets every chunk from the start."""
+    started = []
+
+    def tokens():
+        started.append(1)
+        for token in ("Hal", "lo", " Welt"):
+            time.sleep(0.02)  # blocking, like reading from the LLM
+            yield token
+
+    async def main():
+        flights = SingleFlight("test")
+        first = asyncio.ensure_future(collect(flights.stream("k", tokens)))
+        await asyncio.sleep(0.03)  # first token already published
+        second = await collect(flights.stream("k", tokens))
+        return await first, second
+
+    first, second = asyncio.run(main())
+    print(f"   First: {first}, late: {second}")
+    assert first == second == (["Hal", "lo", " Welt"], None)
+    assert len(started) == 1
+
+def test_stream_error_reaches_every_subscriber():
+    """A stream that breaks off delivers the chunks so far, then the error, to everyone."""
+    def tokens():
+        yield "Teil"
+        time.sleep(0.02)
+        raise RuntimeError("stream failed")
+
+    async def main():
+        flights = SingleFlight("test")
+        return await asyncio.gather(collect(flights.stream("k", tokens)), collect(flights.stream("k", tokens)))
+
+    for chunks, error in asyncio.run(main()):
+        assert chunks == ["Teil"]
+        assert isinstance(error, RuntimeError)
+
+if __name__ == "__main__":
+    print("=" * 60)
+    print("🚀 SINGLE-FLIGHT TESTS")
+    print("=" * 60)
+
+    test_do_coalesces_concurrent_calls()
+    test_do_shares_errors_and_releases_the_key()
+    test_cancelled_caller_doesnt_cancel_the_others()
+    test_stream_replays_to_late_subscribers()
+    test_stream_error_reaches_every_subscriber()
+
+    print("\n" + "=" * 60)
+    print("✅ All tests completed!")
+    print("=" * 60)
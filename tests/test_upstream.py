@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""Tests for the upstream call manager (concurrency limit and circuit breaker)."""
+
+import sys
+import os
+import threading
+import time
+
+# Add the project root to Python path (parent directory of tests/)
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+
+from services.upstream import OPEN, CLOSED, UpstreamManager, UpstreamUnavailable
+
+def failing_call():
+    raise TimeoutError("upstream timed out")
+
+def test_breaker_opens_on_errors_and_recovers():
+    """Failures open the breaker; after the open period one probe closes it again."""
+    upstream = UpstreamManager("test", max_p95_seconds=5, min_calls=4, max_error_rate=0.5, open_seconds=0.2)
+    for _ in range(4):
+        try:
+            upstream.call(failing_call)
+        except TimeoutError:
+            pass
+    print(f"   State after failures: {upstream.state}")
+    assert upstream.state == OPEN and not upstream.accepting()
+
+    try:
+        upstream.call(lambda: "never called")
+        assert False, "expected UpstreamUnavailable"
+    except UpstreamUnavailable as e:
+        assert e.retry_after >= 1
+
+    time.sleep(0.25)
+    assert upstream.call(lambda: "ok") == "ok"
+    assert upstream.state == CLOSED
+
+def test_breaker_opens_on_slow_calls():
+    """A p95 latency above the limit opens the breaker even without errors."""
+    upstream = UpstreamManager("slow", max_p95_seconds=0.01, min_calls=3)
+    for _ in range(3):
+        upstream.call(time.sleep, 0.02)
+    assert upstream.state == OPEN
+
+def test_sheds_when_all_slots_busy():
+    """A caller that can't get a slot within the queue timeout is rejected, not queued."""
+    upstream = UpstreamManager("busy", max_p95_seconds=5, max_concurrency=1, queue_timeout=0.05)
+    release = threading.Event()
+    holder = threading.Thread(target=upstream.call, args=(release.wait,))
+    holder.start()
+    time.sleep(0.05)
+    try:
+        upstream.call(lambda: "never called")
+        assert False, "expected UpstreamUnavailable"
+    except UpstreamUnavailable as e:
+        print(f"   Shed: {e}")
+    finally:
+        release.set()
+        holder.join()
+
+if __name__ == "__main__":
+    print("=" * 60)
+    print("🚀 UPSTREAM MANAGER TESTS")
+    print("=" * 60)
+
+    test_breaker_opens_on_errors_and_recovers()
+    test_breaker_opens_on_slow_calls()
+    test_sheds_when_all_slots_busy()
+
+    print("\n" + "=" * 60)
+    print("✅ All tests completed!")
+    print("=" * 60)